@@ -0,0 +1,70 @@
+import csv
+import json
+from typing import Any, Iterator, Optional, Tuple
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON into a list of objects. Blank lines are ignored.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        records = []
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line.decode(encoding)))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON parse error on line {line_no} - {exc}')
+        return records
+
+
+def iter_ndjson(stream, encoding='utf-8') -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """
+    Reads NDJSON one line at a time, yielding (line number, record, error).
+    A malformed line yields an error instead of aborting the whole upload.
+    """
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, json.loads(line.decode(encoding)), None
+        except ValueError as exc:
+            yield line_no, None, f'NDJSON parse error - {exc}'
+
+
+def iter_csv(stream, encoding='utf-8') -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """
+    Reads CSV with a header row incrementally, yielding (line number, record, error).
+    Empty cells are treated as missing values. A malformed row yields an error
+    and reading goes on with the next one.
+    """
+    reader = csv.DictReader(line.decode(encoding) for line in stream)
+    try:
+        reader.fieldnames
+    except csv.Error as exc:
+        yield 1, None, f'CSV parse error in the header - {exc}'
+        return
+    while True:
+        # The row starts on the line after the previous one ended
+        start = reader.line_num + 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            # The reader starts afresh on the next line
+            yield start, None, f'CSV parse error - {exc}'
+            continue
+        if None in row:
+            yield reader.line_num, None, 'Row has more columns than the header.'
+            continue
+        yield reader.line_num, {key: value for key, value in row.items() if value not in ('', None)}, None
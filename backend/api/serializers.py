@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from core.models import CRMConfiguration
+from core.models import CRMConfiguration, SyncJob
 from core.canonical_model import Contact
 
 class CRMConfigurationSerializer(serializers.ModelSerializer):
@@ -24,3 +24,9 @@ class ContactSerializer(serializers.Serializer):
     def to_canonical(self) -> Contact:
         # self.validated_data is the raw dict from to_internal_value
         return Contact(**self.validated_data)
+
+
+class SyncJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SyncJob
+        fields = ['id', 'crm_type', 'status', 'remote_id', 'error', 'attempts', 'created_at', 'updated_at']
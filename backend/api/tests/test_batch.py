@@ -0,0 +1,71 @@
+import json
+from unittest.mock import patch
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import CRMConfiguration
+from core.adapters.base_adapter import PushResult
+from core.adapters.hubspot_adapter import HubSpotAdapter
+
+User = get_user_model()
+
+class BatchSyncTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='batch@test.com', username='batchuser', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        CRMConfiguration.objects.create(
+            user=self.user,
+            crm_type='hubspot',
+            auth_config={'access_token': None, 'object_type': 'contacts'},
+            field_mapping={'email': 'email'}
+        )
+        self.url = '/api/sync/hubspot/batch/'
+
+    def test_json_array(self):
+        payload = [{"email": "a@test.com"}, {"email": "not-an-email"}, {"first_name": "NoMapping"}]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'partial')
+        self.assertEqual(response.data['total'], 3)
+        results = response.data['results']
+        self.assertEqual([r['index'] for r in results], [0, 1, 2])
+        self.assertEqual(results[0]['remote_id'], 'MOCK_HS_ID_123')
+        self.assertEqual(results[1]['status'], 'error')
+        self.assertEqual(results[2]['status'], 'success')
+
+    def test_ndjson_body_uses_bulk_push(self):
+        body = "\n".join(json.dumps({"email": f"user{i}@test.com"}) for i in range(3)) + "\n"
+        with patch.object(HubSpotAdapter, 'push_contacts', return_value=[
+            PushResult(remote_id='1'), PushResult(error='rejected'), PushResult(remote_id='3'),
+        ]) as push_contacts:
+            response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(push_contacts.call_count, 1)
+        self.assertEqual(len(push_contacts.call_args.args[0]), 3)
+        self.assertEqual([r['remote_id'] for r in response.data['results']], ['1', None, '3'])
+        self.assertEqual(response.data['failed'], 1)
+
+    def test_unchanged_contacts_are_skipped(self):
+        payload = [{"email": "a@test.com"}, {"email": "b@test.com"}]
+        self.client.post(self.url, payload, format='json')
+        # Not in the field mapping, so the HubSpot payload is unchanged
+        payload[1]["first_name"] = "Bee"
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.data['skipped'], 2)
+        self.assertEqual(response.data['succeeded'], 2)
+        self.assertEqual([r['remote_id'] for r in response.data['results']], ['MOCK_HS_ID_123'] * 2)
+
+        response = self.client.post(self.url + '?force=true', payload, format='json')
+        self.assertEqual(response.data['skipped'], 0)
+
+    def test_invalid_custom_fields_are_reported_per_row(self):
+        payload = [{"email": "a@test.com", "custom_fields": "abc"}, {"email": "b@test.com"}]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['results']], ['error', 'success'])
+
+    def test_rejects_non_list(self):
+        response = self.client.post(self.url, {"email": "a@test.com"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error_code'], 'INVALID_PAYLOAD')
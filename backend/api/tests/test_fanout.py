@@ -0,0 +1,97 @@
+import threading
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import CRMConfiguration, RemoteRecord
+from core.remote_records import RemoteIndex
+from core.adapters.hubspot_adapter import HubSpotAdapter
+from core.adapters.salesforce_adapter import SalesforceAdapter
+
+User = get_user_model()
+
+class FanOutSyncTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='fanout@test.com', username='fanoutuser', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        CRMConfiguration.objects.create(
+            user=self.user,
+            crm_type='hubspot',
+            auth_config={'access_token': None, 'object_type': 'contacts'},
+            field_mapping={'email': 'email'}
+        )
+        CRMConfiguration.objects.create(
+            user=self.user,
+            crm_type='salesforce',
+            auth_config={'object_name': 'Contact'},
+            field_mapping={'email': 'Email', 'last_name': 'LastName'}
+        )
+        self.contact = {"email": "fan@test.com", "last_name": "Out"}
+
+    def test_pushes_to_every_crm_concurrently(self):
+        # Both pushes must be in flight at once to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def push(remote_id):
+            def side_effect(*args, **kwargs):
+                barrier.wait()
+                return remote_id
+            return side_effect
+
+        with patch.object(HubSpotAdapter, 'push_contact', side_effect=push('hs-1')), \
+                patch.object(SalesforceAdapter, 'push_contact', side_effect=push('003-1')):
+            response = self.client.post('/api/sync/', self.contact, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'success')
+        self.assertEqual(response.data['results']['hubspot']['remote_id'], 'hs-1')
+        self.assertEqual(response.data['results']['salesforce']['remote_id'], '003-1')
+        self.assertEqual(
+            set(RemoteRecord.objects.values_list('crm_type', 'target', 'remote_id')),
+            {('hubspot', 'contacts', 'hs-1'), ('salesforce', 'Contact', '003-1')},
+        )
+
+    @override_settings(SYNC_FANOUT_TIMEOUTS={'salesforce': 0.05})
+    def test_slow_crm_times_out_alone(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with patch.object(HubSpotAdapter, 'push_contact', return_value='hs-1'), \
+                patch.object(SalesforceAdapter, 'push_contact', side_effect=lambda *a, **kw: release.wait(5)):
+            response = self.client.post('/api/sync/', self.contact, format='json')
+
+        self.assertEqual(response.data['status'], 'partial')
+        self.assertEqual(response.data['results']['hubspot']['status'], 'success')
+        self.assertEqual(response.data['results']['salesforce']['error_code'], 'CRM_TIMEOUT')
+        self.assertFalse(RemoteRecord.objects.filter(crm_type='salesforce').exists())
+
+    @override_settings(SYNC_FANOUT_TIMEOUTS={'salesforce': 0.05})
+    def test_late_push_is_recorded_when_it_lands(self):
+        release, landed = threading.Event(), threading.Event()
+        self.addCleanup(release.set)
+        saves = []
+
+        def save(index, contacts, remote_ids, digests):
+            saves.append((index.crm_type, remote_ids))
+            if index.crm_type == 'salesforce':
+                landed.set()
+
+        with patch.object(HubSpotAdapter, 'push_contact', return_value='hs-1'), \
+                patch.object(SalesforceAdapter, 'push_contact', side_effect=lambda *a, **kw: release.wait(5) and '003-late'), \
+                patch.object(RemoteIndex, 'save', autospec=True, side_effect=save):
+            response = self.client.post('/api/sync/', self.contact, format='json')
+            self.assertEqual(response.data['results']['salesforce']['error_code'], 'CRM_TIMEOUT')
+            self.assertEqual(saves, [('hubspot', ['hs-1'])])
+            release.set()
+            self.assertTrue(landed.wait(5))
+        self.assertEqual(saves[-1], ('salesforce', ['003-late']))
+
+    def test_selected_targets(self):
+        with patch.object(SalesforceAdapter, 'push_contact') as salesforce_push:
+            response = self.client.post('/api/sync/?crm=hubspot,pipedrive', self.contact, format='json')
+
+        salesforce_push.assert_not_called()
+        self.assertEqual(response.data['status'], 'partial')
+        self.assertEqual(response.data['results']['hubspot']['remote_id'], 'MOCK_HS_ID_123')
+        self.assertEqual(response.data['results']['pipedrive']['error_code'], 'CONFIGURATION_ERROR')
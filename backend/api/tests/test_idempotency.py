@@ -0,0 +1,102 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import CRMConfiguration, IdempotencyRecord
+from core.idempotency import fingerprint
+from core.adapters.hubspot_adapter import HubSpotAdapter
+
+User = get_user_model()
+
+class IdempotencyTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='idem@test.com', username='idemuser', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        CRMConfiguration.objects.create(
+            user=self.user,
+            crm_type='hubspot',
+            auth_config={'access_token': None, 'object_type': 'contacts'},
+            field_mapping={'email': 'email'}
+        )
+        self.url = '/api/sync/hubspot/'
+        self.payload = {"email": "idem@test.com", "first_name": "Ida"}
+
+    def post(self, payload=None, key='key-1'):
+        return self.client.post(self.url, payload or self.payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeat_is_replayed_without_calling_crm(self):
+        with patch.object(HubSpotAdapter, 'push_contact', return_value='101') as push:
+            first = self.post()
+            second = self.post(payload={"first_name": "Ida", "email": "idem@test.com"})
+
+        self.assertEqual(push.call_count, 1)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+
+    def test_failures_release_the_key(self):
+        with patch.object(HubSpotAdapter, 'push_contact', side_effect=[ValueError("missing field"), '101']) as push:
+            self.assertEqual(self.post().status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(self.post().data['remote_id'], '101')
+        self.assertEqual(push.call_count, 2)
+
+    def test_key_reused_for_other_payload(self):
+        self.post()
+        response = self.post(payload={"email": "other@test.com"})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(response.data['error_code'], 'IDEMPOTENCY_KEY_REUSED')
+
+    def in_flight(self, key):
+        return IdempotencyRecord.objects.create(
+            user=self.user, key=key, fingerprint=fingerprint('hubspot', self.payload, mode='sync', upsert=False, skip=True),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+    @override_settings(SYNC_IDEMPOTENCY_WAIT=0)
+    def test_in_flight_duplicate_times_out(self):
+        self.in_flight('key-1')
+        response = self.post()
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['error_code'], 'IDEMPOTENCY_IN_PROGRESS')
+
+    def test_in_flight_duplicate_waits_for_result(self):
+        record = self.in_flight('key-1')
+
+        def first_request_finishes(seconds):
+            record.status = IdempotencyRecord.STATUS_COMPLETED
+            record.response_status = 200
+            record.response_body = {"status": "success", "crm": "hubspot", "remote_id": "first"}
+            record.save()
+
+        with patch('core.idempotency.time.sleep', side_effect=first_request_finishes), \
+                patch.object(HubSpotAdapter, 'push_contact') as push:
+            response = self.post()
+        push.assert_not_called()
+        self.assertEqual(response.data['remote_id'], 'first')
+
+    @override_settings(SYNC_IDEMPOTENCY_BY_CONTENT=True)
+    def test_content_hash_without_header(self):
+        with patch.object(HubSpotAdapter, 'push_contact', return_value='101') as push:
+            self.client.post(self.url, self.payload, format='json')
+            response = self.client.post(self.url, self.payload, format='json')
+        self.assertEqual(push.call_count, 1)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+
+    def test_expired_records_are_purged(self):
+        self.post()
+        stale = self.in_flight('key-2')
+        IdempotencyRecord.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        expired = self.in_flight('key-3')
+        IdempotencyRecord.objects.filter(pk=expired.pk).update(expires_at=timezone.now())
+
+        out = StringIO()
+        call_command('purge_idempotency', stdout=out)
+        self.assertIn('2 idempotency record(s)', out.getvalue())
+        self.assertEqual(list(IdempotencyRecord.objects.values_list('key', flat=True)), ['key-1'])
@@ -0,0 +1,87 @@
+import csv
+import json
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from core.models import CRMConfiguration
+from core.adapters.base_adapter import PushResult
+from core.adapters.hubspot_adapter import HubSpotAdapter
+
+User = get_user_model()
+
+@override_settings(SYNC_STREAM_CHUNK_SIZE=2)
+class StreamSyncTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='stream@test.com', username='streamuser', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        CRMConfiguration.objects.create(
+            user=self.user,
+            crm_type='hubspot',
+            auth_config={'access_token': None, 'object_type': 'contacts'},
+            field_mapping={'email': 'email'}
+        )
+        self.url = '/api/sync/hubspot/stream/'
+
+    def events(self, response):
+        body = b"".join(response.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_ndjson_is_pushed_in_chunks(self):
+        lines = [json.dumps({"email": f"user{i}@test.com"}) for i in range(3)]
+        lines.insert(1, "{broken")
+        lines.append(json.dumps({"email": "not-an-email"}))
+        pushed = []
+
+        def push(contacts, target=None, upsert=False):
+            pushed.append(len(contacts))
+            return [PushResult(remote_id=contact.email) for contact in contacts]
+
+        with patch.object(HubSpotAdapter, 'push_contacts', side_effect=push):
+            response = self.client.generic('POST', self.url, "\n".join(lines), content_type='application/x-ndjson')
+            events = self.events(response)
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(pushed, [2, 1])
+        errors = [e for e in events if e['event'] == 'error']
+        self.assertEqual([e['line'] for e in errors], [2, 5])
+        self.assertEqual([e['event'] for e in events if e['event'] != 'error'], ['progress', 'progress', 'done'])
+        self.assertEqual(events[-1]['status'], 'partial')
+        self.assertEqual((events[-1]['total'], events[-1]['succeeded'], events[-1]['failed']), (5, 3, 2))
+
+    def test_csv_upload_reports_push_failures(self):
+        body = "email,first_name\na@test.com,Ann\nb@test.com,\n"
+        with patch.object(HubSpotAdapter, 'push_contacts', return_value=[
+            PushResult(remote_id='1'), PushResult(error='rejected'),
+        ]) as push:
+            events = self.events(self.client.generic('POST', self.url, body, content_type='text/csv'))
+        contacts = list(push.call_args.args[0])
+        self.assertEqual(contacts[1].first_name, None)
+        self.assertEqual(events[0], {'event': 'error', 'line': 3, 'error': 'rejected'})
+        self.assertEqual(events[-1]['succeeded'], 1)
+
+    def test_csv_goes_on_after_a_malformed_row(self):
+        self.addCleanup(csv.field_size_limit, csv.field_size_limit(20))
+        body = "email,first_name\na@test.com,Ann\nb@test.com,%s\nc@test.com,Cy\n" % ("x" * 30)
+        with patch.object(HubSpotAdapter, 'push_contacts', return_value=[
+            PushResult(remote_id='1'), PushResult(remote_id='3'),
+        ]) as push:
+            events = self.events(self.client.generic('POST', self.url, body, content_type='text/csv'))
+        self.assertEqual([contact.email for contact in push.call_args.args[0]], ['a@test.com', 'c@test.com'])
+        self.assertEqual(events[0]['line'], 3)
+        self.assertIn('CSV parse error', events[0]['error'])
+        self.assertEqual((events[-1]['status'], events[-1]['total'], events[-1]['failed']), ('partial', 3, 1))
+
+    def test_upload_without_content_length_is_rejected(self):
+        with patch.object(HubSpotAdapter, 'push_contacts') as push:
+            response = self.client.generic('POST', self.url, 'email\na@test.com\n', content_type='text/csv',
+                                           CONTENT_LENGTH='', HTTP_TRANSFER_ENCODING='chunked')
+            empty = self.client.generic('POST', self.url, '', content_type='text/csv', CONTENT_LENGTH='0')
+        push.assert_not_called()
+        self.assertEqual((response.status_code, response.data['error_code']), (411, 'LENGTH_REQUIRED'))
+        self.assertEqual((empty.status_code, empty.data['error_code']), (400, 'EMPTY_BODY'))
+
+    def test_unsupported_media_type(self):
+        response = self.client.post(self.url, [{"email": "a@test.com"}], format='json')
+        self.assertEqual(response.status_code, 415)
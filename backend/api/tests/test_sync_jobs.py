@@ -0,0 +1,98 @@
+from unittest.mock import MagicMock, patch
+import requests
+from celery.exceptions import Retry
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.adapters.circuit_breaker import CircuitOpen
+from core.adapters.hubspot_adapter import HubSpotAdapter
+from core.models import CRMConfiguration, SyncJob
+from core.tasks import push_contact_task, route_task
+
+User = get_user_model()
+
+class SyncJobTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='jobs@test.com', username='jobsuser', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        CRMConfiguration.objects.create(
+            user=self.user,
+            crm_type='hubspot',
+            auth_config={'access_token': None, 'object_type': 'contacts'},
+            field_mapping={'email': 'email'}
+        )
+
+    def test_async_mode_enqueues_job(self):
+        with patch.object(push_contact_task, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/sync/hubspot/?async=true', {"email": "job@test.com"}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = SyncJob.objects.get(pk=response.data['job_id'])
+        self.assertEqual(job.status, SyncJob.STATUS_PENDING)
+        apply_async.assert_called_once_with(kwargs={'job_id': str(job.id), 'crm_type': 'hubspot'})
+
+    def test_task_records_outcome_and_status_endpoint(self):
+        job = SyncJob.objects.create(user=self.user, crm_type='hubspot', payload={"email": "job@test.com"})
+        push_contact_task(job_id=str(job.id), crm_type='hubspot')
+
+        response = self.client.get(f'/api/sync/jobs/{job.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], SyncJob.STATUS_SUCCESS)
+        self.assertEqual(response.data['remote_id'], 'MOCK_HS_ID_123')
+
+    def test_rejected_push_fails_without_retrying(self):
+        job = SyncJob.objects.create(user=self.user, crm_type='hubspot', payload={"email": "job@test.com"})
+        rejected = requests.exceptions.HTTPError(response=MagicMock(status_code=400, text='Property values were not valid'))
+        with patch.object(HubSpotAdapter, 'push_contact', side_effect=rejected), \
+                patch.object(push_contact_task, 'retry') as retry:
+            push_contact_task(job_id=str(job.id), crm_type='hubspot')
+        retry.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (SyncJob.STATUS_FAILED, 'Property values were not valid'))
+
+    def test_throttled_push_is_retried(self):
+        job = SyncJob.objects.create(user=self.user, crm_type='hubspot', payload={"email": "job@test.com"})
+        throttled = requests.exceptions.HTTPError(
+            response=MagicMock(status_code=429, text='slow down', headers={'Retry-After': '90'})
+        )
+        with patch.object(HubSpotAdapter, 'push_contact', side_effect=throttled), \
+                patch.object(push_contact_task, 'retry', side_effect=Retry) as retry:
+            with self.assertRaises(Retry):
+                push_contact_task(job_id=str(job.id), crm_type='hubspot')
+        self.assertEqual(retry.call_args.kwargs['countdown'], 90)
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.STATUS_PENDING)
+
+    def test_open_circuit_fails_fast(self):
+        with patch.object(HubSpotAdapter, 'push_contact', side_effect=CircuitOpen('hubspot', 'api.hubapi.com', 12.4)):
+            response = self.client.post('/api/sync/hubspot/', {"email": "job@test.com"}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data['error_code'], 'CRM_UNAVAILABLE')
+        self.assertEqual(response['Retry-After'], '13')
+        self.assertFalse(SyncJob.objects.exists())
+
+    @override_settings(SYNC_SPILL_WHEN_UNAVAILABLE=True)
+    def test_open_circuit_spills_to_queue(self):
+        with patch.object(HubSpotAdapter, 'push_contact', side_effect=CircuitOpen('hubspot', 'api.hubapi.com', 5)), \
+                patch.object(push_contact_task, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/sync/hubspot/', {"email": "job@test.com"}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(response.data['spilled'])
+        job = SyncJob.objects.get(pk=response.data['job_id'])
+        apply_async.assert_called_once_with(kwargs={'job_id': str(job.id), 'crm_type': 'hubspot'})
+
+    def test_jobs_are_private(self):
+        other = User.objects.create_user(email='other@test.com', username='other', password='password')
+        job = SyncJob.objects.create(user=other, crm_type='hubspot', payload={})
+        response = self.client.get(f'/api/sync/jobs/{job.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_route_per_crm_queue(self):
+        route = route_task('core.tasks.push_contact_task', (), {'job_id': 'x', 'crm_type': 'salesforce'}, {})
+        self.assertEqual(route, {'queue': 'sync.salesforce'})
@@ -1,7 +1,20 @@
 from django.urls import path
-from .views import CRMConfigurationView, SyncContactView
+from .views import (
+    CRMConfigurationView,
+    SyncContactView,
+    SyncFanOutView,
+    SyncContactBatchView,
+    SyncContactStreamView,
+    AsyncSyncContactView,
+    SyncJobView,
+)
 
 urlpatterns = [
     path('config/', CRMConfigurationView.as_view(), name='crm-config'),
+    path('sync/', SyncFanOutView.as_view(), name='sync-fanout'),
+    path('sync/jobs/<uuid:job_id>/', SyncJobView.as_view(), name='sync-job'),
     path('sync/<str:crm_type>/', SyncContactView.as_view(), name='sync-contact'),
+    path('sync/<str:crm_type>/batch/', SyncContactBatchView.as_view(), name='sync-contact-batch'),
+    path('sync/<str:crm_type>/stream/', SyncContactStreamView.as_view(), name='sync-contact-stream'),
+    path('sync/<str:crm_type>/aio/', AsyncSyncContactView.as_view(), name='sync-contact-aio'),
 ]
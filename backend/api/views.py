@@ -1,13 +1,94 @@
+import json
+import math
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import views, status, permissions
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from .serializers import CRMConfigurationSerializer, ContactSerializer
-from core.models import CRMConfiguration
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .parsers import NDJSONParser, iter_csv, iter_ndjson
+from .serializers import CRMConfigurationSerializer, ContactSerializer, SyncJobSerializer
+from core.models import CRMConfiguration, SyncJob
+from core.canonical_model import ContactBatch
+from core import fanout, idempotency, outbox, remote_records
+from core.adapters.circuit_breaker import CircuitOpen
+from core.idempotency import IdempotencyConflict, fingerprint
 from core.services import BrokerService
+from core.tasks import push_contact_task
 import logging
 import requests
 
 logger = logging.getLogger(__name__)
 
+# These read request.GET, so they serve DRF views and the plain async view alike
+
+def _wants_upsert(request) -> bool:
+    """
+    `?upsert=true` updates the record matching the configured `upsert_field` instead of creating one.
+    """
+    return request.GET.get('upsert', '').lower() in ('1', 'true')
+
+
+def _skip_unchanged(request) -> bool:
+    """
+    Contacts unchanged since their last push are skipped unless `?force=true`.
+    """
+    return remote_records.skip_unchanged(request.GET.get('force', '').lower() in ('1', 'true'))
+
+
+def _idempotency_key(request, request_hash: str):
+    """
+    The Idempotency-Key header, else with SYNC_IDEMPOTENCY_BY_CONTENT a key
+    derived from the request itself.
+    """
+    key = request.headers.get('Idempotency-Key')
+    if not key and getattr(settings, 'SYNC_IDEMPOTENCY_BY_CONTENT', False):
+        key = f"content:{request_hash}"
+    return key
+
+
+INVALID_IDEMPOTENCY_KEY = {
+    "status": "error",
+    "error_code": "INVALID_IDEMPOTENCY_KEY",
+    "message": "Idempotency-Key must be at most 255 characters."
+}
+
+
+def _conflict_body(e: IdempotencyConflict) -> tuple:
+    """
+    (status, body) answering an IdempotencyConflict.
+    """
+    status_code = status.HTTP_409_CONFLICT if e.error_code == "IDEMPOTENCY_IN_PROGRESS" else status.HTTP_422_UNPROCESSABLE_ENTITY
+    return status_code, {"status": "error", "error_code": e.error_code, "message": str(e)}
+
+
+def _unavailable_body(e: CircuitOpen) -> dict:
+    """
+    Error body for a CRM whose circuit is open (core.adapters.circuit_breaker).
+    """
+    return {
+        "status": "error",
+        "error_code": "CRM_UNAVAILABLE",
+        "message": str(e),
+        "retry_after": math.ceil(e.retry_in),
+    }
+
+
+def _unavailable(e: CircuitOpen) -> Response:
+    response = Response(_unavailable_body(e), status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(math.ceil(e.retry_in))
+    return response
+
+
 class CRMConfigurationView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -28,50 +109,531 @@ class SyncContactView(views.APIView):
 
     def post(self, request, crm_type):
         serializer = ContactSerializer(data=request.data)
-        if serializer.is_valid():
-            contact = serializer.to_canonical()
-            try:
-                adapter = BrokerService.get_adapter_for_user(request.user, crm_type)
-                # Pass data (Adapter handles target from its own config)
-                result_id = adapter.push_contact(contact)
-                return Response({
-                    "status": "success",
-                    "crm": crm_type,
-                    "remote_id": result_id
-                })
-            except ValueError as e:
-                # Configuration or Data Missing errors (e.g. missing fields)
-                return Response({
-                    "status": "error", 
-                    "error_code": "CONFIGURATION_ERROR",
-                    "message": str(e)
-                }, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        wants_async = self._wants_async(request)
+        upsert = _wants_upsert(request)
+        skip = _skip_unchanged(request)
+
+        def handle():
+            if wants_async:
+                return self._enqueue(request, crm_type, serializer, upsert, skip)
+            return self._push(request, crm_type, serializer, upsert, skip)
+
+        request_hash = fingerprint(
+            crm_type, serializer.validated_data, mode='async' if wants_async else 'sync', upsert=upsert, skip=skip
+        )
+        key = _idempotency_key(request, request_hash)
+        if not key:
+            return handle()
+        if len(key) > 255:
+            return Response(INVALID_IDEMPOTENCY_KEY, status=status.HTTP_400_BAD_REQUEST)
+
+        def outcome():
+            response = handle()
+            return response.status_code, response.data
+
+        try:
+            status_code, data, replayed = idempotency.execute(request.user, key, request_hash, outcome)
+        except IdempotencyConflict as e:
+            status_code, data = _conflict_body(e)
+            return Response(data, status=status_code)
+        response = Response(data, status=status_code)
+        if replayed:
+            response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def _push(self, request, crm_type, serializer, upsert=False, skip=False):
+        contact = serializer.to_canonical()
+        try:
+            adapter = BrokerService.get_adapter_for_user(request.user, crm_type)
+            # Pass data (Adapter handles target from its own config)
+            result = remote_records.push_contact(adapter, request.user, crm_type, contact, upsert=upsert, skip=skip)
+            return Response({
+                "status": "success",
+                "crm": crm_type,
+                "remote_id": result.remote_id,
+                "skipped": result.skipped
+            })
+        except ValueError as e:
+            # Configuration or Data Missing errors (e.g. missing fields)
+            return Response({
+                "status": "error", 
+                "error_code": "CONFIGURATION_ERROR",
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        except CircuitOpen as e:
+            # The CRM is failing; answer now instead of tying up the worker
+            if getattr(settings, 'SYNC_SPILL_WHEN_UNAVAILABLE', False):
+                response = self._enqueue(request, crm_type, serializer, upsert, skip)
+                if response.status_code == status.HTTP_202_ACCEPTED:
+                    response.data["spilled"] = True
+                return response
+            return _unavailable(e)
+
+        except requests.exceptions.RequestException as e:
+            # Upstream API Errors (HubSpot/Monday HTTP errors)
+            error_details = str(e)
+            if e.response is not None:
+                try:
+                    # Try to parse JSON response from CRM
+                    error_details = e.response.json()
+                except ValueError:
+                    error_details = e.response.text
             
-            except requests.exceptions.RequestException as e:
-                # Upstream API Errors (HubSpot/Monday HTTP errors)
-                error_details = str(e)
-                if e.response is not None:
-                    try:
-                        # Try to parse JSON response from CRM
-                        error_details = e.response.json()
-                    except ValueError:
-                        error_details = e.response.text
-                
-                return Response({
-                    "status": "error",
-                    "error_code": "CRM_API_ERROR", 
-                    "message": "The CRM rejected the request.",
-                    "details": error_details
-                }, status=status.HTTP_400_BAD_REQUEST)
+            return Response({
+                "status": "error",
+                "error_code": "CRM_API_ERROR", 
+                "message": "The CRM rejected the request.",
+                "details": error_details
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            # Catch-all for other errors (Salesforce, etc.)
+            # We return 400 because it's usually due to bad input/config
+            logger.error(f"Sync failed: {e}")
+            return Response({
+                "status": "error",
+                "error_code": "SYNC_FAILED",
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    def _wants_async(request) -> bool:
+        return (
+            request.query_params.get('async', '').lower() in ('1', 'true')
+            or 'respond-async' in request.headers.get('Prefer', '')
+        )
+
+    def _enqueue(self, request, crm_type, serializer, upsert=False, skip=False):
+        """
+        Stores the push as a SyncJob and hands it to the CRM's Celery queue,
+        or writes it to the outbox for the dispatchers with SYNC_QUEUE='outbox'.
+        """
+        try:
+            serializer.to_canonical()
+            if not CRMConfiguration.objects.filter(user=request.user, crm_type=crm_type).exists():
+                raise ValueError(f"No configuration found for {crm_type} for user {request.user.username}")
+        except ValueError as e:
+            return Response({
+                "status": "error",
+                "error_code": "CONFIGURATION_ERROR",
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if getattr(settings, 'SYNC_QUEUE', 'celery') == 'outbox':
+            job = outbox.enqueue(request.user, crm_type, serializer.validated_data, upsert=upsert, skip=skip)
+        else:
+            job = SyncJob.objects.create(user=request.user, crm_type=crm_type, payload=serializer.validated_data)
+            task_kwargs = {'job_id': str(job.id), 'crm_type': crm_type}
+            if upsert:
+                task_kwargs['upsert'] = True
+            if not skip:
+                task_kwargs['skip'] = False
+            transaction.on_commit(lambda: push_contact_task.apply_async(kwargs=task_kwargs))
+        return Response({
+            "status": "accepted",
+            "crm": crm_type,
+            "job_id": str(job.id),
+            "status_url": reverse('sync-job', kwargs={'job_id': job.id}),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class SyncFanOutView(views.APIView):
+    """
+    Pushes one contact to every CRM the user has configured, or to those named
+    in `?crm=salesforce,hubspot`, concurrently. Each CRM gets its own timeout
+    (SYNC_FANOUT_TIMEOUTS / SYNC_FANOUT_TIMEOUT) and its own entry in `results`.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = ContactSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        crm_types = [crm.strip() for crm in request.query_params.get('crm', '').split(',') if crm.strip()]
 
+        try:
+            contact = serializer.to_canonical()
+        except ValueError as e:
+            return Response({
+                "status": "error",
+                "error_code": "CONFIGURATION_ERROR",
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        outcomes = fanout.push_to_all(
+            request.user, contact, crm_types or None, upsert=_wants_upsert(request), skip=_skip_unchanged(request)
+        )
+        if not outcomes:
+            return Response({
+                "status": "error",
+                "error_code": "CONFIGURATION_ERROR",
+                "message": f"No CRM configurations found for user {request.user.username}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = {crm_type: self._result(outcome) for crm_type, outcome in outcomes.items()}
+        failed = sum(1 for result in results.values() if result["status"] == "error")
+        return Response({
+            "status": "success" if not failed else "partial" if failed < len(results) else "error",
+            "total": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "results": results,
+        })
+
+    @staticmethod
+    def _result(outcome) -> dict:
+        """
+        One CRM's entry, with the error codes SyncContactView uses.
+        """
+        if not isinstance(outcome, Exception):
+            return {"status": "success", "remote_id": outcome.remote_id, "skipped": outcome.skipped}
+        if isinstance(outcome, fanout.TargetTimeout):
+            return {"status": "error", "error_code": "CRM_TIMEOUT", "message": str(outcome)}
+        if isinstance(outcome, ValueError):
+            return {"status": "error", "error_code": "CONFIGURATION_ERROR", "message": str(outcome)}
+        if isinstance(outcome, CircuitOpen):
+            return _unavailable_body(outcome)
+        if isinstance(outcome, requests.exceptions.RequestException):
+            details = str(outcome)
+            if outcome.response is not None:
+                try:
+                    details = outcome.response.json()
+                except ValueError:
+                    details = outcome.response.text
+            return {
+                "status": "error",
+                "error_code": "CRM_API_ERROR",
+                "message": "The CRM rejected the request.",
+                "details": details
+            }
+        logger.error(f"Fan-out sync failed: {outcome}")
+        return {"status": "error", "error_code": "SYNC_FAILED", "message": str(outcome)}
+
+
+class SyncJobView(views.APIView):
+    """
+    Status of an asynchronous sync job.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(SyncJob, pk=job_id, user=request.user)
+        return Response(SyncJobSerializer(job).data)
+
+class SyncContactBatchView(views.APIView):
+    """
+    Pushes many contacts to one CRM in a single request.
+    Accepts a JSON array, {"contacts": [...]}, or an NDJSON body and returns
+    one result per input record, in input order.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request, crm_type):
+        records = request.data
+        if isinstance(records, dict):
+            records = records.get('contacts')
+        if not isinstance(records, list):
+            return Response({
+                "status": "error",
+                "error_code": "INVALID_PAYLOAD",
+                "message": "Expected a list of contacts."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        max_size = getattr(settings, 'SYNC_BATCH_MAX_SIZE', 10000)
+        if len(records) > max_size:
+            return Response({
+                "status": "error",
+                "error_code": "BATCH_TOO_LARGE",
+                "message": f"A batch may contain at most {max_size} contacts."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            adapter = BrokerService.get_adapter_for_user(request.user, crm_type)
+        except ValueError as e:
+            return Response({
+                "status": "error",
+                "error_code": "CONFIGURATION_ERROR",
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(records)
+        contacts, errors = ContactBatch.from_dicts(records)
+        for index, error in errors.items():
+            results[index] = {"index": index, "status": "error", "remote_id": None, "error": error}
+        positions = [index for index in range(len(records)) if index not in errors]
+
+        if contacts:
+            try:
+                pushed = remote_records.push_contacts(
+                    adapter, request.user, crm_type, contacts,
+                    upsert=_wants_upsert(request), skip=_skip_unchanged(request),
+                )
+            except CircuitOpen as e:
+                return _unavailable(e)
             except Exception as e:
-                # Catch-all for other errors (Salesforce, etc.)
-                # We return 400 because it's usually due to bad input/config
-                logger.error(f"Sync failed: {e}")
+                logger.error(f"Batch sync failed: {e}")
                 return Response({
                     "status": "error",
                     "error_code": "SYNC_FAILED",
                     "message": str(e)
                 }, status=status.HTTP_400_BAD_REQUEST)
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            for index, result in zip(positions, pushed):
+                results[index] = {
+                    "index": index,
+                    "status": "pending" if result.pending else "success" if result.ok else "error",
+                    "remote_id": result.remote_id,
+                    "error": result.error,
+                    "skipped": result.skipped,
+                }
+                if result.pending:
+                    # Left in an asynchronous CRM job (Salesforce Bulk API)
+                    results[index]["job_id"] = result.job_id
+
+        failed = sum(1 for r in results if r["status"] == "error")
+        pending = sum(1 for r in results if r["status"] == "pending")
+        skipped = sum(1 for r in results if r.get("skipped"))
+        return Response({
+            "status": "success" if not failed else "partial" if failed < len(results) else "error",
+            "crm": crm_type,
+            "total": len(results),
+            "succeeded": len(results) - failed - pending,
+            "pending": pending,
+            "failed": failed,
+            "skipped": skipped,
+            "results": results,
+        })
+
+
+class SyncContactStreamView(views.APIView):
+    """
+    Streams a large NDJSON or CSV upload into a CRM.
+    The body is read from the request stream in chunks of SYNC_STREAM_CHUNK_SIZE
+    records; each chunk is validated and pushed before the next one is read, so
+    memory stays flat regardless of upload size. The response is NDJSON with
+    `error` events per rejected line, a `progress` event per chunk and a final
+    `done` event.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    readers = {
+        'application/x-ndjson': iter_ndjson,
+        'text/csv': iter_csv,
+    }
+
+    def post(self, request, crm_type):
+        media_type = (request.content_type or '').split(';')[0].strip().lower()
+        reader = self.readers.get(media_type)
+        if reader is None:
+            return Response({
+                "status": "error",
+                "error_code": "UNSUPPORTED_MEDIA_TYPE",
+                "message": "Send application/x-ndjson or text/csv."
+            }, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        if request.stream is None:
+            # Without a Content-Length (e.g. a chunked upload) the body cannot be read
+            if not request.META.get('CONTENT_LENGTH'):
+                return Response({
+                    "status": "error",
+                    "error_code": "LENGTH_REQUIRED",
+                    "message": "Send the upload with a Content-Length header."
+                }, status=status.HTTP_411_LENGTH_REQUIRED)
+            return Response({
+                "status": "error",
+                "error_code": "EMPTY_BODY",
+                "message": "The upload is empty."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            adapter = BrokerService.get_adapter_for_user(request.user, crm_type)
+        except ValueError as e:
+            return Response({
+                "status": "error",
+                "error_code": "CONFIGURATION_ERROR",
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        records = reader(request.stream, request.encoding or 'utf-8')
+        response = StreamingHttpResponse(
+            (json.dumps(event) + "\n" for event in self._sync(
+                adapter, request.user, crm_type, records, _wants_upsert(request), _skip_unchanged(request)
+            )),
+            content_type='application/x-ndjson',
+        )
+        # Let progress events through reverse proxies as they are produced
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _sync(self, adapter, user, crm_type, records, upsert=False, skip=False):
+        chunk_size = getattr(settings, 'SYNC_STREAM_CHUNK_SIZE', 1000)
+        totals = {"total": 0, "succeeded": 0, "pending": 0, "failed": 0, "skipped": 0}
+
+        def chunks():
+            lines, rows = [], []
+            for line_no, record, error in records:
+                if error:
+                    yield [(line_no, error)], [], []
+                    continue
+                lines.append(line_no)
+                rows.append(record)
+                if len(rows) >= chunk_size:
+                    yield [], lines, rows
+                    lines, rows = [], []
+            if rows:
+                yield [], lines, rows
+
+        try:
+            for parse_errors, lines, rows in chunks():
+                failures = list(parse_errors)
+                batch, errors = ContactBatch.from_dicts(rows)
+                failures.extend((lines[index], error) for index, error in errors.items())
+                pushed_lines = [line for index, line in enumerate(lines) if index not in errors]
+                succeeded = skipped = pending = 0
+                if len(batch):
+                    pushed = remote_records.push_contacts(adapter, user, crm_type, batch, upsert=upsert, skip=skip)
+                    for line_no, result in zip(pushed_lines, pushed):
+                        if result.pending:
+                            pending += 1
+                        elif result.ok:
+                            succeeded += 1
+                            skipped += result.skipped
+                        else:
+                            failures.append((line_no, result.error))
+
+                for line_no, error in sorted(failures, key=lambda failure: failure[0]):
+                    yield {"event": "error", "line": line_no, "error": error}
+                totals["total"] += len(failures) + succeeded + pending
+                totals["succeeded"] += succeeded
+                totals["pending"] += pending
+                totals["skipped"] += skipped
+                totals["failed"] += len(failures)
+                if rows:
+                    yield dict(totals, event="progress")
+        except CircuitOpen as e:
+            yield dict(totals, **_unavailable_body(e), event="done", crm=crm_type)
+            return
+        except Exception as e:
+            logger.error(f"Streaming sync failed: {e}")
+            yield dict(totals, event="done", status="error", crm=crm_type, error_code="SYNC_FAILED", message=str(e))
+            return
+
+        failed = totals["failed"]
+        yield dict(
+            totals,
+            event="done",
+            status="success" if not failed else "partial" if failed < totals["total"] else "error",
+            crm=crm_type,
+        )
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncSyncContactView(View):
+    """
+    Async variant of SyncContactView for ASGI deployments (universal_connector.asgi).
+    The event loop keeps serving other requests while the CRM call is in flight.
+    Validation, `?upsert`, `?force`, Idempotency-Key and skip-unchanged work as
+    on SyncContactView; `?async=true` does not, as there is nothing to offload.
+    """
+    http_method_names = ['post']
+
+    async def post(self, request, crm_type):
+        user = await sync_to_async(self._authenticate)(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return JsonResponse({
+                "status": "error",
+                "error_code": "INVALID_PAYLOAD",
+                "message": "Expected a JSON object."
+            }, status=400)
+        serializer = ContactSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+
+        upsert = _wants_upsert(request)
+        skip = _skip_unchanged(request)
+        request_hash = fingerprint(crm_type, serializer.validated_data, mode='sync', upsert=upsert, skip=skip)
+        key = _idempotency_key(request, request_hash)
+        if not key:
+            return self._respond(*await self._push(user, crm_type, serializer, upsert, skip))
+        if len(key) > 255:
+            return JsonResponse(INVALID_IDEMPOTENCY_KEY, status=400)
+
+        try:
+            status_code, body, replayed = await idempotency.aexecute(
+                user, key, request_hash, lambda: self._push(user, crm_type, serializer, upsert, skip)
+            )
+        except IdempotencyConflict as e:
+            status_code, body = _conflict_body(e)
+            return JsonResponse(body, status=status_code)
+        response = self._respond(status_code, body)
+        if replayed:
+            response['Idempotent-Replayed'] = 'true'
+        return response
+
+    async def _push(self, user, crm_type, serializer, upsert=False, skip=False) -> tuple:
+        """
+        (status, body) of pushing the contact, as SyncContactView._push answers.
+        """
+        try:
+            contact = serializer.to_canonical()
+            adapter = await BrokerService.aget_adapter_for_user(user, crm_type)
+            result = await remote_records.apush_contact(adapter, user, crm_type, contact, upsert=upsert, skip=skip)
+            return 200, {
+                "status": "success",
+                "crm": crm_type,
+                "remote_id": result.remote_id,
+                "skipped": result.skipped
+            }
+        except ValueError as e:
+            return 400, {
+                "status": "error",
+                "error_code": "CONFIGURATION_ERROR",
+                "message": str(e)
+            }
+        except CircuitOpen as e:
+            return 503, _unavailable_body(e)
+        except (httpx.HTTPError, requests.exceptions.RequestException) as e:
+            error_details = str(e)
+            response = getattr(e, 'response', None)
+            if response is not None:
+                try:
+                    error_details = response.json()
+                except ValueError:
+                    error_details = response.text
+            return 400, {
+                "status": "error",
+                "error_code": "CRM_API_ERROR",
+                "message": "The CRM rejected the request.",
+                "details": error_details
+            }
+        except Exception as e:
+            logger.error(f"Async sync failed: {e}")
+            return 400, {
+                "status": "error",
+                "error_code": "SYNC_FAILED",
+                "message": str(e)
+            }
+
+    @staticmethod
+    def _respond(status_code: int, body: dict) -> JsonResponse:
+        response = JsonResponse(body, status=status_code)
+        if body.get("error_code") == "CRM_UNAVAILABLE":
+            response['Retry-After'] = str(body["retry_after"])
+        return response
+
+    @staticmethod
+    def _authenticate(request):
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        return result[0] if result else None
@@ -1,2 +1,2 @@
-from .base_adapter import BaseAdapter
+from .base_adapter import BaseAdapter, PushResult
 from .salesforce_adapter import SalesforceAdapter
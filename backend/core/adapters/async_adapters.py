@@ -0,0 +1,366 @@
+import asyncio
+import json
+from typing import List, Dict, Any, Optional, Sequence
+import httpx
+from .async_base_adapter import AsyncBaseAdapter
+from .base_adapter import BaseAdapter, PushResult
+from .hubspot_adapter import HubSpotAdapter
+from .monday_adapter import MondayAdapter, MondayAPIError, _graphql_data, _item_missing
+from .pipedrive_adapter import PipedriveAdapter, _search_hit
+from .dynamics_adapter import DynamicsAdapter, _entity_guid
+from .token_store import token_store
+from ..canonical_model import Contact
+
+# Async adapters reuse the sync adapters for configuration and field mapping;
+# only the network I/O differs.
+
+class AsyncHubSpotAdapter(AsyncBaseAdapter):
+    CRM_TYPE = HubSpotAdapter.CRM_TYPE
+    CREDENTIAL_FIELDS = HubSpotAdapter.CREDENTIAL_FIELDS
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.sync = HubSpotAdapter(config)
+
+    async def authenticate(self) -> bool:
+        return self.sync.authenticate()
+
+    async def fetch_contacts(self) -> List[Contact]:
+        return await asyncio.to_thread(self.sync.fetch_contacts)
+
+    async def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
+        object_type = target if target else self.sync.object_type
+        if not object_type:
+             raise ValueError("HubSpot Object Type not provided in Configuration.")
+
+        properties = self.sync._build_properties(contact)
+        if upsert:
+            id_property, value = self.sync._upsert_key(properties)
+
+        if not self.sync.access_token:
+            print(f"[MOCK] Pushing to HubSpot ({object_type}): {properties}")
+            return "MOCK_HS_ID_123"
+
+        if upsert:
+            # HubSpot only exposes upsert-by-property as a batch endpoint
+            url = f"{self.sync.API_BASE_URL}/{object_type}/batch/upsert"
+            body = {"inputs": [{"id": str(value), "idProperty": id_property, "properties": properties}]}
+        else:
+            url = f"{self.sync.API_BASE_URL}/{object_type}"
+            body = {"properties": properties}
+        response = await self._request("POST", url, json=body, headers=self.sync._headers())
+        if response.is_error:
+            print(f"HubSpot API Error: {response.text}")
+        response.raise_for_status()
+        data = response.json()
+        return data['results'][0]['id'] if upsert else data['id']
+
+    async def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        object_type = target if target else self.sync.object_type
+        if not object_type:
+             raise ValueError("HubSpot Object Type not provided in Configuration.")
+
+        properties = self.sync._build_properties(contact)
+        if not self.sync.access_token:
+            print(f"[MOCK] Updating HubSpot {object_type} {remote_id}: {properties}")
+            return remote_id
+
+        response = await self._request(
+            "PATCH", f"{self.sync.API_BASE_URL}/{object_type}/{remote_id}", json={"properties": properties},
+            headers=self.sync._headers()
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return str(response.json().get("id", remote_id))
+
+
+class AsyncMondayAdapter(AsyncBaseAdapter):
+    CRM_TYPE = MondayAdapter.CRM_TYPE
+    CREDENTIAL_FIELDS = MondayAdapter.CREDENTIAL_FIELDS
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.sync = MondayAdapter(config)
+
+    async def authenticate(self) -> bool:
+        return self.sync.authenticate()
+
+    async def fetch_contacts(self) -> List[Contact]:
+        return await asyncio.to_thread(self.sync.fetch_contacts)
+
+    async def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
+        target_board_id = target if target else self.sync.board_id
+        if not target_board_id:
+             raise ValueError("Monday Board ID not provided in URL or Config.")
+
+        item_name, column_values = self.sync._build_item(contact)
+        if upsert:
+            # 'name' addresses the item name, anything else a column id
+            column, value = self.sync._upsert_key(dict(column_values, name=item_name))
+
+        if not self.sync.api_token:
+            print(f"[MOCK] Pushing to Monday Board {target_board_id}: {item_name}, Cols: {column_values}")
+            return "MOCK_MON_ITEM_123"
+
+        if upsert:
+            return await self._upsert_item(target_board_id, column, value, item_name, column_values)
+
+        variables = {
+            "board_id": int(target_board_id),
+            "item_name": item_name,
+            "column_values": json.dumps(column_values, default=str)
+        }
+        return (await self._query(self.sync.CREATE_ITEM_QUERY, variables))['create_item']['id']
+
+    async def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        board_id = target if target else self.sync.board_id
+        if not board_id:
+             raise ValueError("Monday Board ID not provided in URL or Config.")
+
+        item_name, column_values = self.sync._build_item(contact)
+        if not self.sync.api_token:
+            print(f"[MOCK] Updating Monday item {remote_id} on Board {board_id}: {item_name}")
+            return remote_id
+
+        try:
+            await self._query(self.sync.UPDATE_ITEM_QUERY, {
+                "board_id": str(board_id),
+                "item_id": remote_id,
+                "column_values": json.dumps(dict(column_values, name=item_name), default=str),
+            })
+        except MondayAPIError as e:
+            if _item_missing(e.errors):
+                return None
+            raise
+        return remote_id
+
+    async def _query(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        headers = {
+            "Authorization": self.sync.api_token,
+            "Content-Type": "application/json"
+        }
+        response = await self._request("POST", self.sync.API_URL, json={'query': query, 'variables': variables}, headers=headers)
+        response.raise_for_status()
+        return _graphql_data(response.json())
+
+    async def _upsert_item(self, board_id, column: str, value: Any, item_name: str, column_values: Dict[str, Any]) -> str:
+        """
+        MondayAdapter._upsert_item; the remote ID cache is read and written off the event loop.
+        """
+        scope = (self.sync.api_token, board_id, column, value)
+        update = {
+            "board_id": str(board_id),
+            "column_values": json.dumps(dict(column_values, name=item_name), default=str),
+        }
+
+        item_id = await asyncio.to_thread(self.sync._cached_remote_id, *scope)
+        if item_id is not None:
+            try:
+                await self._query(self.sync.UPDATE_ITEM_QUERY, dict(update, item_id=item_id))
+                return item_id
+            except MondayAPIError as e:
+                if not _item_missing(e.errors):
+                    raise
+                # Deleted on the board since it was cached
+                await asyncio.to_thread(self.sync._forget_remote_id, *scope)
+
+        found = (await self._query(self.sync.FIND_ITEM_QUERY, {
+            "board_id": str(board_id),
+            "column_id": column,
+            "value": str(value),
+        }))["items_page_by_column_values"]["items"]
+        if found:
+            item_id = found[0]["id"]
+            await self._query(self.sync.UPDATE_ITEM_QUERY, dict(update, item_id=item_id))
+        else:
+            item_id = (await self._query(self.sync.CREATE_ITEM_QUERY, {
+                "board_id": int(board_id),
+                "item_name": item_name,
+                "column_values": json.dumps(column_values, default=str),
+            }))["create_item"]["id"]
+        await asyncio.to_thread(self.sync._remember_remote_id, item_id, *scope)
+        return item_id
+
+
+class AsyncPipedriveAdapter(AsyncBaseAdapter):
+    CRM_TYPE = PipedriveAdapter.CRM_TYPE
+    CREDENTIAL_FIELDS = PipedriveAdapter.CREDENTIAL_FIELDS
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.sync = PipedriveAdapter(config)
+
+    async def authenticate(self) -> bool:
+        return self.sync.authenticate()
+
+    async def fetch_contacts(self) -> List[Contact]:
+        return await asyncio.to_thread(self.sync.fetch_contacts)
+
+    async def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
+        endpoint = target if target else self.sync.object_type
+        if not endpoint:
+             raise ValueError("Pipedrive Object Type (e.g. 'persons') not provided in keys.")
+
+        if not self.sync.api_token:
+            print(f"[MOCK] Pushing to Pipedrive ({endpoint}).")
+            return "MOCK_PD_ID_456"
+
+        payload = self.sync._build_payload(contact)
+        url = f"{self.sync.API_BASE_URL}/{endpoint}"
+        if upsert:
+            return await self._upsert(url, payload)
+        response = await self._request("POST", url, params={"api_token": self.sync.api_token}, json=payload)
+        if response.is_error:
+            print(f"Pipedrive API Error: {response.text}")
+        response.raise_for_status()
+        return str(response.json().get('data', {}).get('id', 'UNKNOWN'))
+
+    async def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        endpoint = target if target else self.sync.object_type
+        if not endpoint:
+             raise ValueError("Pipedrive Object Type (e.g. 'persons') not provided in keys.")
+
+        if not self.sync.api_token:
+            print(f"[MOCK] Updating Pipedrive ({endpoint}) {remote_id}.")
+            return remote_id
+
+        payload = self.sync._build_payload(contact)
+        response = await self._request(
+            "PUT", f"{self.sync.API_BASE_URL}/{endpoint}/{remote_id}", params={"api_token": self.sync.api_token},
+            json=payload
+        )
+        if response.status_code in (404, 410):
+            return None
+        response.raise_for_status()
+        return remote_id
+
+    async def _upsert(self, url: str, payload: Dict[str, Any]) -> str:
+        """
+        PipedriveAdapter._upsert; the remote ID cache is read and written off the event loop.
+        """
+        field, value = self.sync._upsert_key(payload)
+        scope = (self.sync.api_token, url, field, value)
+        params = {"api_token": self.sync.api_token}
+
+        remote_id = await asyncio.to_thread(self.sync._cached_remote_id, *scope)
+        if remote_id is not None:
+            response = await self._request("PUT", f"{url}/{remote_id}", params=params, json=payload)
+            if response.status_code not in (404, 410):
+                response.raise_for_status()
+                return remote_id
+            # Deleted in Pipedrive since it was cached
+            await asyncio.to_thread(self.sync._forget_remote_id, *scope)
+
+        response = await self._request("GET", f"{url}/search", params=self.sync._search_params(field, value))
+        response.raise_for_status()
+        remote_id = _search_hit(response.json())
+        if remote_id is None:
+            response = await self._request("POST", url, params=params, json=payload)
+        else:
+            response = await self._request("PUT", f"{url}/{remote_id}", params=params, json=payload)
+        response.raise_for_status()
+        remote_id = str(response.json()["data"]["id"])
+        await asyncio.to_thread(self.sync._remember_remote_id, remote_id, *scope)
+        return remote_id
+
+
+class AsyncDynamicsAdapter(AsyncBaseAdapter):
+    CRM_TYPE = DynamicsAdapter.CRM_TYPE
+    CREDENTIAL_FIELDS = DynamicsAdapter.CREDENTIAL_FIELDS
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.sync = DynamicsAdapter(config)
+
+    async def _access_token(self) -> str:
+        # The token store is thread-based; refreshes are rare, so run them off the loop
+        return await asyncio.to_thread(self.sync._get_access_token)
+
+    async def authenticate(self) -> bool:
+        return await asyncio.to_thread(self.sync.authenticate)
+
+    async def fetch_contacts(self) -> List[Contact]:
+        return await asyncio.to_thread(self.sync.fetch_contacts)
+
+    async def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
+        entity_set_name = target if target else self.sync.object_type
+        if not entity_set_name:
+             raise ValueError("Dynamics Entity Set Name (e.g. 'contacts') not provided.")
+
+        if not (self.sync.client_id and self.sync.client_secret):
+             print(f"[MOCK] Pushing to Dynamics ({entity_set_name})")
+             return "MOCK_DYN_GUID_123"
+
+        payload = self.sync._build_payload(contact)
+        method, url = self.sync._record_request(entity_set_name, payload, upsert)
+        response = await self._send(method, url, payload, {"Prefer": "return=representation"})
+        if response.is_error:
+            print(f"Dynamics API Error: {response.text}")
+        response.raise_for_status()
+        remote_id = _entity_guid(response.headers.get('OData-EntityId'))
+        if remote_id is None:
+            # The metadata lookup is cached after the first call
+            primary_key = await asyncio.to_thread(self.sync._primary_key, entity_set_name)
+            remote_id = response.json().get(primary_key)
+        return str(remote_id) if remote_id is not None else None
+
+    async def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        entity_set_name = target if target else self.sync.object_type
+        if not entity_set_name:
+             raise ValueError("Dynamics Entity Set Name (e.g. 'contacts') not provided.")
+
+        payload = self.sync._build_payload(contact)
+        if not (self.sync.client_id and self.sync.client_secret):
+            print(f"[MOCK] Updating Dynamics ({entity_set_name}) {remote_id}")
+            return remote_id
+
+        # If-Match: * turns the PATCH into a pure update; Dataverse would otherwise create the record
+        url = f"{self.sync._api_base()}/{entity_set_name}({remote_id})"
+        response = await self._send("PATCH", url, payload, {"If-Match": "*"})
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return remote_id
+
+    async def _send(self, method: str, url: str, payload: Dict[str, Any], headers: Dict[str, str]) -> httpx.Response:
+        """
+        Sends a JSON Web API request with a fresh token, retrying once on 401.
+        """
+        headers = {
+            **headers,
+            "Authorization": f"Bearer {await self._access_token()}",
+            "Content-Type": "application/json",
+        }
+        response = await self._request(method, url, json=payload, headers=headers)
+        if response.status_code == 401:
+            token_store.invalidate(self.sync._token_key)
+            headers["Authorization"] = f"Bearer {await self._access_token()}"
+            response = await self._request(method, url, json=payload, headers=headers)
+        return response
+
+
+class ThreadedAdapter(AsyncBaseAdapter):
+    """
+    Runs a sync adapter in worker threads, for CRMs without an async implementation
+    (Salesforce goes through simple_salesforce).
+    """
+
+    def __init__(self, adapter: BaseAdapter):
+        super().__init__(adapter.config)
+        self.sync = adapter
+
+    async def authenticate(self) -> bool:
+        return await asyncio.to_thread(self.sync.authenticate)
+
+    async def fetch_contacts(self) -> List[Contact]:
+        return await asyncio.to_thread(self.sync.fetch_contacts)
+
+    async def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
+        return await asyncio.to_thread(self.sync.push_contact, contact, target, upsert=upsert)
+
+    async def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        return await asyncio.to_thread(self.sync.update_contact, remote_id, contact, target)
+
+    async def push_contacts(self, contacts: Sequence[Contact], target: str = None, upsert: bool = False) -> List[PushResult]:
+        return await asyncio.to_thread(self.sync.push_contacts, contacts, target, upsert=upsert)
@@ -0,0 +1,97 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import httpx
+from .async_http import client_for
+from .base_adapter import BaseAdapter, PushResult
+from .rate_limit import credential_key
+from .retry import asend_with_retries
+from ..canonical_model import Contact
+
+class AsyncBaseAdapter(ABC):
+    """
+    Abstract base class for asyncio CRM adapters.
+    Mirrors BaseAdapter so async views can hold many CRM calls in flight per process.
+    Only pushes are native; reads page through the sync adapter (`sync`) in a
+    worker thread, as nothing reads from an async view.
+    """
+    # Upper bound on concurrent requests issued by one push_contacts call
+    MAX_CONCURRENCY = 20
+    # Shared with the sync adapter, so both draw from the same rate-limit bucket
+    CRM_TYPE: str = None
+    CREDENTIAL_FIELDS: Tuple[str, ...] = ()
+    # The sync adapter for the same configuration; supplies field mapping and the remote ID cache
+    sync: BaseAdapter = None
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize with configuration dictionary (from CRMConfiguration.auth_config).
+        """
+        self.config = config
+        self.rate_limit_key = credential_key(self.CRM_TYPE or type(self).__name__, config, self.CREDENTIAL_FIELDS)
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends an HTTP request through the pooled async client for the URL's host,
+        paced by the rate limiter, retried per the CRM's retry policy and
+        short-circuited while the host's circuit is open.
+        """
+        client = client_for(url)
+        return await asend_with_retries(
+            self.CRM_TYPE, self.rate_limit_key, method, url, lambda: client.request(method, url, **kwargs)
+        )
+
+    @abstractmethod
+    async def authenticate(self) -> bool:
+        """
+        Authenticates with the CRM.
+        """
+        pass
+
+    @abstractmethod
+    async def fetch_contacts(self) -> List[Contact]:
+        """
+        Fetches contacts from the CRM. Implementations run the sync adapter's
+        paging in a worker thread.
+        """
+        pass
+
+    @abstractmethod
+    async def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
+        """
+        Pushes a unified Contact to the CRM.
+        :param upsert: Update the record matching `upsert_field` instead of always creating one.
+        :return: The ID of the created/updated record in the CRM.
+        """
+        pass
+
+    async def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        """
+        Overwrites the record `remote_id` (known from RemoteRecord) with `contact`.
+        :return: The record's ID, or None when it no longer exists in the CRM.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot update records by ID.")
+
+    async def push_contacts(self, contacts: Sequence[Contact], target: str = None, upsert: bool = False) -> List[PushResult]:
+        """
+        Pushes many Contacts concurrently and returns one PushResult per input, in input order.
+        """
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+
+        async def push(contact: Contact) -> PushResult:
+            async with semaphore:
+                try:
+                    return PushResult(remote_id=await self.push_contact(contact, target, upsert=upsert))
+                except Exception as e:
+                    return PushResult.failed(e)
+
+        return list(await asyncio.gather(*(push(contact) for contact in contacts)))
+
+    def mapped_payload(self, contact: Contact, target: str = None) -> Dict[str, Any]:
+        return self.sync.mapped_payload(contact, target)
+
+    def prime_remote_id(self, contact: Contact, remote_id: str, target: str = None) -> None:
+        """
+        BaseAdapter.prime_remote_id; writes the cache, so call it off the event loop.
+        """
+        self.sync.prime_remote_id(contact, remote_id, target)
@@ -0,0 +1,47 @@
+import asyncio
+import weakref
+from typing import Dict
+from urllib.parse import urlsplit
+import httpx
+from django.conf import settings
+
+# httpx clients are bound to the event loop that created them
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+
+
+def build_client() -> httpx.AsyncClient:
+    """
+    Creates a keep-alive async client configured from the CRM_HTTP_* settings.
+    Transport retries only cover connection failures, matching the sync sessions.
+    """
+    pool_size = getattr(settings, "CRM_HTTP_POOL_SIZE", 20)
+    timeout = httpx.Timeout(
+        getattr(settings, "CRM_HTTP_READ_TIMEOUT", 30),
+        connect=getattr(settings, "CRM_HTTP_CONNECT_TIMEOUT", 5),
+    )
+    transport = httpx.AsyncHTTPTransport(retries=getattr(settings, "CRM_HTTP_MAX_RETRIES", 2))
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        transport=transport,
+    )
+
+
+def client_for(url: str) -> httpx.AsyncClient:
+    """
+    Returns the shared async client for the URL's host on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    clients = _clients.setdefault(loop, {})
+    client = clients.get(host)
+    if client is None or client.is_closed:
+        client = clients[host] = build_client()
+    return client
+
+
+async def close_clients() -> None:
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
@@ -1,17 +1,90 @@
+import hashlib
+import logging
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from pydantic import BaseModel
+from .http import session_for
+from .rate_limit import credential_key
+from .retry import send_with_retries, transient_wait
 from ..canonical_model import Contact
 
+logger = logging.getLogger(__name__)
+
+class PushResult(BaseModel):
+    """
+    Outcome of pushing a single record as part of a bulk push.
+    """
+    remote_id: Optional[str] = None
+    error: Optional[str] = None
+    # Not sent: the CRM already holds this exact payload (see core.remote_records)
+    skipped: bool = False
+    # Set when the CRM did not apply the push and it may succeed if sent
+    # again after this many seconds (see core.adapters.retry.transient_wait)
+    retry_in: Optional[float] = None
+    # Accepted into an asynchronous CRM job whose outcome is not known yet;
+    # core.tasks.collect_push_job_task reads it with BaseAdapter.job_results
+    job_id: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def pending(self) -> bool:
+        return self.ok and self.job_id is not None and self.remote_id is None
+
+    @property
+    def retryable(self) -> bool:
+        return self.error is not None and self.retry_in is not None
+
+    @classmethod
+    def failed(cls, exc: Exception) -> "PushResult":
+        # HTTP errors (requests or httpx) carry the CRM's explanation in the body
+        response = getattr(exc, 'response', None)
+        if response is not None:
+            return cls(error=response.text or str(exc), retry_in=transient_wait(exc))
+        return cls(error=str(exc), retry_in=transient_wait(exc))
+
+    @classmethod
+    def rejected(cls, response) -> "PushResult":
+        """
+        A whole call answered with an error status.
+        """
+        return cls(error=response.text, retry_in=transient_wait(response=response))
+
 class BaseAdapter(ABC):
     """
     Abstract base class for all CRM adapters.
     """
+    # Name of the CRM and the auth_config fields identifying one credential;
+    # requests are rate limited per (CRM, credential)
+    CRM_TYPE: str = None
+    CREDENTIAL_FIELDS: Tuple[str, ...] = ()
 
     def __init__(self, config: Dict[str, Any]):
         """
         Initialize with configuration dictionary (from CRMConfiguration.auth_config).
         """
         self.config = config
+        # CRM field identifying an existing record in upsert mode, e.g. 'Email'
+        self.upsert_field = config.get("upsert_field")
+        self.rate_limit_key = credential_key(self.CRM_TYPE or type(self).__name__, config, self.CREDENTIAL_FIELDS)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends an HTTP request through the pooled keep-alive session for the URL's host,
+        paced by the rate limiter for this adapter's credential and retried on
+        transient failures per the CRM's retry policy (core.adapters.retry).
+        Raises CircuitOpen without sending while the host's circuit is open.
+        """
+        session = session_for(url)
+        return send_with_retries(
+            self.CRM_TYPE, self.rate_limit_key, method, url, lambda: session.request(method, url, **kwargs)
+        )
 
     @abstractmethod
     def authenticate(self) -> bool:
@@ -20,19 +93,157 @@ class BaseAdapter(ABC):
         """
         pass
 
-    @abstractmethod
     def fetch_contacts(self) -> List[Contact]:
         """
         Fetches contacts from the CRM.
+        Loads every page into memory; prefer iter_contacts for large CRMs.
+        """
+        return list(self.iter_contacts())
+
+    @abstractmethod
+    def iter_contacts(self, page_size: int = 100, since: Optional[datetime] = None) -> Iterator[Contact]:
+        """
+        Streams contacts from the CRM, following its pagination one page at a time.
+        :param page_size: Records requested per page (capped at the CRM's maximum).
+        :param since: Only yield records modified after this moment.
         """
         pass
 
+    def _contacts_from_page(self, rows: List[Dict[str, Any]], since: Optional[datetime] = None) -> Iterator[Contact]:
+        """
+        Validates one page of fetched records. Records that fail validation are
+        logged and skipped; with `since`, records not modified after it are dropped
+        (for CRMs without a server-side modified filter).
+        """
+        contacts, errors = Contact.from_dicts(rows)
+        for index, error in errors.items():
+            logger.warning(f"Skipping CRM record {rows[index].get('id')}: {error}")
+        for contact in contacts:
+            if contact is None:
+                continue
+            if since is not None and not _modified_after(contact, since):
+                continue
+            yield contact
+
     @abstractmethod
-    def push_contact(self, contact: Contact, target: str = None) -> str:
+    def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
         """
         Pushes a unified Contact to the CRM.
         :param contact: The unified contact object.
         :param target: Optional target entity (e.g. Board ID, Object Name).
+        :param upsert: Update the record matching `upsert_field` instead of always creating one.
         :return: The ID of the created/updated record in the CRM.
         """
         pass
+
+    def push_contacts(self, contacts: Sequence[Contact], target: str = None, upsert: bool = False) -> List[PushResult]:
+        """
+        Pushes many Contacts and returns one PushResult per input, in input order.
+        The default pushes records one by one; adapters override this with the
+        CRM's native bulk API where one exists.
+        """
+        results = []
+        for contact in contacts:
+            try:
+                results.append(PushResult(remote_id=self.push_contact(contact, target, upsert=upsert)))
+            except Exception as e:
+                results.append(PushResult.failed(e))
+        return results
+
+    def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        """
+        Overwrites the record `remote_id` (known from RemoteRecord) with `contact`.
+        :return: The record's ID, or None when it no longer exists in the CRM.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot update records by ID.")
+
+    def update_contacts(self, updates: Sequence[Tuple[str, Contact]], target: str = None) -> List[Optional[PushResult]]:
+        """
+        update_contact for many (remote ID, contact) pairs, in input order.
+        None marks a record that no longer exists in the CRM. The default
+        updates records one by one; adapters with a bulk API override it.
+        """
+        results = []
+        for remote_id, contact in updates:
+            try:
+                updated = self.update_contact(remote_id, contact, target)
+                results.append(None if updated is None else PushResult(remote_id=updated))
+            except Exception as e:
+                results.append(PushResult.failed(e))
+        return results
+
+    def push_calls(self, creates: int, updates: int, upsert: bool = False) -> int:
+        """
+        Most CRM calls push_contacts makes for `creates` records plus
+        update_contacts for `updates`; callers that must finish within a
+        deadline (the outbox lease) size their batches by it. The defaults
+        push and update one record per call.
+        """
+        return creates + updates
+
+    def job_results(self, job_id: str, records: List[Dict[str, Any]]) -> Optional[List[PushResult]]:
+        """
+        Outcome of an asynchronous push job (PushResult.job_id) for each of
+        `records`, the mapped payloads in the order they were pushed, or None
+        while the job is still running. Checks the job once and never waits.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not run asynchronous push jobs")
+
+    def _upsert_key(self, payload: Dict[str, Any]) -> Tuple[str, Any]:
+        """
+        (CRM field, value) identifying the record to update, read from the mapped payload.
+        """
+        if not self.upsert_field:
+            raise ValueError("Upsert mode requires 'upsert_field' in the CRM configuration.")
+        value = payload.get(self.upsert_field)
+        if value in (None, ""):
+            raise ValueError(f"Upsert field '{self.upsert_field}' has no value.")
+        return self.upsert_field, value
+
+    def mapped_payload(self, contact: Contact, target: str = None) -> Dict[str, Any]:
+        """
+        The fields `contact` is sent to the CRM with, after field mapping.
+        Used to detect contacts that have not changed since their last push.
+        """
+        return self.mapping_plan.project(contact)
+
+    def prime_remote_id(self, contact: Contact, remote_id: str, target: str = None) -> None:
+        """
+        Hint that `contact` was last pushed as `remote_id` (from RemoteRecord).
+        Adapters that search before updating seed their lookup cache with it;
+        native upserts need no hint, so the default does nothing.
+        """
+        pass
+
+    # Remote ID lookup cache for CRMs without native upsert (search-then-update).
+    # Scopes include the credentials, so tenants never share entries.
+
+    def _cached_remote_id(self, *scope: Any) -> Optional[str]:
+        return cache.get(_remote_id_key(scope))
+
+    def _remember_remote_id(self, remote_id: str, *scope: Any) -> None:
+        cache.set(_remote_id_key(scope), remote_id, getattr(settings, 'CRM_REMOTE_ID_CACHE_TTL', 86400))
+
+    def _forget_remote_id(self, *scope: Any) -> None:
+        cache.delete(_remote_id_key(scope))
+
+
+def _remote_id_key(scope: tuple) -> str:
+    digest = hashlib.sha256("\x1f".join(str(part) for part in scope).encode("utf-8")).hexdigest()
+    return f"crm-remote-id:{digest}"
+
+
+def as_utc(value: datetime) -> datetime:
+    """
+    Aware UTC datetime; naive values are taken as UTC, which is what CRMs
+    without an offset in their timestamps report.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _modified_after(contact: Contact, since: datetime) -> bool:
+    if contact.updated_at is None:
+        return True
+    return as_utc(contact.updated_at) > as_utc(since)
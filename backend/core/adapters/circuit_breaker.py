@@ -0,0 +1,253 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+import requests
+from django.conf import settings
+from .rate_limit import SharedRedis, shared_redis
+
+try:
+    import redis
+except ImportError:  # Optional: without it every process keeps its own circuits
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of LocalCircuits.allow and ALLOW_SCRIPT
+REJECT, ALLOW, PROBE = 0, 1, 2
+
+# Failures that say the CRM is down or overloaded, as opposed to rejecting our data
+OUTAGE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, httpx.TransportError)
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    """
+    Calls to this CRM host are short-circuited after too many recent failures.
+    """
+
+    def __init__(self, crm: str, host: str, retry_in: float):
+        super().__init__(f"{crm} is unavailable at {host}; calls resume in {retry_in:.0f}s.")
+        self.crm = crm
+        self.host = host
+        self.retry_in = retry_in
+
+
+def circuit_key(crm: Optional[str], url: str) -> str:
+    return f"{crm or 'default'}:{urlsplit(url).netloc.lower()}"
+
+
+def is_failure(elapsed: float, response=None, exc: Exception = None) -> bool:
+    """
+    Whether a call counts against the circuit: connection failures and
+    timeouts, 5xx responses, and calls slower than CRM_CIRCUIT_SLOW_CALL seconds.
+    """
+    if exc is not None:
+        return isinstance(exc, OUTAGE_ERRORS)
+    status = response.status_code
+    if isinstance(status, int) and status >= 500:
+        return True
+    return elapsed >= getattr(settings, 'CRM_CIRCUIT_SLOW_CALL', 10)
+
+
+def _thresholds() -> Tuple[float, int, float, float]:
+    return (
+        float(getattr(settings, 'CRM_CIRCUIT_WINDOW', 60)),
+        int(getattr(settings, 'CRM_CIRCUIT_MIN_CALLS', 20)),
+        float(getattr(settings, 'CRM_CIRCUIT_FAILURE_RATE', 0.5)),
+        float(getattr(settings, 'CRM_CIRCUIT_COOLDOWN', 30)),
+    )
+
+
+class LocalCircuits:
+    """
+    In-process circuit state, used without Redis or while it is unreachable.
+    Each circuit counts calls and failures over a fixed window; once open it
+    rejects calls until `open_until`, then lets one probe through at a time.
+    """
+
+    def __init__(self):
+        self._circuits: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str, cooldown: float) -> Tuple[int, float]:
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None or not circuit['open_until']:
+                return ALLOW, 0.0
+            if now < circuit['open_until']:
+                return REJECT, circuit['open_until'] - now
+            if now < circuit['probe_until']:
+                return REJECT, circuit['probe_until'] - now
+            # A probe that never reports back frees the slot after the cooldown
+            circuit['probe_until'] = now + cooldown
+            return PROBE, 0.0
+
+    def record(self, key: str, failed: bool, probe: bool, window: float, min_calls: int,
+               failure_rate: float, cooldown: float) -> Optional[str]:
+        """
+        Counts one call and returns 'open' or 'closed' when the circuit changed state.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if probe:
+                if not failed:
+                    self._circuits.pop(key, None)
+                    return 'closed'
+                self._circuits[key] = self._fresh(now, open_until=now + cooldown)
+                return 'open'
+            circuit = self._circuits.get(key)
+            if circuit is None or now - circuit['start'] >= window:
+                open_until = circuit['open_until'] if circuit else 0.0
+                circuit = self._circuits[key] = self._fresh(now, open_until)
+            circuit['calls'] += 1
+            circuit['failures'] += failed
+            if (not circuit['open_until'] and circuit['calls'] >= min_calls
+                    and circuit['failures'] / circuit['calls'] >= failure_rate):
+                circuit['open_until'] = now + cooldown
+                return 'open'
+            return None
+
+    @staticmethod
+    def _fresh(now: float, open_until: float = 0.0) -> dict:
+        return {'start': now, 'calls': 0, 'failures': 0, 'open_until': open_until, 'probe_until': 0.0}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._circuits.clear()
+
+
+# Same state machine as LocalCircuits, run atomically in Redis on the server clock.
+_NOW = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+"""
+
+# ARGV[1] = cooldown
+ALLOW_SCRIPT = _NOW + """
+local c = redis.call('HMGET', KEYS[1], 'open_until', 'probe_until')
+local open_until = tonumber(c[1]) or 0
+if open_until == 0 then return {1, '0'} end
+if now < open_until then return {0, tostring(open_until - now)} end
+local probe_until = tonumber(c[2]) or 0
+if now < probe_until then return {0, tostring(probe_until - now)} end
+redis.call('HSET', KEYS[1], 'probe_until', now + tonumber(ARGV[1]))
+return {2, '0'}
+"""
+
+# ARGV = failed (0/1), probe (0/1), window, min calls, failure rate, cooldown, ttl
+RECORD_SCRIPT = _NOW + """
+local failed = ARGV[1] == '1'
+local cooldown = tonumber(ARGV[6])
+if ARGV[2] == '1' then
+  if not failed then
+    redis.call('DEL', KEYS[1])
+    return 'closed'
+  end
+  redis.call('HSET', KEYS[1], 'start', now, 'calls', 0, 'failures', 0, 'open_until', now + cooldown, 'probe_until', 0)
+  redis.call('EXPIRE', KEYS[1], ARGV[7])
+  return 'open'
+end
+local c = redis.call('HMGET', KEYS[1], 'start', 'calls', 'failures', 'open_until')
+local start = tonumber(c[1]) or now
+local calls = tonumber(c[2]) or 0
+local failures = tonumber(c[3]) or 0
+local open_until = tonumber(c[4]) or 0
+if now - start >= tonumber(ARGV[3]) then
+  start = now
+  calls = 0
+  failures = 0
+end
+calls = calls + 1
+if failed then failures = failures + 1 end
+local state = ''
+if open_until == 0 and calls >= tonumber(ARGV[4]) and failures / calls >= tonumber(ARGV[5]) then
+  open_until = now + cooldown
+  state = 'open'
+end
+redis.call('HSET', KEYS[1], 'start', start, 'calls', calls, 'failures', failures, 'open_until', open_until)
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+return state
+"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker per (CRM, host), shared by every worker process through
+    the rate limiter's Redis connection.
+
+    A circuit opens once at least CRM_CIRCUIT_MIN_CALLS calls in a
+    CRM_CIRCUIT_WINDOW-second window have failed or been slow at a rate of
+    CRM_CIRCUIT_FAILURE_RATE or more. While open, calls raise CircuitOpen
+    without touching the network. After CRM_CIRCUIT_COOLDOWN seconds it is
+    half-open: one probe call goes through; success closes the circuit,
+    failure opens it for another cooldown.
+    """
+    PREFIX = "crm-circuit:"
+
+    def __init__(self, connection: SharedRedis = None):
+        self.local = LocalCircuits()
+        self.connection = connection or shared_redis
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'CRM_CIRCUIT_ENABLED', True)
+
+    def before(self, crm: Optional[str], url: str) -> bool:
+        """
+        Raises CircuitOpen while the circuit is open. Returns True when the
+        call is the half-open probe and its outcome decides the circuit.
+        """
+        if not self.enabled:
+            return False
+        key = circuit_key(crm, url)
+        cooldown = _thresholds()[3]
+        outcome = None
+        script = self.connection.script(ALLOW_SCRIPT)
+        if script is not None:
+            try:
+                outcome, wait = script(keys=[self.PREFIX + key], args=[cooldown])
+                outcome, wait = int(outcome), float(wait)
+            except redis.RedisError as e:
+                self.connection.failed(e, "local circuits")
+                outcome = None
+        if outcome is None:
+            outcome, wait = self.local.allow(key, cooldown)
+        if outcome == REJECT:
+            raise CircuitOpen(crm or 'CRM', urlsplit(url).netloc, wait)
+        return outcome == PROBE
+
+    def record(self, crm: Optional[str], url: str, probe: bool, elapsed: float,
+               response=None, exc: Exception = None) -> None:
+        """
+        Counts the outcome of a call let through by `before`.
+        """
+        if not self.enabled:
+            return
+        key = circuit_key(crm, url)
+        failed = is_failure(elapsed, response, exc)
+        window, min_calls, failure_rate, cooldown = _thresholds()
+        state = None
+        script = self.connection.script(RECORD_SCRIPT)
+        if script is not None:
+            try:
+                state = script(
+                    keys=[self.PREFIX + key],
+                    args=[int(failed), int(probe), window, min_calls, failure_rate, cooldown, int(window + cooldown) + 60],
+                )
+                state = state.decode() if isinstance(state, bytes) else state
+            except redis.RedisError as e:
+                self.connection.failed(e, "local circuits")
+                state = None
+                script = None
+        if script is None:
+            state = self.local.record(key, failed, probe, window, min_calls, failure_rate, cooldown)
+        if state == 'open':
+            logger.warning(f"Circuit for {key} opened; failing fast for {cooldown:.0f}s")
+        elif state == 'closed':
+            logger.info(f"Circuit for {key} closed after a successful probe")
+
+
+circuit_breaker = CircuitBreaker()
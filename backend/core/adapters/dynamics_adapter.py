@@ -1,14 +1,29 @@
-from typing import List, Dict, Any
+import json
+import math
+import re
+import uuid
+from urllib.parse import quote
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
 import requests
-from .base_adapter import BaseAdapter
+from django.core.cache import cache
+from .base_adapter import BaseAdapter, PushResult, as_utc
+from .token_store import secret_digest, token_store
 from ..canonical_model import Contact
+from ..mapping import compile_mapping
 
 class DynamicsAdapter(BaseAdapter):
     """
     Adapter for Microsoft Dynamics 365 (Dataverse / Web API).
     Auth: OAuth 2.0 Client Credentials Flow (Server-to-Server).
     """
-    
+    CRM_TYPE = 'dynamics'
+    CREDENTIAL_FIELDS = ('tenant_id', 'client_id', 'resource_url')
+    BATCH_LIMIT = 1000
+    MAX_PAGE_SIZE = 5000
+    # Entity metadata changes rarely; primary key lookups are cached this long
+    METADATA_TTL = 86400
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.client_id = config.get("client_id")
@@ -17,15 +32,25 @@ class DynamicsAdapter(BaseAdapter):
         self.resource_url = config.get("resource_url")
         self.object_type = config.get("object_type")
         self.field_mapping = config.get("field_mapping", {})
-        self._access_token = None
+        self.mapping_plan = compile_mapping(self.field_mapping)
+        self.changeset_size = max(1, int(config.get("changeset_size", 1)))
+        # Primary key column of `object_type`, e.g. 'contactid' for 'contacts';
+        # read from the entity metadata when not configured
+        self.primary_key = config.get("primary_key")
+        self._token_key = (
+            "dynamics", self.tenant_id, self.client_id, self.resource_url, secret_digest(self.client_secret)
+        )
 
     def _get_access_token(self) -> str:
+        """
+        Returns a Bearer Token from the shared token store, refreshing it before expiry.
+        """
+        return token_store.get(self._token_key, self._request_token)["access_token"]
+
+    def _request_token(self) -> Dict[str, Any]:
         """
         Exchanges Client Credentials for a Bearer Token.
         """
-        if self._access_token:
-            return self._access_token
-            
         token_url = f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
         data = {
             "client_id": self.client_id,
@@ -34,10 +59,9 @@ class DynamicsAdapter(BaseAdapter):
             "scope": f"{self.resource_url}/.default"
         }
         
-        resp = requests.post(token_url, data=data)
+        resp = self._request("POST", token_url, data=data)
         resp.raise_for_status()
-        self._access_token = resp.json().get("access_token")
-        return self._access_token
+        return resp.json()
 
     def authenticate(self) -> bool:
         if not (self.client_id and self.client_secret and self.tenant_id and self.resource_url):
@@ -50,10 +74,70 @@ class DynamicsAdapter(BaseAdapter):
             print(f"Dynamics Auth Failed: {e}")
             return False
 
-    def fetch_contacts(self) -> List[Contact]:
-        return []
+    def iter_contacts(self, page_size: int = 100, since: Optional[datetime] = None) -> Iterator[Contact]:
+        if not (self.client_id and self.client_secret):
+            return
+        entity_set_name = self.object_type
+        if not entity_set_name:
+             raise ValueError("Dynamics Entity Set Name (e.g. 'contacts') not provided.")
+
+        primary_key = self._primary_key(entity_set_name)
+        select = list(dict.fromkeys([primary_key, "modifiedon"] + self.mapping_plan.targets()))
+        params = {"$select": ",".join(select), "$orderby": "modifiedon asc"}
+        if since is not None:
+            params["$filter"] = f"modifiedon gt {as_utc(since).strftime('%Y-%m-%dT%H:%M:%SZ')}"
+        headers = {
+            "Accept": "application/json",
+            "OData-MaxVersion": "4.0",
+            "OData-Version": "4.0",
+            "Prefer": f"odata.maxpagesize={min(page_size, self.MAX_PAGE_SIZE)}",
+        }
+
+        url = f"{self._api_base()}/{entity_set_name}"
+        while url:
+            data = self._send("GET", url, headers, params=params).json()
+            yield from self._contacts_from_page(
+                [self._contact_fields(record, primary_key) for record in data.get("value", [])]
+            )
+            # The next link already carries the query options
+            url, params = data.get("@odata.nextLink"), None
 
-    def push_contact(self, contact: Contact, target: str = None) -> str:
+    def _contact_fields(self, record: Dict[str, Any], primary_key: str) -> Dict[str, Any]:
+        fields = self.mapping_plan.unproject(record)
+        fields.update(id=record.get(primary_key), updated_at=record.get("modifiedon"), raw_data=record)
+        return fields
+
+    def _primary_key(self, entity_set_name: str) -> str:
+        """
+        Primary key column of an entity set: the configured `primary_key` for
+        `object_type`, else the entity's PrimaryIdAttribute from EntityDefinitions.
+        """
+        if self.primary_key and entity_set_name == self.object_type:
+            return self.primary_key
+        cache_key = f"dynamics-primary-key:{self.resource_url}:{entity_set_name}"
+        primary_key = cache.get(cache_key)
+        if primary_key is None:
+            data = self._send("GET", f"{self._api_base()}/EntityDefinitions", {"Accept": "application/json"}, params={
+                "$select": "PrimaryIdAttribute",
+                "$filter": "EntitySetName eq '{}'".format(entity_set_name.replace("'", "''")),
+            }).json()
+            definitions = data.get("value") or []
+            if not definitions:
+                raise ValueError(f"Dynamics entity set '{entity_set_name}' not found.")
+            primary_key = definitions[0]["PrimaryIdAttribute"]
+            cache.set(cache_key, primary_key, self.METADATA_TTL)
+        return primary_key
+
+    def _api_base(self) -> str:
+        return f"{self.resource_url.rstrip('/')}/api/data/v9.2"
+
+    def _build_payload(self, contact: Contact) -> Dict[str, Any]:
+        payload = self.mapping_plan.project(contact)
+        if not payload:
+            raise ValueError("No fields mapped for Dynamics 365.")
+        return payload
+
+    def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
         # Default target: 'contacts' (Entity Set Name)
         entity_set_name = target if target else self.object_type
         if not entity_set_name:
@@ -63,34 +147,27 @@ class DynamicsAdapter(BaseAdapter):
              print(f"[MOCK] Pushing to Dynamics ({entity_set_name})")
              return "MOCK_DYN_GUID_123"
 
-        payload = {}
-        flat_contact = contact.model_dump()
-        flat_contact.update(contact.custom_fields)
-        
-        for key, value in flat_contact.items():
-            if key in self.field_mapping:
-                dyn_field = self.field_mapping[key]
-                payload[dyn_field] = value
-                
-        if not payload:
-            raise ValueError("No fields mapped for Dynamics 365.")
+        payload = self._build_payload(contact)
+        method, url = self._record_request(entity_set_name, payload, upsert)
 
         try:
-            token = self._get_access_token()
-            url = f"{self.resource_url.rstrip('/')}/api/data/v9.2/{entity_set_name}"
             headers = {
-                "Authorization": f"Bearer {token}",
+                "Authorization": f"Bearer {self._get_access_token()}",
                 "Content-Type": "application/json",
                 "Prefer": "return=representation"
             }
             
-            response = requests.post(url, json=payload, headers=headers)
+            response = self._request(method, url, json=payload, headers=headers)
+            if response.status_code == 401:
+                # Token revoked or expired early: fetch a new one and retry once
+                token_store.invalidate(self._token_key)
+                headers["Authorization"] = f"Bearer {self._get_access_token()}"
+                response = self._request(method, url, json=payload, headers=headers)
             response.raise_for_status()
-            data = response.json()
-            if 'OData-EntityId' in response.headers:
-                 return response.headers['OData-EntityId']
-            
-            return str(data.get(f"{entity_set_name[:-1]}id", "CREATED"))
+            remote_id = _entity_guid(response.headers.get('OData-EntityId'))
+            if remote_id is None:
+                remote_id = response.json().get(self._primary_key(entity_set_name))
+            return str(remote_id) if remote_id is not None else None
 
         except requests.exceptions.HTTPError as e:
             print(f"Dynamics API Error: {e.response.text}")
@@ -98,3 +175,265 @@ class DynamicsAdapter(BaseAdapter):
         except Exception as e:
             print(f"Error creating Dynamics Record: {e}")
             raise
+
+    def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        entity_set_name = target if target else self.object_type
+        if not entity_set_name:
+             raise ValueError("Dynamics Entity Set Name (e.g. 'contacts') not provided.")
+
+        payload = self._build_payload(contact)
+        if not (self.client_id and self.client_secret):
+            print(f"[MOCK] Updating Dynamics ({entity_set_name}) {remote_id}")
+            return remote_id
+
+        url = f"{self._api_base()}/{entity_set_name}({remote_id})"
+        try:
+            # If-Match: * turns the PATCH into a pure update; Dataverse would otherwise create the record
+            self._send("PATCH", url, {"Content-Type": "application/json", "If-Match": "*"}, json=payload)
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+        return remote_id
+
+    def push_contacts(self, contacts: Sequence[Contact], target: str = None, upsert: bool = False) -> List[PushResult]:
+        """
+        Sends records as OData $batch requests of up to BATCH_LIMIT operations.
+        Each change set holds `changeset_size` records and is applied atomically;
+        with the default of 1 every record succeeds or fails on its own.
+        """
+        entity_set_name = target if target else self.object_type
+        if not entity_set_name:
+             raise ValueError("Dynamics Entity Set Name (e.g. 'contacts') not provided.")
+
+        results: List[Optional[PushResult]] = [None] * len(contacts)
+        operations = []
+        for index, contact in enumerate(contacts):
+            try:
+                payload = self._build_payload(contact)
+                operations.append((index, payload, self._record_request(entity_set_name, payload, upsert)))
+            except ValueError as e:
+                results[index] = PushResult.failed(e)
+
+        if not (self.client_id and self.client_secret):
+            print(f"[MOCK] Batch pushing {len(operations)} records to Dynamics ({entity_set_name})")
+            for index, _, _ in operations:
+                results[index] = PushResult(remote_id="MOCK_DYN_GUID_123")
+            return results
+
+        for start in range(0, len(operations), self.BATCH_LIMIT):
+            chunk = operations[start:start + self.BATCH_LIMIT]
+            changesets = [chunk[i:i + self.changeset_size] for i in range(0, len(chunk), self.changeset_size)]
+            try:
+                self._send_batch(changesets, results)
+            except requests.exceptions.RequestException as e:
+                print(f"Dynamics Batch Error: {e}")
+                for index, _, _ in chunk:
+                    results[index] = PushResult.failed(e)
+        return results
+
+    def update_contacts(self, updates: Sequence[Tuple[str, Contact]], target: str = None) -> List[Optional[PushResult]]:
+        """
+        Updates known records by GUID as $batch PATCHes with If-Match: *,
+        BATCH_LIMIT per call and grouped into change sets like push_contacts.
+        """
+        entity_set_name = target if target else self.object_type
+        if not entity_set_name:
+             raise ValueError("Dynamics Entity Set Name (e.g. 'contacts') not provided.")
+
+        results: List[Optional[PushResult]] = [None] * len(updates)
+        operations, remote_ids = [], {}
+        for index, (remote_id, contact) in enumerate(updates):
+            try:
+                payload = self._build_payload(contact)
+            except ValueError as e:
+                results[index] = PushResult.failed(e)
+                continue
+            operations.append((index, payload, ("PATCH", f"{self._api_base()}/{entity_set_name}({remote_id})")))
+            remote_ids[index] = remote_id
+
+        if not (self.client_id and self.client_secret):
+            print(f"[MOCK] Batch updating {len(operations)} records in Dynamics ({entity_set_name})")
+            for index, _, _ in operations:
+                results[index] = PushResult(remote_id=remote_ids[index])
+            return results
+
+        for start in range(0, len(operations), self.BATCH_LIMIT):
+            chunk = operations[start:start + self.BATCH_LIMIT]
+            changesets = [chunk[i:i + self.changeset_size] for i in range(0, len(chunk), self.changeset_size)]
+            try:
+                self._send_batch(changesets, results, remote_ids)
+            except requests.exceptions.RequestException as e:
+                print(f"Dynamics Batch Error: {e}")
+                for index, _, _ in chunk:
+                    results[index] = PushResult.failed(e)
+        return results
+
+    def push_calls(self, creates: int, updates: int, upsert: bool = False) -> int:
+        return math.ceil(creates / self.BATCH_LIMIT) + math.ceil(updates / self.BATCH_LIMIT)
+
+    def _send(self, method: str, url: str, headers: Dict[str, str], **kwargs) -> requests.Response:
+        """
+        Sends a Web API request with a fresh token, retrying once on 401.
+        Service protection limits (429/503 with Retry-After) are retried by _request.
+        """
+        refreshed = False
+        while True:
+            response = self._request(method, url, headers={
+                **headers,
+                "Authorization": f"Bearer {self._get_access_token()}",
+            }, **kwargs)
+            if response.status_code == 401 and not refreshed:
+                token_store.invalidate(self._token_key)
+                refreshed = True
+                continue
+            response.raise_for_status()
+            return response
+
+    def _record_request(self, entity_set_name: str, payload: Dict[str, Any], upsert: bool) -> tuple:
+        """
+        (method, url) writing one record. Upserts PATCH the record addressed by
+        its alternate key (`upsert_field`), which Dataverse creates if missing.
+        """
+        url = f"{self._api_base()}/{entity_set_name}"
+        if not upsert:
+            return "POST", url
+        field, value = self._upsert_key(payload)
+        return "PATCH", f"{url}({field}={_odata_literal(value)})"
+
+    def _send_batch(self, changesets: List[list], results: List[Optional[PushResult]],
+                    remote_ids: Optional[Dict[int, str]] = None) -> None:
+        """
+        Sends one $batch request and writes the results of its operations.
+        With `remote_ids` (index -> GUID) the operations update existing
+        records: they carry If-Match: * and a record-level 404 leaves None.
+        """
+        batch_boundary = f"batch_{uuid.uuid4().hex}"
+        lines = []
+        for changeset in changesets:
+            changeset_boundary = f"changeset_{uuid.uuid4().hex}"
+            lines += [f"--{batch_boundary}", f"Content-Type: multipart/mixed; boundary={changeset_boundary}", ""]
+            for index, payload, (method, url) in changeset:
+                lines += [
+                    f"--{changeset_boundary}",
+                    "Content-Type: application/http",
+                    "Content-Transfer-Encoding: binary",
+                    f"Content-ID: {index + 1}",
+                    "",
+                    f"{method} {url} HTTP/1.1",
+                    "Content-Type: application/json; type=entry",
+                    *(["If-Match: *"] if remote_ids is not None else []),
+                    "",
+                    json.dumps(payload, default=str),
+                ]
+            lines.append(f"--{changeset_boundary}--")
+        lines += [f"--{batch_boundary}--", ""]
+        body = "\r\n".join(lines).encode("utf-8")
+
+        response = self._send("POST", f"{self._api_base()}/$batch", {
+            "Content-Type": f"multipart/mixed; boundary={batch_boundary}",
+            "OData-MaxVersion": "4.0",
+            "OData-Version": "4.0",
+            "Prefer": "odata.continue-on-error",
+        }, data=body)
+
+        boundary = _boundary(response.headers.get("Content-Type", ""))
+        parts = _split_multipart(response.text, boundary) if boundary else []
+        for position, changeset in enumerate(changesets):
+            indexes = [index for index, _, _ in changeset]
+            answered = set()
+            if position >= len(parts):
+                for index in indexes:
+                    results[index] = PushResult(error="No response returned for change set.")
+                continue
+            headers, content = _split_head(parts[position])
+            inner = _boundary(headers.get("content-type", ""))
+            if inner:
+                responses = [_parse_http(_split_head(part)) for part in _split_multipart(content, inner)]
+            else:
+                responses = [_parse_http((headers, content))]
+            for content_id, status_code, http_headers, http_body in responses:
+                if status_code < 400:
+                    targets = [content_id - 1] if content_id else indexes
+                    guid = _entity_guid(http_headers.get("odata-entityid"))
+                    if guid is None and remote_ids is not None and len(targets) == 1:
+                        guid = remote_ids.get(targets[0])
+                    result = PushResult(remote_id=guid)
+                elif status_code == 404 and remote_ids is not None and len(indexes) == 1:
+                    # The record was deleted from Dynamics
+                    result, targets = None, indexes
+                else:
+                    # A failed change set is rolled back as a whole
+                    result = PushResult(error=_odata_error(http_body))
+                    targets = indexes
+                for index in targets:
+                    if index in indexes:
+                        results[index] = result
+                        answered.add(index)
+            for index in indexes:
+                if index not in answered:
+                    results[index] = PushResult(error="No response returned for record.")
+
+
+def _entity_guid(entity_id: Optional[str]) -> Optional[str]:
+    """
+    The record GUID at the end of an OData-EntityId URL (.../contacts(<guid>)).
+    """
+    match = re.search(r"\(([^()=']+)\)$", (entity_id or "").strip())
+    return match.group(1) if match else None
+
+
+def _odata_literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + quote(str(value).replace("'", "''"), safe="@.-_~") + "'"
+
+
+def _boundary(content_type: str) -> Optional[str]:
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    return match.group(1) if match else None
+
+
+def _split_multipart(body: str, boundary: str) -> List[str]:
+    parts = []
+    for chunk in body.replace("\r\n", "\n").split(f"--{boundary}")[1:]:
+        if chunk.startswith("--"):
+            break
+        parts.append(chunk.strip("\n"))
+    return parts
+
+
+def _split_head(text: str) -> tuple:
+    """
+    Splits a MIME part or HTTP message into (lower-cased headers, remainder).
+    """
+    head, _, rest = text.partition("\n\n")
+    headers = {}
+    for line in head.split("\n"):
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return headers, rest
+
+
+def _parse_http(part: tuple) -> tuple:
+    """
+    Turns an application/http part into (content_id, status, headers, body).
+    """
+    mime_headers, message = part
+    status_line, _, rest = message.partition("\n")
+    match = re.match(r"HTTP/\d\.\d (\d{3})", status_line)
+    status_code = int(match.group(1)) if match else 500
+    headers, body = _split_head(rest)
+    content_id = mime_headers.get("content-id")
+    return (int(content_id) if content_id and content_id.isdigit() else None), status_code, headers, body
+
+
+def _odata_error(body: str) -> str:
+    try:
+        error = json.loads(body).get("error", {})
+        return error.get("message") or body
+    except ValueError:
+        return body or "Unknown error"
@@ -0,0 +1,74 @@
+import threading
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+
+class PooledSession(requests.Session):
+    """
+    requests.Session with a default (connect, read) timeout applied to every call.
+    """
+
+    def __init__(self, timeout: Tuple[float, float]):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+_sessions: Dict[str, PooledSession] = {}
+_lock = threading.Lock()
+
+
+def build_session() -> PooledSession:
+    """
+    Creates a keep-alive session configured from the CRM_HTTP_* settings.
+    The transport only retries failed connections, which never reached the
+    CRM; status-based retries belong to the CRM's retry policy (retry.py).
+    """
+    pool_size = getattr(settings, "CRM_HTTP_POOL_SIZE", 20)
+    max_retries = getattr(settings, "CRM_HTTP_MAX_RETRIES", 2)
+    timeout = (
+        getattr(settings, "CRM_HTTP_CONNECT_TIMEOUT", 5),
+        getattr(settings, "CRM_HTTP_READ_TIMEOUT", 30),
+    )
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,
+        status=0,
+        backoff_factor=0.3,
+        raise_on_status=False,
+    )
+    session = PooledSession(timeout)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session_for(url: str) -> PooledSession:
+    """
+    Returns the shared session for the URL's host, creating it on first use.
+    """
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = build_session()
+    return session
+
+
+def close_sessions() -> None:
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -1,19 +1,33 @@
-from typing import List, Dict, Any
+import math
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
 import requests
-from .base_adapter import BaseAdapter
+from .base_adapter import BaseAdapter, PushResult, as_utc
 from ..canonical_model import Contact
+from ..mapping import compile_mapping, SYSTEM_FIELDS
 
 class HubSpotAdapter(BaseAdapter):
     """
     Adapter for HubSpot CRM (API v3).
     """
+    CRM_TYPE = 'hubspot'
+    CREDENTIAL_FIELDS = ('access_token',)
     API_BASE_URL = "https://api.hubapi.com/crm/v3/objects"
+    BATCH_SIZE = 100
+    MAX_PAGE_SIZE = 100
+    # Results one search query can page through
+    SEARCH_LIMIT = 10000
 
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.access_token = config.get("access_token")
         self.object_type = config.get("object_type")
         self.field_mapping = config.get("field_mapping", {})
+        self.mapping_plan = compile_mapping(self.field_mapping, skip=SYSTEM_FIELDS)
+        # HubSpot property used to match existing records, e.g. 'email'.
+        # When set, batch pushes always upsert.
+        self.id_property = config.get("id_property")
+        self.upsert_field = self.id_property or self.upsert_field
 
     def authenticate(self) -> bool:
         if not self.access_token:
@@ -21,52 +35,127 @@ class HubSpotAdapter(BaseAdapter):
             return False
         return True
 
-    def fetch_contacts(self) -> List[Contact]:
+    def iter_contacts(self, page_size: int = 100, since: Optional[datetime] = None) -> Iterator[Contact]:
         if not self.access_token:
-            return [Contact(id="MOCK_HS_1", first_name="HubSpot", last_name="User", email="hubspot@test.com")]
-        
-        # Implementation skipped for now
-        return []
+            yield Contact(id="MOCK_HS_1", first_name="HubSpot", last_name="User", email="hubspot@test.com")
+            return
+        if not self.object_type:
+             raise ValueError("HubSpot Object Type not provided in Configuration.")
+
+        properties = self.mapping_plan.targets()
+        limit = min(page_size, self.MAX_PAGE_SIZE)
+        if since is not None:
+            yield from self._iter_search(since, properties, limit)
+            return
+        after = None
+        while True:
+            params = {"limit": limit, "archived": "false"}
+            if properties:
+                params["properties"] = ",".join(properties)
+            if after:
+                params["after"] = after
+            url = f"{self.API_BASE_URL}/{self.object_type}"
+            response = self._request("GET", url, params=params, headers=self._headers())
+            response.raise_for_status()
+            data = response.json()
+
+            yield from self._contacts_from_page([self._contact_fields(record) for record in data.get("results", [])])
+            after = data.get("paging", {}).get("next", {}).get("after")
+            if not after:
+                break
+
+    def _iter_search(self, since: datetime, properties: List[str], limit: int) -> Iterator[Contact]:
+        """
+        Records modified after `since`, oldest first, through the search
+        endpoint (the list endpoint cannot filter). A search pages through at
+        most SEARCH_LIMIT results, so before reaching it the search is issued
+        again from the last modification time seen, skipping the records
+        already yielded at that exact time.
+        """
+        modified = "lastmodifieddate" if self.object_type == "contacts" else "hs_lastmodifieddate"
+        url = f"{self.API_BASE_URL}/{self.object_type}/search"
+        floor, operator, seen = int(as_utc(since).timestamp() * 1000), "GT", set()
+        while True:
+            after, fetched, last, at_last = None, 0, floor, set(seen)
+            while True:
+                body = {
+                    "filterGroups": [{"filters": [{"propertyName": modified, "operator": operator, "value": str(floor)}]}],
+                    "sorts": [{"propertyName": modified, "direction": "ASCENDING"}],
+                    "properties": properties,
+                    "limit": limit,
+                }
+                if after:
+                    body["after"] = after
+                response = self._request("POST", url, json=body, headers=self._headers())
+                response.raise_for_status()
+                data = response.json()
+
+                rows = []
+                for record in data.get("results", []):
+                    fetched += 1
+                    stamp = _epoch_ms(record.get("updatedAt"))
+                    if stamp is not None and stamp > last:
+                        last, at_last = stamp, set()
+                    if stamp == last:
+                        at_last.add(record["id"])
+                    if record["id"] not in seen:
+                        rows.append(self._contact_fields(record))
+                yield from self._contacts_from_page(rows)
+                after = data.get("paging", {}).get("next", {}).get("after")
+                if not after:
+                    return
+                if fetched + limit > self.SEARCH_LIMIT:
+                    break
+            if last == floor and operator == "GTE":
+                raise ValueError(
+                    f"More than {self.SEARCH_LIMIT} HubSpot records share the modification time {floor}; cannot page past them."
+                )
+            floor, operator, seen = last, "GTE", at_last
+
+    def _contact_fields(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        fields = self.mapping_plan.unproject(record.get("properties") or {})
+        fields.update(id=record["id"], updated_at=record.get("updatedAt"), raw_data=record)
+        return fields
+
+    def _build_properties(self, contact: Contact) -> Dict[str, Any]:
+        # Strict Mapping: Only use mapped fields
+        properties = self.mapping_plan.project(contact)
+        if not properties:
+            raise ValueError("No fields mapped for HubSpot push. Please check 'field_mapping'.")
+        return properties
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json"
+        }
 
-    def push_contact(self, contact: Contact, target: str = None) -> str:
+    def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
         object_type = target if target else self.object_type
         if not object_type:
              raise ValueError("HubSpot Object Type not provided in Configuration.")
         
-        # Prepare Properties
-        properties = {}
-        
-        # Flatten contact data
-        flat_contact = contact.model_dump()
-        flat_contact.update(contact.custom_fields)
-        
-        # Strict Mapping: Only use mapped fields
-        for key, value in flat_contact.items():
-            if key in ['id', 'created_at', 'updated_at', 'raw_data', 'custom_fields']:
-                continue 
-
-            if key in self.field_mapping:
-                hs_field = self.field_mapping[key]
-                properties[hs_field] = value
-        
-        if not properties:
-            raise ValueError("No fields mapped for HubSpot push. Please check 'field_mapping'.")
+        properties = self._build_properties(contact)
+        if upsert:
+            id_property, value = self._upsert_key(properties)
 
         if not self.access_token:
             print(f"[MOCK] Pushing to HubSpot ({object_type}): {properties}")
             return "MOCK_HS_ID_123"
 
-        url = f"{self.API_BASE_URL}/{object_type}"
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
+        if upsert:
+            # HubSpot only exposes upsert-by-property as a batch endpoint
+            url = f"{self.API_BASE_URL}/{object_type}/batch/upsert"
+            body = {"inputs": [{"id": str(value), "idProperty": id_property, "properties": properties}]}
+        else:
+            url = f"{self.API_BASE_URL}/{object_type}"
+            body = {"properties": properties}
         
         try:
-            response = requests.post(url, json={"properties": properties}, headers=headers)
+            response = self._request("POST", url, json=body, headers=self._headers())
             response.raise_for_status()
             data = response.json()
-            return data['id']
+            return data['results'][0]['id'] if upsert else data['id']
             
         except requests.exceptions.HTTPError as e:
             print(f"HubSpot API Error: {e.response.text}")
@@ -74,3 +163,216 @@ class HubSpotAdapter(BaseAdapter):
         except Exception as e:
             print(f"Error creating HubSpot Object: {e}")
             raise
+
+    def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        object_type = target if target else self.object_type
+        if not object_type:
+             raise ValueError("HubSpot Object Type not provided in Configuration.")
+
+        properties = self._build_properties(contact)
+        if not self.access_token:
+            print(f"[MOCK] Updating HubSpot {object_type} {remote_id}: {properties}")
+            return remote_id
+
+        response = self._request(
+            "PATCH", f"{self.API_BASE_URL}/{object_type}/{remote_id}", json={"properties": properties}, headers=self._headers()
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return str(response.json().get("id", remote_id))
+
+    def push_contacts(self, contacts: Sequence[Contact], target: str = None, upsert: bool = False) -> List[PushResult]:
+        """
+        Pushes through the batch create endpoint, or batch upsert in upsert mode
+        or when an `id_property` (e.g. 'email') is configured, BATCH_SIZE records per call.
+        """
+        object_type = target if target else self.object_type
+        if not object_type:
+             raise ValueError("HubSpot Object Type not provided in Configuration.")
+
+        upsert = upsert or bool(self.id_property)
+        results: List[Optional[PushResult]] = [None] * len(contacts)
+        inputs = []
+        for index, contact in enumerate(contacts):
+            try:
+                properties = self._build_properties(contact)
+                if upsert:
+                    self._upsert_key(properties)
+                inputs.append((index, properties))
+            except ValueError as e:
+                results[index] = PushResult.failed(e)
+
+        if not self.access_token:
+            print(f"[MOCK] Batch pushing {len(inputs)} records to HubSpot ({object_type})")
+            for index, _ in inputs:
+                results[index] = PushResult(remote_id="MOCK_HS_ID_123")
+            return results
+
+        for start in range(0, len(inputs), self.BATCH_SIZE):
+            self._push_batch(object_type, inputs[start:start + self.BATCH_SIZE], results, upsert)
+        return results
+
+    def update_contacts(self, updates: Sequence[Tuple[str, Contact]], target: str = None) -> List[Optional[PushResult]]:
+        """
+        Updates known records through the batch update endpoint, BATCH_SIZE per call.
+        Records HubSpot no longer has come back as None.
+        """
+        object_type = target if target else self.object_type
+        if not object_type:
+             raise ValueError("HubSpot Object Type not provided in Configuration.")
+
+        results: List[Optional[PushResult]] = [None] * len(updates)
+        inputs = []
+        for index, (remote_id, contact) in enumerate(updates):
+            try:
+                inputs.append((index, str(remote_id), self._build_properties(contact)))
+            except ValueError as e:
+                results[index] = PushResult.failed(e)
+
+        if not self.access_token:
+            print(f"[MOCK] Batch updating {len(inputs)} records in HubSpot ({object_type})")
+            for index, remote_id, _ in inputs:
+                results[index] = PushResult(remote_id=remote_id)
+            return results
+
+        for start in range(0, len(inputs), self.BATCH_SIZE):
+            self._update_batch(object_type, inputs[start:start + self.BATCH_SIZE], results)
+        return results
+
+    def push_calls(self, creates: int, updates: int, upsert: bool = False) -> int:
+        return math.ceil(creates / self.BATCH_SIZE) + math.ceil(updates / self.BATCH_SIZE)
+
+    def _update_batch(self, object_type: str, chunk: list, results: List[Optional[PushResult]]) -> None:
+        """
+        Sends one batch update call for `chunk` of (index, remote ID, properties).
+        A rejected batch is split in halves like in _push_batch; a single
+        record that is not found is left as None.
+        """
+        url = f"{self.API_BASE_URL}/{object_type}/batch/update"
+        inputs = [{"id": remote_id, "properties": properties} for _, remote_id, properties in chunk]
+        try:
+            response = self._request("POST", url, json={"inputs": inputs}, headers=self._headers())
+        except requests.exceptions.RequestException as e:
+            for index, _, _ in chunk:
+                results[index] = PushResult.failed(e)
+            return
+
+        if response.status_code in (400, 404, 409, 422) and len(chunk) > 1:
+            middle = len(chunk) // 2
+            self._update_batch(object_type, chunk[:middle], results)
+            self._update_batch(object_type, chunk[middle:], results)
+            return
+        if response.status_code == 404:
+            return
+        if response.status_code >= 400:
+            print(f"HubSpot Batch API Error: {response.text}")
+            for index, _, _ in chunk:
+                results[index] = PushResult.rejected(response)
+            return
+
+        data = response.json()
+        pending: Dict[str, List[int]] = {}
+        for index, remote_id, _ in chunk:
+            pending.setdefault(remote_id, []).append(index)
+        for record in data.get("results", []):
+            for index in pending.pop(str(record["id"]), []):
+                results[index] = PushResult(remote_id=str(record["id"]))
+
+        messages = []
+        for error in data.get("errors", []):
+            message = error.get("message", str(error))
+            messages.append(message)
+            missing = error.get("category") == "OBJECT_NOT_FOUND"
+            for remote_id in (error.get("context") or {}).get("ids", []):
+                for index in pending.pop(str(remote_id), []):
+                    results[index] = None if missing else PushResult(error=message)
+        for indexes in pending.values():
+            for index in indexes:
+                results[index] = PushResult(error="; ".join(messages) or "Record missing from HubSpot batch response.")
+
+    def _push_batch(self, object_type: str, chunk: list, results: List[Optional[PushResult]], upsert: bool = False) -> None:
+        """
+        Sends one batch call and writes a PushResult for every record in `chunk`.
+        HubSpot rejects a whole batch when any record is invalid, so a rejected
+        batch is split in halves until the offending records are isolated.
+        """
+        if upsert:
+            url = f"{self.API_BASE_URL}/{object_type}/batch/upsert"
+            inputs = [
+                {"id": str(properties[self.upsert_field]), "idProperty": self.upsert_field, "properties": properties}
+                for _, properties in chunk
+            ]
+        else:
+            url = f"{self.API_BASE_URL}/{object_type}/batch/create"
+            inputs = [
+                {"properties": properties, "objectWriteTraceId": str(index)}
+                for index, properties in chunk
+            ]
+
+        try:
+            response = self._request("POST", url, json={"inputs": inputs}, headers=self._headers())
+        except requests.exceptions.RequestException as e:
+            for index, _ in chunk:
+                results[index] = PushResult.failed(e)
+            return
+
+        if response.status_code in (400, 409, 422) and len(chunk) > 1:
+            middle = len(chunk) // 2
+            self._push_batch(object_type, chunk[:middle], results, upsert)
+            self._push_batch(object_type, chunk[middle:], results, upsert)
+            return
+        if response.status_code >= 400:
+            print(f"HubSpot Batch API Error: {response.text}")
+            for index, _ in chunk:
+                results[index] = PushResult.rejected(response)
+            return
+
+        data = response.json()
+        pending = {index: properties for index, properties in chunk}
+        # Upsert inputs cannot carry a trace ID; their results are matched on the upsert key
+        key_field = self.upsert_field if upsert else None
+        by_key = {}
+        if key_field:
+            for index, properties in chunk:
+                by_key.setdefault(str(properties[key_field]).lower(), []).append(index)
+
+        for record in data.get("results", []):
+            index = self._match_record(record, pending, by_key, key_field)
+            if index is not None:
+                results[index] = PushResult(remote_id=str(record["id"]))
+                pending.pop(index, None)
+
+        # Whatever is left failed; attach the errors reported for this batch
+        messages = [error.get("message", str(error)) for error in data.get("errors", [])]
+        for error in data.get("errors", []):
+            for trace_id in (error.get("context") or {}).get("objectWriteTraceId", []):
+                if str(trace_id).isdigit() and int(trace_id) in pending:
+                    results[int(trace_id)] = PushResult(error=error.get("message", str(error)))
+                    pending.pop(int(trace_id))
+        for index in pending:
+            results[index] = PushResult(error="; ".join(messages) or "Record missing from HubSpot batch response.")
+
+    def _match_record(self, record: Dict[str, Any], pending: Dict[int, Any], by_key: Dict[str, List[int]],
+                      key_field: Optional[str] = None) -> Optional[int]:
+        trace_id = record.get("objectWriteTraceId")
+        if trace_id is not None and str(trace_id).isdigit() and int(trace_id) in pending:
+            return int(trace_id)
+        if key_field:
+            value = (record.get("properties") or {}).get(key_field)
+            candidates = by_key.get(str(value).lower(), []) if value is not None else []
+            while candidates:
+                index = candidates.pop(0)
+                if index in pending:
+                    return index
+        # Response order is not guaranteed; records that cannot be matched are reported as errors
+        return None
+
+
+def _epoch_ms(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(as_utc(datetime.fromisoformat(value.replace("Z", "+00:00"))).timestamp() * 1000)
+    except ValueError:
+        return None
@@ -1,19 +1,114 @@
-from typing import List, Dict, Any
+import json
+import math
+import re
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterator, Optional, Sequence
 import requests
-from .base_adapter import BaseAdapter
+from .base_adapter import BaseAdapter, PushResult, as_utc
+from .rate_limit import RateLimitExceeded
 from ..canonical_model import Contact
+from ..mapping import compile_mapping, value_of, SYSTEM_FIELDS
+
+
+class MondayAPIError(Exception):
+    """
+    GraphQL errors in an otherwise successful Monday response.
+    """
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(f"Monday API Errors: {errors}")
+        self.errors = errors
+
+
+class ComplexityBudgetExhausted(RateLimitExceeded):
+    """
+    Monday rejected the query for complexity without running it; the budget
+    resets after `wait` seconds. Pushes report it as retryable instead of
+    holding the worker until then.
+    """
+
+    def __init__(self, wait: float):
+        super().__init__(wait)
+        self.args = (f"Monday complexity budget exhausted; resets in {wait:.0f}s.",)
+
 
 class MondayAdapter(BaseAdapter):
     """
     Adapter for Monday.com (GraphQL API).
     """
+    CRM_TYPE = 'monday'
+    CREDENTIAL_FIELDS = ('api_token',)
     API_URL = "https://api.monday.com/v2"
+    # Hard cap on the complexity of a single query, and on aliases per document
+    QUERY_COMPLEXITY_LIMIT = 5_000_000
+    MAX_BATCH_SIZE = 100
+
+    # GraphQL Mutation
+    CREATE_ITEM_QUERY = """
+    mutation ($board_id: ID!, $item_name: String!, $column_values: JSON!) {
+        create_item (board_id: $board_id, item_name: $item_name, column_values: $column_values) {
+            id
+        }
+    }
+    """
+
+    # Upsert lookups (search-then-update)
+    FIND_ITEM_QUERY = """
+    query ($board_id: ID!, $column_id: String!, $value: String!) {
+        items_page_by_column_values (board_id: $board_id, limit: 1, columns: [{column_id: $column_id, column_values: [$value]}]) {
+            items { id }
+        }
+    }
+    """
+    UPDATE_ITEM_QUERY = """
+    mutation ($board_id: ID!, $item_id: ID!, $column_values: JSON!) {
+        change_multiple_column_values (board_id: $board_id, item_id: $item_id, column_values: $column_values) {
+            id
+        }
+    }
+    """
+
+    # Item pagination; items_page accepts at most 500 items per page
+    MAX_PAGE_SIZE = 500
+    ITEMS_PAGE_QUERY = """
+    query ($board_id: [ID!], $limit: Int!) {
+        boards (ids: $board_id) {
+            items_page (limit: $limit) {
+                cursor
+                items { id name updated_at column_values { id text } }
+            }
+        }
+    }
+    """
+    # items_page filtered on the item's last update; the filter compares dates, not times
+    ITEMS_UPDATED_SINCE_QUERY = """
+    query ($board_id: [ID!], $limit: Int!, $query_params: ItemsQuery!) {
+        boards (ids: $board_id) {
+            items_page (limit: $limit, query_params: $query_params) {
+                cursor
+                items { id name updated_at column_values { id text } }
+            }
+        }
+    }
+    """
+    NEXT_ITEMS_PAGE_QUERY = """
+    query ($cursor: String!, $limit: Int!) {
+        next_items_page (cursor: $cursor, limit: $limit) {
+            cursor
+            items { id name updated_at column_values { id text } }
+        }
+    }
+    """
 
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.api_token = config.get("api_token")
         self.board_id = config.get("board_id")
         self.field_mapping = config.get("field_mapping", {})
+        plan = compile_mapping(self.field_mapping, skip=SYSTEM_FIELDS)
+        self.name_key = plan.source_for("Name")
+        self.columns_plan = plan.without(self.name_key)
+        self.batch_size = int(config.get("batch_size", 25))
 
     def authenticate(self) -> bool:
         if not self.api_token or not self.board_id:
@@ -21,86 +116,346 @@ class MondayAdapter(BaseAdapter):
             return False
         return True
 
-    def fetch_contacts(self) -> List[Contact]:
+    def iter_contacts(self, page_size: int = 100, since: Optional[datetime] = None) -> Iterator[Contact]:
         if not self.api_token:
-            return [Contact(id="MOCK_MON_1", first_name="Monday", last_name="User", email="monday@test.com")]
-        
-        # Implementation for fetch skipped for now as we focus on push
-        return []
-
-    def push_contact(self, contact: Contact, target: str = None) -> str:
-        import json        
-        target_board_id = target if target else self.board_id
-        if not target_board_id:
+            yield Contact(id="MOCK_MON_1", first_name="Monday", last_name="User", email="monday@test.com")
+            return
+        if not self.board_id:
              raise ValueError("Monday Board ID not provided in URL or Config.")
 
-        column_values = {}
-        flat_contact = contact.model_dump()
-        flat_contact.update(contact.custom_fields)
-        name_field_key = None
-        for key, monday_col in self.field_mapping.items():
-            if monday_col == "Name":
-                name_field_key = key
+        limit = min(page_size, self.MAX_PAGE_SIZE)
+        variables = {"board_id": [str(self.board_id)], "limit": limit}
+        if since is None:
+            data = self._query(self.ITEMS_PAGE_QUERY, variables)
+        else:
+            # A day early, as Monday compares dates in the account's time zone
+            day = (as_utc(since) - timedelta(days=1)).date().isoformat()
+            data = self._query(self.ITEMS_UPDATED_SINCE_QUERY, dict(variables, query_params={"rules": [{
+                "column_id": "__last_updated__",
+                "compare_attribute": "UPDATED_AT",
+                "compare_value": ["EXACT", day],
+                "operator": "greater_than_or_equals",
+            }]}))
+        boards = data["boards"]
+        page = boards[0]["items_page"] if boards else {}
+        while True:
+            # The filter only narrows pages down to the day; `since` is applied per item
+            rows = [self._contact_fields(item) for item in page.get("items", [])]
+            yield from self._contacts_from_page(rows, since)
+            cursor = page.get("cursor")
+            if not cursor:
                 break
-        
-        # If we found a key mapped to "Name", use its value
-        item_name = None
-        if name_field_key and name_field_key in flat_contact:
-            item_name = flat_contact[name_field_key]
-        
+            page = self._query(self.NEXT_ITEMS_PAGE_QUERY, {"cursor": cursor, "limit": limit})["next_items_page"]
+
+    def _query(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Runs one GraphQL document and returns its data. Raises
+        ComplexityBudgetExhausted when the budget has run out and MondayAPIError
+        on any other GraphQL error.
+        """
+        headers = {
+            "Authorization": self.api_token,
+            "Content-Type": "application/json"
+        }
+        response = self._request("POST", self.API_URL, json={'query': query, 'variables': variables}, headers=headers)
+        response.raise_for_status()
+        return _graphql_data(response.json())
+
+    def _contact_fields(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        values = {column["id"]: column.get("text") for column in item.get("column_values", [])}
+        fields = self.columns_plan.unproject(values)
+        fields[self.name_key or "name"] = item.get("name")
+        fields.update(id=item["id"], updated_at=item.get("updated_at"), raw_data=item)
+        return fields
+
+    def _build_item(self, contact: Contact) -> tuple:
+        """
+        Returns (item_name, column_values) for a Contact.
+        """
+        # The key mapped to "Name" becomes the item name
+        item_name = value_of(contact, self.name_key)
         if not item_name:
              raise ValueError("Monday Item Name ('Name') not mapped in configuration.")
         
         # Map everything else
-        for key, value in flat_contact.items():
-            if key == name_field_key: 
-                continue
-            
-            if key in ['id', 'created_at', 'updated_at', 'raw_data', 'custom_fields']:
-                continue
+        return item_name, self.columns_plan.project(contact)
 
-            if key in self.field_mapping:
-                monday_col_id = self.field_mapping[key]
-                column_values[monday_col_id] = value
+    def mapped_payload(self, contact: Contact, target: str = None) -> Dict[str, Any]:
+        item_name, column_values = self._build_item(contact)
+        return dict(column_values, name=item_name)
+
+    def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
+        target_board_id = target if target else self.board_id
+        if not target_board_id:
+             raise ValueError("Monday Board ID not provided in URL or Config.")
+
+        item_name, column_values = self._build_item(contact)
+        if upsert:
+            # 'name' addresses the item name, anything else a column id
+            column, value = self._upsert_key(dict(column_values, name=item_name))
 
         if not self.api_token:
             print(f"[MOCK] Pushing to Monday Board {target_board_id}: {item_name}, Cols: {column_values}")
             return "MOCK_MON_ITEM_123"
 
-        # GraphQL Mutation
-        query = """
-        mutation ($board_id: ID!, $item_name: String!, $column_values: JSON!) {
-            create_item (board_id: $board_id, item_name: $item_name, column_values: $column_values) {
-                id
-            }
-        }
-        """
-        
+        if upsert:
+            return self._upsert_item(target_board_id, column, value, item_name, column_values)
+
         variables = {
             "board_id": int(target_board_id),
             "item_name": item_name,
-            "column_values": json.dumps(column_values)
+            "column_values": json.dumps(column_values, default=str)
         }
-        
+        try:
+            return self._query(self.CREATE_ITEM_QUERY, variables)['create_item']['id']
+        except (requests.exceptions.RequestException, MondayAPIError) as e:
+            print(f"Error creating Monday Item: {e}")
+            raise
+
+    def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        board_id = target if target else self.board_id
+        if not board_id:
+             raise ValueError("Monday Board ID not provided in URL or Config.")
+
+        item_name, column_values = self._build_item(contact)
+        if not self.api_token:
+            print(f"[MOCK] Updating Monday item {remote_id} on Board {board_id}: {item_name}")
+            return remote_id
+
+        try:
+            self._query(self.UPDATE_ITEM_QUERY, {
+                "board_id": str(board_id),
+                "item_id": remote_id,
+                "column_values": json.dumps(dict(column_values, name=item_name), default=str),
+            })
+        except MondayAPIError as e:
+            if _item_missing(e.errors):
+                return None
+            raise
+        return remote_id
+
+    def prime_remote_id(self, contact: Contact, remote_id: str, target: str = None) -> None:
+        board_id = target if target else self.board_id
+        if not (self.api_token and board_id and self.upsert_field):
+            return
+        try:
+            item_name, column_values = self._build_item(contact)
+            column, value = self._upsert_key(dict(column_values, name=item_name))
+        except ValueError:
+            return
+        self._remember_remote_id(remote_id, self.api_token, board_id, column, value)
+
+    def _upsert_item(self, board_id, column: str, value: Any, item_name: str, column_values: Dict[str, Any]) -> str:
+        """
+        Search-then-update, as Monday has no native upsert. The item ID found
+        for a key is cached, so repeat updates skip the search query.
+        """
+        scope = (self.api_token, board_id, column, value)
+        update = {
+            "board_id": str(board_id),
+            "column_values": json.dumps(dict(column_values, name=item_name), default=str),
+        }
+
+        item_id = self._cached_remote_id(*scope)
+        if item_id is not None:
+            try:
+                self._query(self.UPDATE_ITEM_QUERY, dict(update, item_id=item_id))
+                return item_id
+            except MondayAPIError as e:
+                if not _item_missing(e.errors):
+                    raise
+                # Deleted on the board since it was cached
+                print(f"Cached Monday item {item_id} could not be updated: {e}")
+                self._forget_remote_id(*scope)
+
+        found = self._query(self.FIND_ITEM_QUERY, {
+            "board_id": str(board_id),
+            "column_id": column,
+            "value": str(value),
+        })["items_page_by_column_values"]["items"]
+        if found:
+            item_id = found[0]["id"]
+            self._query(self.UPDATE_ITEM_QUERY, dict(update, item_id=item_id))
+        else:
+            item_id = self._query(self.CREATE_ITEM_QUERY, {
+                "board_id": int(board_id),
+                "item_name": item_name,
+                "column_values": json.dumps(column_values, default=str),
+            })["create_item"]["id"]
+        self._remember_remote_id(item_id, *scope)
+        return item_id
+
+    def push_contacts(self, contacts: Sequence[Contact], target: str = None, upsert: bool = False) -> List[PushResult]:
+        """
+        Creates items through aliased create_item mutations, many per GraphQL
+        document. Each response reports the complexity budget; batch sizes are
+        derived from the observed cost per item. Once the budget is spent the
+        remaining items are not sent and come back retryable after its reset.
+        Upserts go one by one.
+        """
+        if upsert:
+            return super().push_contacts(contacts, target, upsert=True)
+
+        target_board_id = target if target else self.board_id
+        if not target_board_id:
+             raise ValueError("Monday Board ID not provided in URL or Config.")
+
+        results: List[Optional[PushResult]] = [None] * len(contacts)
+        items = []
+        for index, contact in enumerate(contacts):
+            try:
+                items.append((index, *self._build_item(contact)))
+            except ValueError as e:
+                results[index] = PushResult.failed(e)
+
+        if not self.api_token:
+            print(f"[MOCK] Batch pushing {len(items)} items to Monday Board {target_board_id}")
+            for index, _, _ in items:
+                results[index] = PushResult(remote_id="MOCK_MON_ITEM_123")
+            return results
+
+        budget = {"remaining": None, "reset_in": 0, "cost_per_item": None}
+        max_size = self._batch_size()
+        position = 0
+        while position < len(items):
+            size = max_size
+            cost = budget["cost_per_item"]
+            if cost:
+                size = max(1, min(size, int(self.QUERY_COMPLEXITY_LIMIT // cost)))
+                if budget["remaining"] is not None:
+                    affordable = int(budget["remaining"] // cost)
+                    if affordable < 1:
+                        # Budget spent for this minute: leave the rest for a retry after the reset
+                        exhausted = ComplexityBudgetExhausted(budget["reset_in"] + 1)
+                        for index, _, _ in items[position:]:
+                            results[index] = PushResult.failed(exhausted)
+                        break
+                    size = min(size, affordable)
+            chunk = items[position:position + size]
+            if not self._push_items(target_board_id, chunk, results, budget):
+                # Rejected for complexity: nothing ran, and nothing will until the reset
+                for index, _, _ in items[position + len(chunk):]:
+                    results[index] = results[chunk[0][0]]
+                break
+            position += len(chunk)
+        return results
+
+    def push_calls(self, creates: int, updates: int, upsert: bool = False) -> int:
+        # An upsert may try a stale cached item, then search, then write
+        if upsert:
+            return 3 * creates + updates
+        return math.ceil(creates / self._batch_size()) + updates
+
+    def _batch_size(self) -> int:
+        return max(1, min(self.batch_size, self.MAX_BATCH_SIZE))
+
+    def _push_items(self, board_id, chunk: list, results: List[Optional[PushResult]], budget: Dict[str, Any]) -> bool:
+        """
+        Creates `chunk` in one aliased mutation and writes its results.
+        Returns False when Monday rejected it for complexity.
+        """
+        definitions = ["$board_id: ID!"]
+        mutations = []
+        variables = {"board_id": int(board_id)}
+        for n, (_, item_name, column_values) in enumerate(chunk):
+            definitions.append(f"$name{n}: String!, $cols{n}: JSON!")
+            mutations.append(
+                f"item{n}: create_item (board_id: $board_id, item_name: $name{n}, column_values: $cols{n}) {{ id }}"
+            )
+            variables[f"name{n}"] = item_name
+            variables[f"cols{n}"] = json.dumps(column_values, default=str)
+        query = (
+            f"mutation ({', '.join(definitions)}) {{\n"
+            + "\n".join(mutations)
+            + "\ncomplexity { before after reset_in_x_seconds }\n}"
+        )
         headers = {
             "Authorization": self.api_token,
             "Content-Type": "application/json"
         }
-        
+
         try:
-            response = requests.post(
-                self.API_URL, 
-                json={'query': query, 'variables': variables}, 
-                headers=headers
-            )
+            response = self._request("POST", self.API_URL, json={'query': query, 'variables': variables}, headers=headers)
             response.raise_for_status()
             data = response.json()
-            
-            if "errors" in data:
-                raise Exception(f"Monday API Errors: {data['errors']}")
-                
-            return data['data']['create_item']['id']
-            
-        except Exception as e:
-            print(f"Error creating Monday Item: {e}")
-            raise
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error creating Monday Items: {e}")
+            for index, _, _ in chunk:
+                results[index] = PushResult.failed(e)
+            return True
+
+        reset_in = _complexity_reset(data.get("errors", []))
+        if reset_in is not None:
+            exhausted = ComplexityBudgetExhausted(reset_in + 1)
+            for index, _, _ in chunk:
+                results[index] = PushResult.failed(exhausted)
+            return False
+
+        payload = data.get("data") or {}
+        complexity = payload.get("complexity")
+        if complexity:
+            budget["remaining"] = complexity.get("after")
+            budget["reset_in"] = complexity.get("reset_in_x_seconds", 0)
+            spent = (complexity.get("before") or 0) - (complexity.get("after") or 0)
+            if spent > 0:
+                budget["cost_per_item"] = spent / len(chunk)
+
+        errors_by_alias = {}
+        general_errors = []
+        for error in data.get("errors", []):
+            path = error.get("path") or []
+            if path and str(path[0]).startswith("item"):
+                errors_by_alias[path[0]] = error.get("message", str(error))
+            else:
+                general_errors.append(error.get("message", str(error)))
+
+        for n, (index, _, _) in enumerate(chunk):
+            alias = f"item{n}"
+            item = payload.get(alias)
+            if item and item.get("id"):
+                results[index] = PushResult(remote_id=str(item["id"]))
+            else:
+                message = errors_by_alias.get(alias) or "; ".join(general_errors) or "Item was not created."
+                results[index] = PushResult(error=message)
+        return True
+
+
+def _graphql_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The data of a GraphQL response, raising its errors as MondayAPIError.
+    """
+    errors = data.get("errors")
+    if errors:
+        reset_in = _complexity_reset(errors)
+        if reset_in is not None:
+            raise ComplexityBudgetExhausted(reset_in + 1)
+        raise MondayAPIError(errors)
+    return data["data"]
+
+
+def _item_missing(errors: List[Dict[str, Any]]) -> bool:
+    """
+    Whether Monday rejected a mutation because its item does not exist (deleted, or never on this board).
+    """
+    for error in errors:
+        code = str((error.get("extensions") or {}).get("code", "")) + str(error.get("error_code", ""))
+        message = error.get("message", "").lower()
+        if "InvalidItemId" in code or ("item" in message and "not found" in message):
+            return True
+    return False
+
+
+def _complexity_reset(errors: List[Dict[str, Any]]) -> Optional[int]:
+    """
+    Returns the seconds until the budget resets if Monday rejected the query for complexity.
+    """
+    for error in errors:
+        code = (error.get("extensions") or {}).get("code", "")
+        message = error.get("message", "")
+        if "Complexity" in code or "complexity budget" in message.lower():
+            retry = (error.get("extensions") or {}).get("retry_in_seconds")
+            if retry is None:
+                match = re.search(r"reset in (\d+) seconds", message)
+                retry = int(match.group(1)) if match else 60
+            return int(retry)
+    return None
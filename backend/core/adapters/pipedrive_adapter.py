@@ -1,20 +1,33 @@
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional
 import requests
-from .base_adapter import BaseAdapter
+from .base_adapter import BaseAdapter, as_utc
 from ..canonical_model import Contact
+from ..mapping import compile_mapping
 
 class PipedriveAdapter(BaseAdapter):
     """
     Adapter for Pipedrive CRM (REST API v1).
     Auth: API Token via Query Parameter.
     """
+    CRM_TYPE = 'pipedrive'
+    CREDENTIAL_FIELDS = ('api_token',)
     API_BASE_URL = "https://api.pipedrive.com/v1"
+    MAX_PAGE_SIZE = 500
+    # Fields the /search endpoints can match on; anything else is a custom field
+    SEARCH_FIELDS = frozenset({"name", "email", "phone", "notes", "address", "title"})
+    # /recents item type for each list endpoint; it reports changes since a timestamp
+    RECENTS_ITEMS = {
+        "persons": "person", "organizations": "organization", "deals": "deal",
+        "activities": "activity", "products": "product", "notes": "note",
+    }
 
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.api_token = config.get("api_token")
         self.object_type = config.get("object_type")
         self.field_mapping = config.get("field_mapping", {})
+        self.mapping_plan = compile_mapping(self.field_mapping)
 
     def authenticate(self) -> bool:
         if not self.api_token:
@@ -22,10 +35,52 @@ class PipedriveAdapter(BaseAdapter):
             return False
         return True
 
-    def fetch_contacts(self) -> List[Contact]:
-        return []
+    def iter_contacts(self, page_size: int = 100, since: Optional[datetime] = None) -> Iterator[Contact]:
+        if not self.api_token:
+            return
+        endpoint = self.object_type
+        if not endpoint:
+             raise ValueError("Pipedrive Object Type (e.g. 'persons') not provided in keys.")
+
+        url = f"{self.API_BASE_URL}/{endpoint}"
+        params = {"api_token": self.api_token}
+        item_type = self.RECENTS_ITEMS.get(endpoint)
+        if since is not None and item_type:
+            # The list endpoints have no modified-since filter; /recents does
+            url = f"{self.API_BASE_URL}/recents"
+            params.update(since_timestamp=as_utc(since).strftime("%Y-%m-%d %H:%M:%S"), items=item_type)
+        limit = min(page_size, self.MAX_PAGE_SIZE)
+        start = 0
+        while True:
+            response = self._request("GET", url, params=dict(params, start=start, limit=limit))
+            response.raise_for_status()
+            body = response.json()
+
+            records = body.get("data") or []
+            if url.endswith("/recents"):
+                # Entries wrap the record; deleted records come without one
+                records = [entry["data"] for entry in records if entry.get("data")]
+            # Endpoints without /recents are filtered here, after a full scan
+            rows = [self._contact_fields(record) for record in records]
+            yield from self._contacts_from_page(rows, since)
+            pagination = (body.get("additional_data") or {}).get("pagination") or {}
+            if not pagination.get("more_items_in_collection"):
+                break
+            start = pagination.get("next_start", start + limit)
+
+    def _contact_fields(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        fields = self.mapping_plan.unproject({key: _primary_value(value) for key, value in record.items()})
+        fields.update(id=str(record["id"]), updated_at=record.get("update_time"), raw_data=record)
+        return fields
+
+    def _build_payload(self, contact: Contact) -> Dict[str, Any]:
+        # Strict mapping required
+        payload = self.mapping_plan.project(contact)
+        if not payload:
+            raise ValueError("No fields mapped for Pipedrive.")
+        return payload
 
-    def push_contact(self, contact: Contact, target: str = None) -> str:
+    def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
         endpoint = target if target else self.object_type
         if not endpoint:
              raise ValueError("Pipedrive Object Type (e.g. 'persons') not provided in keys.")
@@ -34,20 +89,7 @@ class PipedriveAdapter(BaseAdapter):
             print(f"[MOCK] Pushing to Pipedrive ({endpoint}).")
             return "MOCK_PD_ID_456"
 
-        payload = {}
-        
-        # Flatten contact data
-        flat_contact = contact.model_dump()
-        flat_contact.update(contact.custom_fields)
-        
-        # Strict mapping required
-        for key, value in flat_contact.items():
-             if key in self.field_mapping:
-                 pd_field = self.field_mapping[key]
-                 payload[pd_field] = value
-        
-        if not payload:
-            raise ValueError("No fields mapped for Pipedrive.")
+        payload = self._build_payload(contact)
 
         # Pipedrive requires name if creating a person, but we rely on mapping.
         # API Token is passed as query param 'api_token'
@@ -55,7 +97,9 @@ class PipedriveAdapter(BaseAdapter):
         params = {"api_token": self.api_token}
         
         try:
-            response = requests.post(url, params=params, json=payload)
+            if upsert:
+                return self._upsert(url, payload)
+            response = self._request("POST", url, params=params, json=payload)
             response.raise_for_status()
             data = response.json()
             return str(data.get('data', {}).get('id', 'UNKNOWN'))
@@ -66,3 +110,97 @@ class PipedriveAdapter(BaseAdapter):
         except Exception as e:
             print(f"Error creating Pipedrive Record: {e}")
             raise
+
+    def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        endpoint = target if target else self.object_type
+        if not endpoint:
+             raise ValueError("Pipedrive Object Type (e.g. 'persons') not provided in keys.")
+
+        if not self.api_token:
+            print(f"[MOCK] Updating Pipedrive ({endpoint}) {remote_id}.")
+            return remote_id
+
+        payload = self._build_payload(contact)
+        response = self._request(
+            "PUT", f"{self.API_BASE_URL}/{endpoint}/{remote_id}", params={"api_token": self.api_token}, json=payload
+        )
+        if response.status_code in (404, 410):
+            return None
+        response.raise_for_status()
+        return remote_id
+
+    def push_calls(self, creates: int, updates: int, upsert: bool = False) -> int:
+        # An upsert may try a stale cached ID, then search, then write
+        return (3 if upsert else 1) * creates + updates
+
+    def prime_remote_id(self, contact: Contact, remote_id: str, target: str = None) -> None:
+        endpoint = target if target else self.object_type
+        if not (self.api_token and endpoint and self.upsert_field):
+            return
+        try:
+            field, value = self._upsert_key(self._build_payload(contact))
+        except ValueError:
+            return
+        self._remember_remote_id(remote_id, self.api_token, f"{self.API_BASE_URL}/{endpoint}", field, value)
+
+    def _upsert(self, url: str, payload: Dict[str, Any]) -> str:
+        """
+        Search-then-update, as Pipedrive has no native upsert. The remote ID
+        found for a key is cached, so repeat updates skip the search call.
+        """
+        field, value = self._upsert_key(payload)
+        scope = (self.api_token, url, field, value)
+        params = {"api_token": self.api_token}
+
+        remote_id = self._cached_remote_id(*scope)
+        if remote_id is not None:
+            response = self._request("PUT", f"{url}/{remote_id}", params=params, json=payload)
+            if response.status_code not in (404, 410):
+                response.raise_for_status()
+                return remote_id
+            # Deleted in Pipedrive since it was cached
+            self._forget_remote_id(*scope)
+
+        remote_id = self._search(url, field, value)
+        if remote_id is None:
+            response = self._request("POST", url, params=params, json=payload)
+        else:
+            response = self._request("PUT", f"{url}/{remote_id}", params=params, json=payload)
+        response.raise_for_status()
+        remote_id = str(response.json()["data"]["id"])
+        self._remember_remote_id(remote_id, *scope)
+        return remote_id
+
+    def _search(self, url: str, field: str, value: Any) -> Optional[str]:
+        response = self._request("GET", f"{url}/search", params=self._search_params(field, value))
+        response.raise_for_status()
+        return _search_hit(response.json())
+
+    def _search_params(self, field: str, value: Any) -> Dict[str, Any]:
+        return {
+            "api_token": self.api_token,
+            "term": str(value),
+            "fields": field if field in self.SEARCH_FIELDS else "custom_fields",
+            "exact_match": "true",
+            "limit": 1,
+        }
+
+
+def _search_hit(data: Dict[str, Any]) -> Optional[str]:
+    """
+    ID of the first item in a /search response, if any.
+    """
+    items = (data.get("data") or {}).get("items") or []
+    return str(items[0]["item"]["id"]) if items else None
+
+
+def _primary_value(value: Any) -> Any:
+    """
+    Pipedrive returns emails and phones as [{"value": ..., "primary": bool}, ...].
+    """
+    if isinstance(value, list) and all(isinstance(entry, dict) and "value" in entry for entry in value):
+        if not value:
+            return None
+        primary = next((entry for entry in value if entry.get("primary")), value[0])
+        return primary["value"]
+    return value
@@ -0,0 +1,322 @@
+import hashlib
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+import requests
+from django.conf import settings
+
+try:
+    import redis
+except ImportError:  # Optional: without it every process keeps its own buckets
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Requests per second and burst size per CRM, until the CRM's own headers say otherwise.
+# HubSpot private apps: 10/s (X-HubSpot-RateLimit-Secondly); Pipedrive and
+# Dataverse meter per token / per user over longer windows.
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    'hubspot': (10, 10),
+    'pipedrive': (10, 20),
+    'dynamics': (20, 50),
+    'salesforce': (25, 25),
+    'monday': (10, 20),
+}
+FALLBACK_LIMIT = (10, 10)
+
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    """
+    The next free slot for this CRM credential is further away than CRM_RATE_LIMIT_MAX_WAIT.
+    """
+
+    def __init__(self, wait: float):
+        super().__init__(f"CRM rate limit reached; next request allowed in {wait:.1f}s.")
+        self.wait = wait
+
+
+def credential_key(crm: str, config: Dict[str, Any], fields: Iterable[str]) -> str:
+    """
+    Bucket key for one CRM credential. Secrets are hashed, never stored as-is.
+    """
+    material = "\x1f".join(str(config.get(field) or "") for field in fields)
+    return f"{crm}:{hashlib.sha256(material.encode('utf-8')).hexdigest()[:32]}"
+
+
+def _limits_for(crm: str) -> Tuple[float, float]:
+    limits = getattr(settings, 'CRM_RATE_LIMITS', {}).get(crm) or DEFAULT_LIMITS.get(crm, FALLBACK_LIMIT)
+    return float(limits[0]), float(limits[1])
+
+
+def _header(headers, *names: str) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date).
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def read_limits(response) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    """
+    (rate per second, burst, pause seconds) advertised by a CRM response.
+    Understands Retry-After, HubSpot's X-HubSpot-RateLimit-* and the common
+    X-RateLimit-Limit/Remaining/Reset trio (Pipedrive, Monday).
+    """
+    headers = response.headers
+    rate = burst = pause = None
+
+    limit = _header(headers, 'X-HubSpot-RateLimit-Max')
+    interval = _header(headers, 'X-HubSpot-RateLimit-Interval-Milliseconds')
+    secondly = _header(headers, 'X-HubSpot-RateLimit-Secondly')
+    if secondly:
+        rate, burst = secondly, secondly
+    elif limit and interval:
+        rate = limit / (interval / 1000)
+
+    remaining = _header(headers, 'X-HubSpot-RateLimit-Secondly-Remaining', 'X-HubSpot-RateLimit-Remaining',
+                        'X-RateLimit-Remaining')
+    reset = _header(headers, 'X-RateLimit-Reset')
+    if reset is not None and reset > 10 ** 9:
+        reset = max(0.0, reset - time.time())  # Epoch seconds rather than a delay
+    if remaining is not None and remaining <= 0:
+        pause = reset if reset is not None else 1.0
+
+    if response.status_code in (429, 503):
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        pause = max(pause or 0.0, retry_after if retry_after is not None else 1.0)
+    return rate, burst, pause
+
+
+class LocalBuckets:
+    """
+    In-process token buckets, used without Redis or while it is unreachable.
+    Tokens may go negative: a reservation returns how long the caller must
+    wait for its slot, which keeps callers in arrival order.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _refill(self, key: str, rate: float, burst: float, now: float) -> list:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now, rate, burst]
+        tokens, updated, rate, burst = bucket
+        bucket[0] = min(burst, tokens + max(0.0, now - updated) * rate)
+        bucket[1] = now
+        return bucket
+
+    def reserve(self, key: str, rate: float, burst: float, max_wait: float) -> Tuple[bool, float]:
+        with self._lock:
+            bucket = self._refill(key, rate, burst, time.monotonic())
+            tokens = bucket[0] - 1
+            wait = -tokens / bucket[2] if tokens < 0 else 0.0
+            if wait > max_wait:
+                return False, wait
+            bucket[0] = tokens
+            return True, wait
+
+    def adjust(self, key: str, rate: float, burst: float, new_rate: Optional[float],
+               new_burst: Optional[float], pause: Optional[float]) -> None:
+        with self._lock:
+            bucket = self._refill(key, rate, burst, time.monotonic())
+            if new_rate:
+                bucket[2] = new_rate
+            if new_burst:
+                bucket[3] = new_burst
+                bucket[0] = min(bucket[0], new_burst)
+            if pause:
+                bucket[0] = min(bucket[0], -pause * bucket[2])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+# Same algorithm as LocalBuckets, run atomically in Redis on the server clock.
+# KEYS[1] = bucket; ARGV = default rate, default burst, ttl, then per script.
+_REFILL = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate', 'burst')
+local rate = tonumber(b[3]) or tonumber(ARGV[1])
+local burst = tonumber(b[4]) or tonumber(ARGV[2])
+local tokens = tonumber(b[1]) or burst
+local ts = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+"""
+
+RESERVE_SCRIPT = _REFILL + """
+tokens = tokens - 1
+local wait = 0
+if tokens < 0 then wait = -tokens / rate end
+if wait > tonumber(ARGV[4]) then return {0, tostring(wait)} end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'rate', rate, 'burst', burst)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, tostring(wait)}
+"""
+
+# ARGV[4] = new rate, ARGV[5] = new burst, ARGV[6] = pause seconds ('' when unknown)
+ADJUST_SCRIPT = _REFILL + """
+if ARGV[4] ~= '' then rate = tonumber(ARGV[4]) end
+if ARGV[5] ~= '' then burst = tonumber(ARGV[5]); tokens = math.min(tokens, burst) end
+if ARGV[6] ~= '' then tokens = math.min(tokens, -tonumber(ARGV[6]) * rate) end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'rate', rate, 'burst', burst)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class SharedRedis:
+    """
+    Lazily connected Redis client for state shared between worker processes,
+    at CRM_RATE_LIMIT_REDIS_URL (REDIS_URL by default). After an error callers
+    fall back to local state and Redis is retried after CRM_RATE_LIMIT_REDIS_RETRY seconds.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._scripts: Dict[str, Any] = {}
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+
+    def client(self):
+        if redis is None or time.monotonic() < self._down_until:
+            return None
+        url = getattr(settings, 'CRM_RATE_LIMIT_REDIS_URL', None) or getattr(settings, 'REDIS_URL', None)
+        if not url:
+            return None
+        with self._lock:
+            if self._client is None:
+                self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._client
+
+    def script(self, source: str):
+        """
+        The Lua script registered on the client, or None while Redis is unavailable.
+        """
+        client = self.client()
+        if client is None:
+            return None
+        with self._lock:
+            script = self._scripts.get(source)
+            if script is None:
+                script = self._scripts[source] = client.register_script(source)
+        return script
+
+    def failed(self, e: Exception, fallback: str) -> None:
+        logger.warning(f"Redis unavailable, falling back to {fallback}: {e}")
+        self._down_until = time.monotonic() + getattr(settings, 'CRM_RATE_LIMIT_REDIS_RETRY', 30)
+
+
+shared_redis = SharedRedis()
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter keyed by (CRM, credential), shared by every worker
+    process through Redis at CRM_RATE_LIMIT_REDIS_URL (REDIS_URL by default).
+
+    Rates start from CRM_RATE_LIMITS and follow what the CRM reports in its
+    rate-limit and Retry-After headers, so all workers slow down together
+    after a 429. When Redis is missing or unreachable each process falls back
+    to local buckets and retries Redis after CRM_RATE_LIMIT_REDIS_RETRY seconds.
+    """
+    PREFIX = "crm-rate:"
+
+    def __init__(self, connection: SharedRedis = None):
+        self.local = LocalBuckets()
+        self.connection = connection or shared_redis
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'CRM_RATE_LIMIT_ENABLED', True)
+
+    def reserve(self, crm: str, key: str) -> float:
+        """
+        Takes a slot for one request and returns the seconds to wait before sending it.
+        Raises RateLimitExceeded instead of waiting longer than CRM_RATE_LIMIT_MAX_WAIT.
+        """
+        if not self.enabled:
+            return 0.0
+        rate, burst = _limits_for(crm)
+        max_wait = getattr(settings, 'CRM_RATE_LIMIT_MAX_WAIT', 60)
+        granted = None
+        script = self.connection.script(RESERVE_SCRIPT)
+        if script is not None:
+            try:
+                granted, wait = script(
+                    keys=[self.PREFIX + key], args=[rate, burst, self._ttl(rate, burst), max_wait]
+                )
+                wait = float(wait)
+            except redis.RedisError as e:
+                self.connection.failed(e, "local buckets")
+                granted = None
+        if granted is None:
+            granted, wait = self.local.reserve(key, rate, burst, max_wait)
+        if not granted:
+            raise RateLimitExceeded(wait)
+        return wait
+
+    def acquire(self, crm: str, key: str) -> None:
+        """
+        Blocks until a request to this CRM credential may be sent.
+        """
+        wait = self.reserve(crm, key)
+        if wait > 0:
+            time.sleep(wait)
+
+    def observe(self, crm: str, key: str, response) -> None:
+        """
+        Adapts the bucket to the limits and pauses the CRM reports on a response.
+        """
+        if not self.enabled:
+            return
+        new_rate, new_burst, pause = read_limits(response)
+        if new_rate is None and new_burst is None and pause is None:
+            return
+        if pause:
+            logger.info(f"{crm} asked to back off for {pause:.1f}s")
+        rate, burst = _limits_for(crm)
+        script = self.connection.script(ADJUST_SCRIPT)
+        if script is not None:
+            try:
+                script(
+                    keys=[self.PREFIX + key],
+                    args=[rate, burst, self._ttl(rate, burst), *("" if v is None else v for v in (new_rate, new_burst, pause))],
+                )
+                return
+            except redis.RedisError as e:
+                self.connection.failed(e, "local buckets")
+        self.local.adjust(key, rate, burst, new_rate, new_burst, pause)
+
+    @staticmethod
+    def _ttl(rate: float, burst: float) -> int:
+        # Long enough to refill completely; idle buckets then expire
+        return int(burst / rate) + 60
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,365 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Optional, Set
+import httpx
+import requests
+from django.conf import settings
+from urllib3.exceptions import NewConnectionError
+from .circuit_breaker import CircuitOpen, circuit_breaker
+from .rate_limit import RateLimitExceeded, SharedRedis, parse_retry_after, rate_limiter, shared_redis
+
+try:
+    import redis
+except ImportError:  # Optional: without it every process keeps its own budget
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+# Failures where the request never reached the CRM, safe to resend for any method.
+# A requests ConnectionError only qualifies when its cause is a failed connect
+# (see never_sent); it also covers connections dropped mid-request.
+CONNECT_ERRORS = (requests.exceptions.ConnectTimeout, httpx.ConnectError, httpx.ConnectTimeout)
+# The CRM may have applied the request before the response was lost
+READ_ERRORS = (
+    requests.exceptions.Timeout, requests.exceptions.ConnectionError, httpx.ReadTimeout, httpx.RemoteProtocolError,
+)
+
+
+def never_sent(exc: Exception) -> bool:
+    """
+    Whether a failed call provably never reached the CRM: connect timeouts and
+    refused or unresolvable connections, but not a pooled keep-alive
+    connection aborted after the request went out.
+    """
+    if isinstance(exc, CONNECT_ERRORS):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        reason = exc.args[0] if exc.args else None
+        # urllib3 wraps the cause of a failed connect in MaxRetryError.reason
+        return isinstance(getattr(reason, 'reason', reason), NewConnectionError)
+    return False
+
+
+class RetryPolicy:
+    """
+    Decides which failed CRM calls are resent and how long to wait in between.
+
+    Statuses in `retry_statuses` mean the CRM did not apply the request (throttled,
+    unavailable) and are retried for every method; `idempotent_retry_statuses`
+    only for methods that are safe to repeat, so a POST that may have created
+    a record is never sent twice. CRM-specific error codes in the body can mark
+    an otherwise permanent error as transient.
+    """
+    retry_statuses: FrozenSet[int] = frozenset({429, 503})
+    idempotent_retry_statuses: FrozenSet[int] = frozenset({500, 502, 504})
+    retryable_error_codes: FrozenSet[str] = frozenset()
+
+    def is_retryable(self, method: str, response) -> bool:
+        status = response.status_code
+        if not isinstance(status, int):
+            return False
+        if status in self.retry_statuses:
+            return True
+        if status in self.idempotent_retry_statuses and method.upper() in IDEMPOTENT_METHODS:
+            return True
+        if status >= 400 and self.retryable_error_codes:
+            return bool(self.error_codes(response) & self.retryable_error_codes)
+        return False
+
+    def is_retryable_error(self, method: str, exc: Exception) -> bool:
+        if never_sent(exc):
+            return True
+        return isinstance(exc, READ_ERRORS) and method.upper() in IDEMPOTENT_METHODS
+
+    def error_codes(self, response) -> Set[str]:
+        return set()
+
+    def delay(self, attempt: int, response=None) -> float:
+        """
+        Full-jitter exponential backoff; never shorter than the CRM's Retry-After.
+        """
+        base = getattr(settings, 'CRM_RETRY_BASE_DELAY', 0.5)
+        cap = getattr(settings, 'CRM_RETRY_MAX_DELAY', 20)
+        delay = random.uniform(0, min(cap, base * 2 ** attempt))
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return delay
+
+
+def _json(response) -> Any:
+    try:
+        return json.loads(response.text)
+    except (TypeError, ValueError):
+        return None
+
+
+class SalesforcePolicy(RetryPolicy):
+    # Record lock contention and transient server faults come back as 4xx/5xx error codes
+    retryable_error_codes = frozenset({'UNABLE_TO_LOCK_ROW', 'SERVER_UNAVAILABLE', 'QUERY_TIMEOUT'})
+
+    def error_codes(self, response) -> Set[str]:
+        body = _json(response)
+        if isinstance(body, dict):
+            body = [body]
+        if not isinstance(body, list):
+            return set()
+        return {item.get('errorCode') for item in body if isinstance(item, dict)}
+
+
+class HubSpotPolicy(RetryPolicy):
+    def is_retryable(self, method: str, response) -> bool:
+        if response.status_code == 429:
+            # The daily quota does not come back within a request's deadline
+            body = _json(response)
+            if isinstance(body, dict) and body.get('policyName') == 'DAILY':
+                return False
+        return super().is_retryable(method, response)
+
+
+class MondayPolicy(RetryPolicy):
+    # Every call is a POST to one GraphQL endpoint; its gateway answers 502 when
+    # the API does not respond in time, before any mutation runs
+    retry_statuses = RetryPolicy.retry_statuses | {502}
+
+
+POLICIES: Dict[str, RetryPolicy] = {
+    'salesforce': SalesforcePolicy(),
+    'hubspot': HubSpotPolicy(),
+    'monday': MondayPolicy(),
+}
+DEFAULT_POLICY = RetryPolicy()
+
+
+def policy_for(crm: Optional[str]) -> RetryPolicy:
+    return POLICIES.get(crm, DEFAULT_POLICY)
+
+
+def transient_wait(exc: Exception = None, response=None) -> Optional[float]:
+    """
+    Seconds after which a push that failed with `exc` (or was answered with
+    `response`) is worth sending again, or None when the failure is permanent.
+    Only failures where the CRM did not apply the request count as transient:
+    open circuits, exhausted rate limits, refused connections and 429/503.
+    """
+    if isinstance(exc, CircuitOpen):
+        return exc.retry_in
+    if isinstance(exc, RateLimitExceeded):
+        return exc.wait
+    if response is None and exc is not None:
+        response = getattr(exc, 'response', None)
+    if response is not None:
+        if response.status_code not in DEFAULT_POLICY.retry_statuses:
+            return None
+        return parse_retry_after(response.headers.get('Retry-After')) or 0.0
+    if never_sent(exc):
+        return 0.0
+    return None
+
+
+# Same arithmetic as RetryBudget's local fallback, run atomically in Redis.
+# ARGV = ratio, reserve, ttl
+DEPOSIT_SCRIPT = """
+local reserve = tonumber(ARGV[2])
+local tokens = tonumber(redis.call('GET', KEYS[1])) or reserve
+redis.call('SET', KEYS[1], tostring(math.min(reserve, tokens + tonumber(ARGV[1]))), 'EX', ARGV[3])
+"""
+
+# ARGV = reserve, ttl
+WITHDRAW_SCRIPT = """
+local tokens = tonumber(redis.call('GET', KEYS[1])) or tonumber(ARGV[1])
+if tokens < 1 then return 0 end
+redis.call('SET', KEYS[1], tostring(tokens - 1), 'EX', ARGV[2])
+return 1
+"""
+
+
+class RetryBudget:
+    """
+    Caps retries per CRM to a fraction of the calls made, so an outage does not
+    multiply traffic. Every first attempt deposits `ratio` tokens, every retry
+    spends one; `reserve` tokens are kept for quiet periods.
+
+    The budget is shared by every worker process through the rate limiter's
+    Redis connection; without Redis, or while it is unreachable, each process
+    keeps its own.
+    """
+    PREFIX = "crm-retry-budget:"
+    # An idle budget is back at its reserve; Redis forgets it after this long
+    TTL = 3600
+
+    def __init__(self, connection: SharedRedis = None):
+        self._tokens: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.connection = connection or shared_redis
+
+    def _reserve(self) -> float:
+        return float(getattr(settings, 'CRM_RETRY_BUDGET_RESERVE', 10))
+
+    def deposit(self, crm: str) -> None:
+        ratio = getattr(settings, 'CRM_RETRY_BUDGET_RATIO', 0.2)
+        script = self.connection.script(DEPOSIT_SCRIPT)
+        if script is not None:
+            try:
+                script(keys=[self.PREFIX + crm], args=[ratio, self._reserve(), self.TTL])
+                return
+            except redis.RedisError as e:
+                self.connection.failed(e, "local retry budget")
+        with self._lock:
+            reserve = self._reserve()
+            self._tokens[crm] = min(reserve, self._tokens.get(crm, reserve) + ratio)
+
+    def withdraw(self, crm: str) -> bool:
+        script = self.connection.script(WITHDRAW_SCRIPT)
+        if script is not None:
+            try:
+                return bool(int(script(keys=[self.PREFIX + crm], args=[self._reserve(), self.TTL])))
+            except redis.RedisError as e:
+                self.connection.failed(e, "local retry budget")
+        with self._lock:
+            tokens = self._tokens.get(crm, self._reserve())
+            if tokens < 1:
+                return False
+            self._tokens[crm] = tokens - 1
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+
+
+retry_budget = RetryBudget()
+
+
+class _Attempts:
+    """
+    Book-keeping shared by the sync and async loops: attempt count, deadline.
+    The loops settle the retry budget themselves (open, spend), so the async
+    one can keep its Redis calls off the event loop.
+    """
+
+    def __init__(self, crm: Optional[str], method: str):
+        self.crm = crm or 'default'
+        self.method = method
+        self.policy = policy_for(crm)
+        self.attempt = 0
+        self.max_attempts = getattr(settings, 'CRM_RETRY_MAX_ATTEMPTS', 4)
+        self.deadline = time.monotonic() + getattr(settings, 'CRM_RETRY_DEADLINE', 60)
+        self.reason = None
+
+    def open(self) -> None:
+        retry_budget.deposit(self.crm)
+
+    def backoff(self, response=None, exc: Exception = None) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt, or None to give up. The
+        retry still has to be paid for with spend.
+        """
+        if exc is not None:
+            retryable = self.policy.is_retryable_error(self.method, exc)
+        else:
+            retryable = self.policy.is_retryable(self.method, response)
+        if not retryable:
+            return None
+        self.attempt += 1
+        if self.attempt >= self.max_attempts:
+            return None
+        delay = self.policy.delay(self.attempt - 1, response)
+        if time.monotonic() + delay > self.deadline:
+            return None
+        self.reason = exc if exc is not None else response.status_code
+        return delay
+
+    def spend(self, delay: float) -> bool:
+        if not retry_budget.withdraw(self.crm):
+            logger.warning(f"{self.crm} retry budget exhausted; not retrying")
+            return False
+        logger.info(f"Retrying {self.crm} {self.method} in {delay:.2f}s ({self.reason})")
+        return True
+
+
+def send_with_retries(crm: Optional[str], key: str, method: str, url: str, send: Callable[[], Any]) -> Any:
+    """
+    Runs `send` through the circuit breaker, the rate limiter and the CRM's
+    retry policy. Returns the last response once it succeeds or stops being
+    retryable; exceptions propagate once they are permanent or retries run
+    out. Raises CircuitOpen without sending while the CRM host is failing.
+    """
+    attempts = _Attempts(crm, method)
+    attempts.open()
+    while True:
+        probe = circuit_breaker.before(crm, url)
+        rate_limiter.acquire(crm, key)
+        started = time.monotonic()
+        try:
+            response = send()
+        except (requests.exceptions.RequestException, httpx.TransportError) as e:
+            circuit_breaker.record(crm, url, probe, time.monotonic() - started, exc=e)
+            delay = attempts.backoff(exc=e)
+            if delay is None or not attempts.spend(delay):
+                raise
+        else:
+            circuit_breaker.record(crm, url, probe, time.monotonic() - started, response=response)
+            rate_limiter.observe(crm, key, response)
+            delay = attempts.backoff(response=response)
+            if delay is None or not attempts.spend(delay):
+                return response
+        time.sleep(delay)
+
+
+async def asend_with_retries(crm: Optional[str], key: str, method: str, url: str,
+                             send: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Async counterpart of send_with_retries.
+    """
+    attempts = _Attempts(crm, method)
+    # The circuit breaker, limiter and retry budget may call Redis; keep that
+    # blocking I/O off the event loop
+    await asyncio.to_thread(attempts.open)
+    while True:
+        probe = await asyncio.to_thread(circuit_breaker.before, crm, url)
+        wait = await asyncio.to_thread(rate_limiter.reserve, crm, key)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        started = time.monotonic()
+        try:
+            response = await send()
+        except (requests.exceptions.RequestException, httpx.TransportError) as e:
+            await asyncio.to_thread(circuit_breaker.record, crm, url, probe, time.monotonic() - started, exc=e)
+            delay = attempts.backoff(exc=e)
+            if delay is None or not await asyncio.to_thread(attempts.spend, delay):
+                raise
+        else:
+            await asyncio.to_thread(
+                circuit_breaker.record, crm, url, probe, time.monotonic() - started, response=response
+            )
+            await asyncio.to_thread(rate_limiter.observe, crm, key, response)
+            delay = attempts.backoff(response=response)
+            if delay is None or not await asyncio.to_thread(attempts.spend, delay):
+                return response
+        await asyncio.sleep(delay)
+
+
+class LimitedSession:
+    """
+    Wraps a pooled session so every request goes through the circuit breaker,
+    rate limiter and retry policy; for client libraries (simple_salesforce) that take a session object.
+    """
+
+    def __init__(self, session: requests.Session, crm: str, key: str):
+        self.session = session
+        self.crm = crm
+        self.key = key
+
+    def request(self, method, url, **kwargs):
+        return send_with_retries(self.crm, self.key, method, url, lambda: self.session.request(method, url, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
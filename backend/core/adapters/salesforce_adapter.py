@@ -1,13 +1,35 @@
-from typing import List, Dict, Any
+import csv
+import io
+import json
+import math
+from datetime import datetime
+from urllib.parse import quote
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+import requests
+from django.conf import settings
 from simple_salesforce import Salesforce
-from .base_adapter import BaseAdapter
+from simple_salesforce.exceptions import SalesforceExpiredSession, SalesforceResourceNotFound
+from .base_adapter import BaseAdapter, PushResult, as_utc
+from .http import session_for
+from .retry import LimitedSession
+from .token_store import secret_digest, token_store
 from ..canonical_model import Contact
+from ..mapping import _MISSING, compile_mapping, value_of, SYSTEM_FIELDS
+
+# Collections error codes for an update whose record no longer exists
+MISSING_RECORD_CODES = ("ENTITY_IS_DELETED", "INVALID_CROSS_REFERENCE_KEY", "NOT_FOUND")
 
 class SalesforceAdapter(BaseAdapter):
     """
     Adapter for Salesforce CRM.
     """
-    
+    CRM_TYPE = 'salesforce'
+    CREDENTIAL_FIELDS = ('instance_url', 'client_id', 'username')
+    COLLECTION_SIZE = 200
+    # Selected by iter_contacts on Contact/Lead, on top of the mapped fields.
+    # SystemModstamp is indexed and also moves on system-driven changes.
+    FETCH_FIELDS = ("Id", "FirstName", "LastName", "Email", "Phone", "SystemModstamp")
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.username = config.get("username")
@@ -21,7 +43,21 @@ class SalesforceAdapter(BaseAdapter):
         
         self.object_name = config.get("object_name")
         self.domain = config.get("domain", "login")
+        plan = compile_mapping(config.get('field_mapping', {}), skip=SYSTEM_FIELDS | {'first_name', 'last_name'})
+        self.fetch_plan = compile_mapping(config.get('field_mapping', {}), skip=SYSTEM_FIELDS)
+        self.lastname_key = plan.source_for("LastName")
+        self.mapping_plan = plan.without(self.lastname_key)
+        # Org session timeout in seconds (Setup -> Session Settings)
+        self.token_lifetime = config.get("token_lifetime", 7200)
+        # Batches of at least this many records go through Bulk API 2.0
+        self.bulk_threshold = config.get("bulk_threshold", getattr(settings, 'SALESFORCE_BULK_THRESHOLD', 2000))
         self.client = None
+        self._token_key = None
+        if not (self.session_id and self.instance_url) and self.username and self.client_id:
+            self._token_key = (
+                "salesforce", self._login_domain(), self.client_id, self.username,
+                secret_digest(f"{self.client_secret}\x1f{self.password}{self.security_token}"),
+            )
 
     def authenticate(self) -> bool:
         try:
@@ -29,36 +65,12 @@ class SalesforceAdapter(BaseAdapter):
                 # Legacy: Session ID
                 self.client = Salesforce(
                     instance_url=self.instance_url,
-                    session_id=self.session_id
+                    session_id=self.session_id,
+                    session=LimitedSession(session_for(self.instance_url), self.CRM_TYPE, self.rate_limit_key)
                 )
             elif self.username and self.password and self.client_id and self.client_secret:
                 # OAuth: Username-Password Flow (REST API)
-                import requests
-                
-                # Determine Login URL (Test vs Prod)
-                login_domain = self.domain if self.domain else "login"
-                if "test" in (self.instance_url or ""):
-                    login_domain = "test"
-                
-                token_url = f"https://{login_domain}.salesforce.com/services/oauth2/token"
-                
-                payload = {
-                    'grant_type': 'password',
-                    'client_id': self.client_id,
-                    'client_secret': self.client_secret,
-                    'username': self.username,
-                    'password': f"{self.password}{self.security_token}"
-                }
-                
-                response = requests.post(token_url, data=payload)
-                if response.status_code != 200:
-                    raise Exception(f"OAuth Error: {response.text}")
-                
-                data = response.json()
-                self.client = Salesforce(
-                    instance_url=data['instance_url'],
-                    session_id=data['access_token']
-                )
+                self._refresh_client()
             else:
                 print("[Mock] Salesforce credentials incomplete.")
                 return False
@@ -68,49 +80,94 @@ class SalesforceAdapter(BaseAdapter):
             print(f"Salesforce Auth Failed: {e}")
             raise
 
-    def fetch_contacts(self) -> List[Contact]:
-        if not self.client:
-            # Mock Data
-            return [
-                Contact(id="MOCK_SF_1", first_name="Django", last_name="User", email="django@test.com")
-            ]
-
-        query = "SELECT Id, FirstName, LastName, Email, Phone FROM Contact LIMIT 10"
-        results = self.client.query(query)
+    def _request_token(self) -> Dict[str, Any]:
+        """
+        Runs the OAuth Username-Password flow and returns the token response.
+        """
+        token_url = f"https://{self._login_domain()}.salesforce.com/services/oauth2/token"
         
-        contacts = []
-        for record in results['records']:
-            contacts.append(Contact(
-                id=record['Id'],
-                first_name=record['FirstName'],
-                last_name=record['LastName'],
-                email=record['Email'],
-                phone=record['Phone'],
-                raw_data=record
-            ))
-        return contacts
-
-    def push_contact(self, contact: Contact, target: str = None) -> str:
-        # Determine Salesforce Object: Argument (Priority) > Config (Priority 2)
-        sobject_name = target if target else self.object_name
-        if not sobject_name:
-             raise ValueError("Salesforce Object Name not provided in URL or Config.")
+        payload = {
+            'grant_type': 'password',
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'username': self.username,
+            'password': f"{self.password}{self.security_token}"
+        }
         
-        sf_contact = {}
+        response = self._request("POST", token_url, data=payload)
+        if response.status_code != 200:
+            raise Exception(f"OAuth Error: {response.text}")
         
-        # Flatten contact data
-        flat_contact = contact.model_dump()
-        flat_contact.update(contact.custom_fields)
-
-        field_mapping = self.config.get('field_mapping', {})
-        lastname_key = None
-        for key, crm_field in field_mapping.items():
-            if crm_field == "LastName":
-                lastname_key = key
+        data = response.json()
+        # The password flow does not report a lifetime; fall back to the org session timeout
+        data.setdefault('expires_in', self.token_lifetime)
+        return data
+
+    def _login_domain(self) -> str:
+        # Determine Login URL (Test vs Prod)
+        login_domain = self.domain if self.domain else "login"
+        if "test" in (self.instance_url or ""):
+            login_domain = "test"
+        return login_domain
+
+    def _refresh_client(self, force: bool = False) -> None:
+        """
+        Rebuilds the client whenever the shared token store hands out a new session.
+        """
+        if self._token_key is None:
+            return
+        if force:
+            token_store.invalidate(self._token_key)
+        data = token_store.get(self._token_key, self._request_token)
+        if self.client is None or self.client.session_id != data['access_token']:
+            self.client = Salesforce(
+                instance_url=data['instance_url'],
+                session_id=data['access_token'],
+                session=LimitedSession(session_for(data['instance_url']), self.CRM_TYPE, self.rate_limit_key)
+            )
+
+    def iter_contacts(self, page_size: int = 100, since: Optional[datetime] = None) -> Iterator[Contact]:
+        if not self.client:
+            # Mock Data
+            yield Contact(id="MOCK_SF_1", first_name="Django", last_name="User", email="django@test.com")
+            return
+
+        self._refresh_client()
+        sobject_name = self.object_name or "Contact"
+        standard = self.FETCH_FIELDS if sobject_name in ("Contact", "Lead") else ("Id", "SystemModstamp")
+        fields = list(dict.fromkeys(standard + tuple(self.fetch_plan.targets())))
+        query = f"SELECT {', '.join(fields)} FROM {sobject_name}"
+        if since is not None:
+            query += f" WHERE SystemModstamp > {_soql_datetime(since)}"
+        query += " ORDER BY SystemModstamp"
+        # Salesforce treats batchSize as a hint within 200..2000
+        headers = {"Sforce-Query-Options": f"batchSize={min(max(page_size, 200), 2000)}"}
+
+        result = self.client.query(query, headers=headers)
+        while True:
+            yield from self._contacts_from_page([self._contact_fields(record) for record in result['records']])
+            if result.get('done', True) or not result.get('nextRecordsUrl'):
                 break
-        
-        if lastname_key and lastname_key in flat_contact:
-             sf_contact['LastName'] = flat_contact[lastname_key]
+            result = self.client.query_more(result['nextRecordsUrl'], identifier_is_url=True, headers=headers)
+
+    def _contact_fields(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        fields = self.fetch_plan.unproject(record)
+        fields.update(
+            id=record['Id'],
+            updated_at=record.get('SystemModstamp'),
+            raw_data=record,
+        )
+        for key, sf_field in (("first_name", "FirstName"), ("last_name", "LastName"), ("email", "Email"), ("phone", "Phone")):
+            if sf_field in record:
+                fields.setdefault(key, record[sf_field])
+        return fields
+
+    def _build_record(self, contact: Contact, sobject_name: str) -> Dict[str, Any]:
+        sf_contact = {}
+
+        lastname = value_of(contact, self.lastname_key, _MISSING) if self.lastname_key else _MISSING
+        if lastname is not _MISSING:
+             sf_contact['LastName'] = lastname
         elif sobject_name in ['Contact', 'Lead']:
             if contact.last_name:
                 sf_contact['LastName'] = contact.last_name
@@ -122,25 +179,263 @@ class SalesforceAdapter(BaseAdapter):
             sf_contact['FirstName'] = contact.first_name
 
         # Map everything else
-        for key, value in flat_contact.items():
-            if key == lastname_key: 
-                continue 
-            
-            if key in ['id', 'created_at', 'updated_at', 'raw_data', 'custom_fields', 'first_name', 'last_name']:
-                continue
+        sf_contact.update(self.mapping_plan.project(contact))
+        return sf_contact
+
+    def mapped_payload(self, contact: Contact, target: str = None) -> Dict[str, Any]:
+        return self._build_record(contact, target if target else self.object_name)
 
-            if key in field_mapping:
-                crm_field = field_mapping[key]
-                sf_contact[crm_field] = value
+    def push_contact(self, contact: Contact, target: str = None, upsert: bool = False) -> str:
+        # Determine Salesforce Object: Argument (Priority) > Config (Priority 2)
+        sobject_name = target if target else self.object_name
+        if not sobject_name:
+             raise ValueError("Salesforce Object Name not provided in URL or Config.")
+        
+        sf_contact = self._build_record(contact, sobject_name)
+        if upsert:
+            # Native upsert on an External ID field: PATCH /sobjects/<object>/<field>/<value>
+            field, value = self._upsert_key(sf_contact)
+            sf_contact = {key: item for key, item in sf_contact.items() if key != field}
                 
         if not self.client:
             print(f"[MOCK] Pushing to Salesforce: {sf_contact}")
             return "MOCK_SF_ID_123"
 
-        try:
+        def send():
             sobject = getattr(self.client, sobject_name)
-            result = sobject.create(sf_contact)
-            return result['id']
+            if not upsert:
+                return sobject.create(sf_contact)['id']
+            response = sobject.upsert(f"{field}/{quote(str(value), safe='')}", sf_contact, raw_response=True)
+            return response.json()['id']
+
+        try:
+            self._refresh_client()
+            try:
+                return send()
+            except SalesforceExpiredSession:
+                self._refresh_client(force=True)
+                return send()
         except Exception as e:
             print(f"Error creating Salesforce Contact: {e}")
             raise
+
+    def update_contact(self, remote_id: str, contact: Contact, target: str = None) -> Optional[str]:
+        sobject_name = target if target else self.object_name
+        if not sobject_name:
+             raise ValueError("Salesforce Object Name not provided in URL or Config.")
+
+        sf_contact = self._build_record(contact, sobject_name)
+        if not self.client:
+            print(f"[MOCK] Updating Salesforce {remote_id}: {sf_contact}")
+            return remote_id
+
+        def send():
+            getattr(self.client, sobject_name).update(remote_id, sf_contact)
+            return remote_id
+
+        self._refresh_client()
+        try:
+            try:
+                return send()
+            except SalesforceExpiredSession:
+                self._refresh_client(force=True)
+                return send()
+        except SalesforceResourceNotFound:
+            return None
+
+    def push_contacts(self, contacts: Sequence[Contact], target: str = None, upsert: bool = False) -> List[PushResult]:
+        """
+        Uses sObject Collections (COLLECTION_SIZE records per call) for mid-size
+        batches and a Bulk API 2.0 ingest job at or above `bulk_threshold` records.
+        In upsert mode both use their native upsert on `upsert_field`. Records
+        sent in a Bulk job come back pending with its job_id; job_results
+        reads their outcome once the job finishes.
+        """
+        sobject_name = target if target else self.object_name
+        if not sobject_name:
+             raise ValueError("Salesforce Object Name not provided in URL or Config.")
+
+        results: List[Optional[PushResult]] = [None] * len(contacts)
+        records, positions = [], []
+        for index, contact in enumerate(contacts):
+            record = self._build_record(contact, sobject_name)
+            if upsert:
+                try:
+                    self._upsert_key(record)
+                except ValueError as e:
+                    results[index] = PushResult.failed(e)
+                    continue
+            records.append(record)
+            positions.append(index)
+
+        if not self.client:
+            print(f"[MOCK] Batch pushing {len(records)} records to Salesforce ({sobject_name})")
+            pushed = [PushResult(remote_id="MOCK_SF_ID_123") for _ in records]
+        else:
+            self._refresh_client()
+            external_id = self.upsert_field if upsert else None
+            if len(records) >= self.bulk_threshold:
+                pushed = self._push_bulk(sobject_name, records, external_id)
+            else:
+                pushed = self._push_collections(sobject_name, records, external_id)
+        for index, result in zip(positions, pushed):
+            results[index] = result
+        return results
+
+    def update_contacts(self, updates: Sequence[Tuple[str, Contact]], target: str = None) -> List[Optional[PushResult]]:
+        """
+        Updates known records by Id through sObject Collections, COLLECTION_SIZE per call.
+        """
+        sobject_name = target if target else self.object_name
+        if not sobject_name:
+             raise ValueError("Salesforce Object Name not provided in URL or Config.")
+
+        records = [dict(self._build_record(contact, sobject_name), Id=remote_id) for remote_id, contact in updates]
+        if not self.client:
+            print(f"[MOCK] Batch updating {len(records)} records in Salesforce ({sobject_name})")
+            return [PushResult(remote_id=remote_id) for remote_id, _ in updates]
+        self._refresh_client()
+        return self._push_collections(sobject_name, records, update=True)
+
+    def push_calls(self, creates: int, updates: int, upsert: bool = False) -> int:
+        # A Bulk job takes three calls (create, upload, close); fewer creates go through Collections
+        collections = math.ceil(min(creates, self.bulk_threshold - 1) / self.COLLECTION_SIZE)
+        bulk = 3 if creates >= self.bulk_threshold else 0
+        return max(collections, bulk) + math.ceil(updates / self.COLLECTION_SIZE)
+
+    def _api_call(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Calls a REST path relative to the client's versioned base URL.
+        """
+        headers = dict(self.client.headers)
+        headers.update(kwargs.pop('headers', {}))
+        response = self._request(method, self.client.base_url + path, headers=headers, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def _push_collections(self, sobject_name: str, records: List[Dict[str, Any]], external_id: str = None,
+                          update: bool = False) -> List[Optional[PushResult]]:
+        """
+        Sends `records` through sObject Collections: create, upsert on
+        `external_id`, or with `update` an update of records carrying their Id,
+        where records deleted from Salesforce come back as None.
+        """
+        if external_id:
+            method, path = "PATCH", f"composite/sobjects/{sobject_name}/{external_id}"
+        elif update:
+            method, path = "PATCH", "composite/sobjects"
+        else:
+            method, path = "POST", "composite/sobjects"
+        results = []
+        for start in range(0, len(records), self.COLLECTION_SIZE):
+            chunk = records[start:start + self.COLLECTION_SIZE]
+            body = {
+                "allOrNone": False,
+                "records": [dict(record, attributes={"type": sobject_name}) for record in chunk],
+            }
+            try:
+                response = self._api_call(method, path, data=json.dumps(body, default=str))
+            except requests.exceptions.RequestException as e:
+                print(f"Salesforce Collections Error: {e}")
+                results.extend(PushResult.failed(e) for _ in chunk)
+                continue
+            for item in response.json():
+                if item.get("success"):
+                    results.append(PushResult(remote_id=item["id"]))
+                elif update and any(error.get("statusCode") in MISSING_RECORD_CODES for error in item.get("errors", [])):
+                    results.append(None)
+                else:
+                    message = "; ".join(
+                        f"{error.get('statusCode')}: {error.get('message')}" for error in item.get("errors", [])
+                    )
+                    results.append(PushResult(error=message or "Unknown error"))
+        return results
+
+    def _push_bulk(self, sobject_name: str, records: List[Dict[str, Any]], external_id: str = None) -> List[PushResult]:
+        """
+        Submits one Bulk API 2.0 insert job (upsert with `external_id`):
+        create, upload CSV, close. Salesforce processes it in the background,
+        so every record comes back pending with the job's ID.
+        """
+        columns, rows = self._csv_rows(records)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+        try:
+            job_spec = {
+                "object": sobject_name,
+                "operation": "upsert" if external_id else "insert",
+                "contentType": "CSV",
+                "lineEnding": "LF",
+            }
+            if external_id:
+                job_spec["externalIdFieldName"] = external_id
+            job = self._api_call("POST", "jobs/ingest", data=json.dumps(job_spec)).json()
+            job_path = f"jobs/ingest/{job['id']}"
+            self._api_call("PUT", f"{job_path}/batches", data=buffer.getvalue().encode("utf-8"),
+                           headers={"Content-Type": "text/csv"})
+            self._api_call("PATCH", job_path, data=json.dumps({"state": "UploadComplete"}))
+        except Exception as e:
+            print(f"Salesforce Bulk API Error: {e}")
+            return [PushResult.failed(e) for _ in records]
+        return [PushResult(job_id=job["id"]) for _ in records]
+
+    def job_results(self, job_id: str, records: List[Dict[str, Any]]) -> Optional[List[PushResult]]:
+        """
+        Reads a finished Bulk API 2.0 job's successful/failed result sets.
+        Result rows echo the uploaded values, which is how they are matched
+        back to positions in `records`.
+        """
+        self._refresh_client()
+        job_path = f"jobs/ingest/{job_id}"
+        info = self._api_call("GET", job_path).json()
+        if info.get("state") not in ("JobComplete", "Failed", "Aborted"):
+            return None
+        successful = self._api_call("GET", f"{job_path}/successfulResults/", headers={"Accept": "text/csv"}).text
+        failed = self._api_call("GET", f"{job_path}/failedResults/", headers={"Accept": "text/csv"}).text
+
+        columns, rows = self._csv_rows(records)
+        positions: Dict[tuple, List[int]] = {}
+        for index, row in enumerate(rows):
+            positions.setdefault(row, []).append(index)
+
+        results: List[Optional[PushResult]] = [None] * len(records)
+        for row in csv.DictReader(io.StringIO(successful)):
+            index = self._take_position(positions, row, columns)
+            if index is not None:
+                results[index] = PushResult(remote_id=row["sf__Id"])
+        for row in csv.DictReader(io.StringIO(failed)):
+            index = self._take_position(positions, row, columns)
+            if index is not None:
+                results[index] = PushResult(error=row.get("sf__Error") or "Unknown error")
+
+        job_error = info.get("errorMessage") or f"Bulk job finished as {info.get('state')}"
+        return [result or PushResult(error=job_error) for result in results]
+
+    def _csv_rows(self, records: List[Dict[str, Any]]) -> Tuple[List[str], List[tuple]]:
+        columns = list(dict.fromkeys(field for record in records for field in record))
+        return columns, [tuple(self._csv_value(record.get(column)) for column in columns) for record in records]
+
+    @staticmethod
+    def _take_position(positions: Dict[tuple, List[int]], row: Dict[str, str], columns: List[str]) -> Optional[int]:
+        candidates = positions.get(tuple(row.get(column, "") for column in columns))
+        return candidates.pop(0) if candidates else None
+
+    @staticmethod
+    def _csv_value(value: Any) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+
+
+def _soql_datetime(value: datetime) -> str:
+    """
+    SOQL datetime literal in UTC.
+    """
+    return as_utc(value).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TokenFetcher = Callable[[], Dict[str, Any]]
+
+
+def secret_digest(secret: Any) -> str:
+    """
+    Stands in for a secret in token keys, so a token is only shared by
+    callers holding the same secret without keeping the secret itself.
+    """
+    return hashlib.sha256(str(secret or "").encode("utf-8")).hexdigest()[:32]
+
+
+class TokenStore:
+    """
+    Process-wide store for OAuth access tokens shared by all adapter instances.
+
+    Tokens are kept until `expires_in` runs out. Once a token enters the
+    refresh window (`refresh_margin` seconds before expiry) callers keep getting
+    the current token while a single background thread fetches a new one.
+    Refreshes are single-flight per key, so concurrent callers for the same
+    tenant never trigger more than one request to the identity provider.
+    """
+
+    def __init__(self, refresh_margin: float = 300, default_ttl: float = 3600):
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self._entries: Dict[Hashable, tuple] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, key: Hashable, fetch: TokenFetcher) -> Dict[str, Any]:
+        """
+        Returns the token payload for `key`, calling `fetch` only when needed.
+        `fetch` must return the identity provider's JSON (access_token, expires_in, ...).
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            data, expires_at = entry
+            if now < expires_at - self.refresh_margin:
+                return data
+            if now < expires_at:
+                self._refresh_in_background(key, fetch)
+                return data
+        return self._refresh(key, fetch)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Forgets a token the CRM rejected so the next call fetches a new one.
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _lock_for(self, key: Hashable) -> threading.Lock:
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _store(self, key: Hashable, data: Dict[str, Any]) -> None:
+        expires_in = data.get("expires_in")
+        if expires_in is None:
+            expires_in = self.default_ttl
+        expires_in = float(expires_in)
+        self._entries[key] = (data, time.monotonic() + expires_in)
+
+    def _is_fresh(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() < entry[1] - self.refresh_margin
+
+    def _refresh(self, key: Hashable, fetch: TokenFetcher) -> Dict[str, Any]:
+        with self._lock_for(key):
+            # Another caller may have refreshed while we were waiting
+            if self._is_fresh(key):
+                return self._entries[key][0]
+            data = fetch()
+            self._store(key, data)
+            return data
+
+    def _refresh_in_background(self, key: Hashable, fetch: TokenFetcher) -> None:
+        lock = self._lock_for(key)
+        if not lock.acquire(blocking=False):
+            return  # A refresh for this key is already in flight
+
+        def run():
+            try:
+                if not self._is_fresh(key):
+                    self._store(key, fetch())
+            except Exception as e:
+                logger.warning(f"Background token refresh failed for {key[0]}: {e}")
+            finally:
+                lock.release()
+
+        threading.Thread(target=run, name="token-refresh", daemon=True).start()
+
+
+token_store = TokenStore(
+    refresh_margin=getattr(settings, 'CRM_TOKEN_REFRESH_MARGIN', 300),
+    default_ttl=getattr(settings, 'CRM_TOKEN_DEFAULT_TTL', 3600),
+)
@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import CRMConfiguration
+from .models import CRMConfiguration, SyncJob, OutboxMessage, SyncState, IdempotencyRecord, RemoteRecord
 
 # Register your models here.
-admin.site.register(CRMConfiguration)
\ No newline at end of file
+admin.site.register(CRMConfiguration)
+admin.site.register(SyncJob)
+admin.site.register(OutboxMessage)
+admin.site.register(SyncState)
+admin.site.register(IdempotencyRecord)
+admin.site.register(RemoteRecord)
@@ -0,0 +1,54 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class AdapterCache:
+    """
+    Process-wide LRU cache of authenticated adapters.
+    Entries expire after `ttl` seconds and the least recently used entry is
+    evicted once `max_size` is reached.
+    """
+
+    def __init__(self, ttl: float = 900, max_size: int = 512):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Any, crm_type: str) -> None:
+        """
+        Drops every cached version of a user's adapter for the given CRM.
+        Keys are (user_id, crm_type, updated_at) tuples.
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key[:2] == (user_id, crm_type)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
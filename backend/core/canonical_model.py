@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter, ValidationError
+from collections.abc import Sequence as SequenceABC
+from typing import Optional, Dict, Any, Iterator, List, Sequence, Tuple
 from datetime import datetime
+from typing_extensions import TypedDict
 
 class UnifiedEntity(BaseModel):
     """Base class for all unified entities."""
@@ -20,30 +22,237 @@ class Contact(UnifiedEntity):
     custom_fields: Dict[str, Any] = Field(default_factory=dict, description="Additional dynamic fields")
 
     def __init__(self, **data):
-        # Extract known fields
-        known_fields = {
-            'id', 'first_name', 'last_name', 'email', 'phone', 
-            'company_name', 'job_title',
-            'raw_data', 'created_at', 'updated_at'
-        }
-        
-        # Everything else goes into custom_fields
-        custom_fields = data.get('custom_fields', {})
-        for key, value in data.items():
-            if key not in known_fields and key != 'custom_fields':
-                custom_fields[key] = value
-        
-        super().__init__(
-            id=data.get('id'),
-            first_name=data.get('first_name'),
-            last_name=data.get('last_name'),
-            email=data.get('email'),
-            phone=data.get('phone'),
-            company_name=data.get('company_name'),
-            job_title=data.get('job_title'),
-            custom_fields=custom_fields,
-            raw_data=data.get('raw_data')
-        )
+        # Everything but the declared fields goes into custom_fields
+        super().__init__(**_split_contact_fields(data))
+
+    @classmethod
+    def from_dicts(cls, rows: Sequence[Any], trusted: bool = False) -> Tuple[List[Optional["Contact"]], Dict[int, str]]:
+        """
+        Builds Contacts from many raw dicts in one validation pass.
+        Returns a list aligned with `rows` (None where a row failed) and a
+        {row index: error message} dict. With `trusted=True` rows skip
+        validation entirely (model_construct); only use it for data this
+        service already validated, e.g. payloads re-read from its own tables.
+        """
+        errors: Dict[int, str] = {}
+        split, positions = [], []
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors[index] = "Expected an object."
+                continue
+            try:
+                split.append(_split_contact_fields(row))
+            except ValueError as e:
+                errors[index] = str(e)
+                continue
+            positions.append(index)
+
+        if not trusted:
+            # Validate plain field dicts in one call; Contact.__init__ would run per row
+            try:
+                split = _contact_list_adapter().validate_python(split)
+            except ValidationError as e:
+                failed: Dict[int, List[str]] = {}
+                for error in e.errors():
+                    field = ".".join(str(part) for part in error["loc"][1:])
+                    failed.setdefault(error["loc"][0], []).append(f"{field}: {error['msg']}" if field else error["msg"])
+                for position, messages in failed.items():
+                    errors[positions[position]] = "; ".join(messages)
+                keep = [i for i in range(len(split)) if i not in failed]
+                split = _contact_list_adapter().validate_python([split[i] for i in keep])
+                positions = [positions[i] for i in keep]
+        built = [cls.model_construct(**fields) for fields in split]
+
+        contacts: List[Optional[Contact]] = [None] * len(rows)
+        for index, contact in zip(positions, built):
+            contacts[index] = contact
+        return contacts, errors
+
+# Contact's declared fields; any other key is a custom field
+CONTACT_FIELDS = frozenset(Contact.model_fields) - {'custom_fields'}
+
+
+def _split_contact_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Splits raw contact data into CONTACT_FIELDS and custom_fields, folding
+    unknown keys into the latter. Raises ValueError when custom_fields is not
+    an object.
+    """
+    fields = {}
+    custom_fields = row.get('custom_fields') or {}
+    if not isinstance(custom_fields, dict):
+        raise ValueError("custom_fields: Input should be a valid dictionary")
+    custom_fields = dict(custom_fields)
+    for key, value in row.items():
+        if key in CONTACT_FIELDS:
+            fields[key] = value
+        elif key != 'custom_fields':
+            custom_fields[key] = value
+    fields['custom_fields'] = custom_fields
+    return fields
+
+
+_CONTACT_LIST_ADAPTER = None
+
+
+def _contact_list_adapter() -> TypeAdapter:
+    """
+    Validator for lists of Contact field dicts, mirroring Contact's annotations.
+    """
+    global _CONTACT_LIST_ADAPTER
+    if _CONTACT_LIST_ADAPTER is None:
+        fields = TypedDict('ContactFields', {
+            name: field.annotation for name, field in Contact.model_fields.items()
+        }, total=False)
+        _CONTACT_LIST_ADAPTER = TypeAdapter(List[fields])
+    return _CONTACT_LIST_ADAPTER
+
+
+_MISSING = object()
+
+
+class _ContactColumns:
+    """
+    Shared storage behind a ContactBatch and all of its slices.
+    Known fields are one list per field (created on first non-null value);
+    custom fields are one tuple per row, indexed by a shared key table.
+    """
+
+    __slots__ = ('columns', 'custom_keys', 'key_index', 'custom_rows', 'size')
+
+    def __init__(self):
+        self.columns: Dict[str, list] = {}
+        self.custom_keys: List[str] = []
+        self.key_index: Dict[str, int] = {}
+        self.custom_rows: List[tuple] = []
+        self.size = 0
+
+    def append(self, fields: Dict[str, Any], custom_fields: Dict[str, Any]) -> None:
+        columns = self.columns
+        for name, column in columns.items():
+            column.append(fields.get(name))
+        for name, value in fields.items():
+            if value is not None and name not in columns:
+                columns[name] = [None] * self.size + [value]
+
+        row = []
+        for key, value in custom_fields.items():
+            position = self.key_index.get(key)
+            if position is None:
+                position = self.key_index[key] = len(self.custom_keys)
+                self.custom_keys.append(key)
+            if position >= len(row):
+                row.extend([_MISSING] * (position + 1 - len(row)))
+            row[position] = value
+        self.custom_rows.append(tuple(row))
+        self.size += 1
+
+    def custom_fields(self, index: int) -> Dict[str, Any]:
+        keys = self.custom_keys
+        return {keys[i]: value for i, value in enumerate(self.custom_rows[index]) if value is not _MISSING}
+
+
+class ContactBatch(SequenceABC):
+    """
+    Column-oriented batch of contacts for high-volume pipelines.
+
+    Behaves like a read-only sequence of Contact, so every adapter's
+    push_contacts accepts it, but rows are only materialised when accessed.
+    Slicing returns views over the same columns without copying any data.
+    """
+
+    # Rows validated per pydantic call in from_dicts; bounds the transient Contacts
+    VALIDATION_CHUNK = 1000
+
+    __slots__ = ('_store', '_start', '_stop')
+
+    def __init__(self, _store: Optional[_ContactColumns] = None, _start: int = 0, _stop: Optional[int] = None):
+        self._store = _store if _store is not None else _ContactColumns()
+        self._start = _start
+        self._stop = _stop
+
+    @classmethod
+    def from_contacts(cls, contacts: Sequence[Contact]) -> "ContactBatch":
+        batch = cls()
+        for contact in contacts:
+            batch.append(contact)
+        return batch
+
+    @classmethod
+    def from_dicts(cls, rows: Sequence[Any], trusted: bool = False) -> Tuple["ContactBatch", Dict[int, str]]:
+        """
+        Columnar counterpart of Contact.from_dicts. The batch holds only the
+        valid rows, in input order; errors are keyed by input row index.
+        """
+        batch = cls()
+        errors: Dict[int, str] = {}
+        if trusted:
+            for index, row in enumerate(rows):
+                if not isinstance(row, dict):
+                    errors[index] = "Expected an object."
+                    continue
+                try:
+                    fields = _split_contact_fields(row)
+                except ValueError as e:
+                    errors[index] = str(e)
+                    continue
+                batch._store.append(fields, fields.pop('custom_fields'))
+            return batch, errors
+
+        for offset in range(0, len(rows), cls.VALIDATION_CHUNK):
+            contacts, chunk_errors = Contact.from_dicts(rows[offset:offset + cls.VALIDATION_CHUNK])
+            for index, error in chunk_errors.items():
+                errors[offset + index] = error
+            for contact in contacts:
+                if contact is not None:
+                    batch.append(contact)
+        return batch, errors
+
+    @property
+    def custom_keys(self) -> List[str]:
+        """
+        Every custom field key seen in the underlying storage.
+        """
+        return list(self._store.custom_keys)
+
+    def append(self, contact: Contact) -> None:
+        if self._stop is not None or self._start:
+            raise ValueError("Cannot append to a slice of a ContactBatch.")
+        fields = {name: value for name, value in contact.__dict__.items() if name in CONTACT_FIELDS}
+        self._store.append(fields, contact.custom_fields)
+
+    def _bounds(self) -> int:
+        return self._store.size if self._stop is None else self._stop
+
+    def _row(self, index: int) -> Contact:
+        store = self._store
+        fields = {name: column[index] for name, column in store.columns.items()}
+        return Contact.model_construct(**fields, custom_fields=store.custom_fields(index))
+
+    def __len__(self) -> int:
+        return self._bounds() - self._start
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise ValueError("ContactBatch slices must be contiguous.")
+            stop = max(start, stop)
+            return ContactBatch(self._store, self._start + start, self._start + stop)
+        length = len(self)
+        if item < 0:
+            item += length
+        if not 0 <= item < length:
+            raise IndexError("ContactBatch index out of range")
+        return self._row(self._start + item)
+
+    def __iter__(self) -> Iterator[Contact]:
+        for index in range(self._start, self._bounds()):
+            yield self._row(index)
+
+    def __repr__(self) -> str:
+        return f"<ContactBatch rows={len(self)} custom_keys={len(self._store.custom_keys)}>"
+
 
 class Lead(UnifiedEntity):
     """Unified representation of a Sales Lead."""
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import partial
+from typing import Dict, Iterable, Optional, Tuple, Union
+from django.conf import settings
+from django.db import connection
+from . import remote_records
+from .adapters.base_adapter import PushResult
+from .canonical_model import Contact
+from .models import CRMConfiguration
+from .remote_records import RemoteIndex
+from .services import BrokerService
+
+logger = logging.getLogger(__name__)
+
+
+class TargetTimeout(Exception):
+    """
+    A CRM did not answer within its fan-out timeout. The push may still land.
+    """
+
+    def __init__(self, crm_type: str, timeout: float):
+        super().__init__(f"{crm_type} did not respond within {timeout:g}s; the push may still complete.")
+        self.crm_type = crm_type
+        self.timeout = timeout
+
+
+def timeout_for(crm_type: str) -> float:
+    """
+    Seconds a fan-out waits for one CRM: SYNC_FANOUT_TIMEOUTS[crm_type], else SYNC_FANOUT_TIMEOUT.
+    """
+    timeouts = getattr(settings, 'SYNC_FANOUT_TIMEOUTS', {})
+    return float(timeouts.get(crm_type, getattr(settings, 'SYNC_FANOUT_TIMEOUT', 30)))
+
+
+def _send(config: CRMConfiguration, index: RemoteIndex, contact: Contact,
+          upsert: bool, skip: bool) -> Tuple[PushResult, Optional[str]]:
+    adapter = BrokerService.get_adapter_for_config(config)
+    return remote_records.send_contact(adapter, index, contact, upsert=upsert, skip=skip)
+
+
+def _save_late(crm_type: str, index: RemoteIndex, contact: Contact, caller: int, future: Future) -> None:
+    """
+    Done callback of a push that missed its timeout: saves its RemoteRecord
+    once the CRM answers, so the next sync updates the record instead of
+    creating it again. Runs on the worker thread, whose own database
+    connection is closed afterwards; `caller` is the request thread, which
+    runs it instead if the push finished in the meantime.
+    """
+    try:
+        result, digest = future.result()
+        if not result.skipped:
+            index.save([contact], [result.remote_id], [digest])
+            logger.info(f"Late fan-out push to {crm_type} landed as {result.remote_id}")
+    except Exception as e:
+        logger.warning(f"Late fan-out push to {crm_type} not recorded: {e}")
+    finally:
+        if threading.get_ident() != caller:
+            connection.close()
+
+
+def push_to_all(user, contact: Contact, crm_types: Iterable[str] = None, upsert: bool = False,
+                skip: bool = False) -> Dict[str, Union[PushResult, Exception]]:
+    """
+    Pushes one contact to every CRM the user configured, or only to `crm_types`,
+    with one thread per CRM, so the call lasts as long as the slowest CRM
+    instead of the sum of all of them.
+
+    Returns a PushResult or the exception raised, per CRM type. A CRM that
+    misses its timeout comes back as TargetTimeout and its push is left
+    running; its RemoteRecord is saved when it finishes (_save_late).
+    Otherwise configurations and RemoteRecords are read and written on the
+    calling thread; the workers only authenticate and talk to the CRM.
+    """
+    configs = CRMConfiguration.objects.filter(user=user)
+    if crm_types is not None:
+        crm_types = list(dict.fromkeys(crm_types))
+        configs = configs.filter(crm_type__in=crm_types)
+    configs = list(configs)
+
+    outcomes: Dict[str, Union[PushResult, Exception]] = {}
+    configured = {config.crm_type for config in configs}
+    for crm_type in crm_types or ():
+        if crm_type not in configured:
+            outcomes[crm_type] = ValueError(f"No configuration found for {crm_type} for user {user.username}")
+    if not configs:
+        return outcomes
+
+    indexes = {}
+    for config in configs:
+        target = remote_records.configured_target(config.auth_config)
+        indexes[config.crm_type] = RemoteIndex.load(user, config.crm_type, target, [contact])
+    executor = ThreadPoolExecutor(max_workers=len(configs), thread_name_prefix='sync-fanout')
+    try:
+        started = time.monotonic()
+        futures = {
+            config.crm_type: executor.submit(_send, config, indexes[config.crm_type], contact, upsert, skip)
+            for config in configs
+        }
+        for crm_type, future in futures.items():
+            timeout = timeout_for(crm_type)
+            try:
+                result, digest = future.result(timeout=max(0.0, started + timeout - time.monotonic()))
+            except FutureTimeout:
+                logger.warning(f"Fan-out push to {crm_type} timed out after {timeout:g}s")
+                outcomes[crm_type] = TargetTimeout(crm_type, timeout)
+                future.add_done_callback(
+                    partial(_save_late, crm_type, indexes[crm_type], contact, threading.get_ident())
+                )
+                continue
+            except Exception as e:
+                outcomes[crm_type] = e
+                continue
+            if not result.skipped:
+                indexes[crm_type].save([contact], [result.remote_id], [digest])
+            outcomes[crm_type] = result
+    finally:
+        # Do not hold the response for CRMs that already timed out
+        executor.shutdown(wait=False)
+    return outcomes
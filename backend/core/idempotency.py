@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import json
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import IdempotencyRecord
+
+Outcome = Tuple[int, Dict[str, Any]]
+
+
+class IdempotencyConflict(Exception):
+    """
+    The key cannot be served: it was used for a different request, or the
+    first request with it is still running after the wait timeout.
+    """
+
+    def __init__(self, error_code: str, message: str):
+        super().__init__(message)
+        self.error_code = error_code
+
+
+def fingerprint(crm_type: str, payload: Any, **extra: Any) -> str:
+    """
+    Stable hash of a sync request; key order in the payload does not matter.
+    """
+    body = json.dumps({"crm": crm_type, "payload": payload, **extra}, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def execute(user, key: str, request_hash: str, handler: Callable[[], Outcome]) -> Tuple[int, Dict[str, Any], bool]:
+    """
+    Runs `handler` at most once per (user, key) and returns (status, body, replayed).
+
+    Completed 2xx outcomes are stored for SYNC_IDEMPOTENCY_TTL seconds and
+    replayed without calling `handler`. Other outcomes, and exceptions, release
+    the key so the client can retry. A duplicate arriving while the first
+    request is in flight waits up to SYNC_IDEMPOTENCY_WAIT seconds for it.
+    """
+    deadline = time.monotonic() + getattr(settings, 'SYNC_IDEMPOTENCY_WAIT', 30)
+    interval = 0.05
+    while True:
+        record, replay = _attempt(user, key, request_hash, deadline)
+        if record is not None:
+            break
+        if replay is not None:
+            return replay
+        time.sleep(interval)
+        interval = min(interval * 2, 1)
+
+    try:
+        status_code, body = handler()
+    except BaseException:
+        record.delete()
+        raise
+    return _finish(record, status_code, body)
+
+
+async def aexecute(user, key: str, request_hash: str,
+                   handler: Callable[[], Awaitable[Outcome]]) -> Tuple[int, Dict[str, Any], bool]:
+    """
+    execute for an async `handler`; the database work runs in a worker thread
+    and waiting for an in-flight duplicate does not block the event loop.
+    """
+    deadline = time.monotonic() + getattr(settings, 'SYNC_IDEMPOTENCY_WAIT', 30)
+    interval = 0.05
+    while True:
+        record, replay = await sync_to_async(_attempt)(user, key, request_hash, deadline)
+        if record is not None:
+            break
+        if replay is not None:
+            return replay
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, 1)
+
+    try:
+        status_code, body = await handler()
+    except BaseException:
+        await sync_to_async(record.delete)()
+        raise
+    return await sync_to_async(_finish)(record, status_code, body)
+
+
+def purge_expired() -> int:
+    """
+    Deletes records past their TTL and claims abandoned for longer than
+    SYNC_IDEMPOTENCY_LOCK_TIMEOUT. Keys that are never reused would otherwise
+    stay forever. Returns the number of records deleted.
+    """
+    now = timezone.now()
+    lock_timeout = getattr(settings, 'SYNC_IDEMPOTENCY_LOCK_TIMEOUT', 300)
+    expired, _ = IdempotencyRecord.objects.filter(expires_at__lte=now).delete()
+    abandoned, _ = IdempotencyRecord.objects.filter(
+        status=IdempotencyRecord.STATUS_IN_PROGRESS, created_at__lte=now - timedelta(seconds=lock_timeout)
+    ).delete()
+    return expired + abandoned
+
+
+def _claim(user, key: str, request_hash: str) -> Tuple[Optional[IdempotencyRecord], bool]:
+    """
+    Inserts an in-progress record, or returns the existing one.
+    The unique (user, key) constraint makes the insert the lock.
+    """
+    now = timezone.now()
+    lock_timeout = getattr(settings, 'SYNC_IDEMPOTENCY_LOCK_TIMEOUT', 300)
+    records = IdempotencyRecord.objects.filter(user=user, key=key)
+    records.filter(expires_at__lte=now).delete()
+    # A claim this old belongs to a request that died without releasing it
+    records.filter(status=IdempotencyRecord.STATUS_IN_PROGRESS, created_at__lte=now - timedelta(seconds=lock_timeout)).delete()
+    try:
+        with transaction.atomic():
+            record = IdempotencyRecord.objects.create(
+                user=user,
+                key=key,
+                fingerprint=request_hash,
+                expires_at=now + timedelta(seconds=getattr(settings, 'SYNC_IDEMPOTENCY_TTL', 86400)),
+            )
+        return record, True
+    except IntegrityError:
+        return records.first(), False
+
+
+def _attempt(user, key: str, request_hash: str,
+             deadline: float) -> Tuple[Optional[IdempotencyRecord], Optional[Tuple[int, Dict[str, Any], bool]]]:
+    """
+    One try at claiming the key: (claimed record, None), (None, stored outcome
+    to replay), or (None, None) while the first request is still running.
+    Raises IdempotencyConflict on a different request or past the deadline.
+    """
+    record, claimed = _claim(user, key, request_hash)
+    if claimed:
+        return record, None
+    if record is not None:
+        if record.fingerprint != request_hash:
+            raise IdempotencyConflict(
+                "IDEMPOTENCY_KEY_REUSED",
+                "This Idempotency-Key was already used for a different request."
+            )
+        if record.status == IdempotencyRecord.STATUS_COMPLETED:
+            return None, (record.response_status, record.response_body, True)
+    if time.monotonic() >= deadline:
+        raise IdempotencyConflict(
+            "IDEMPOTENCY_IN_PROGRESS",
+            "A request with this Idempotency-Key is still being processed."
+        )
+    return None, None
+
+
+def _finish(record: IdempotencyRecord, status_code: int, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], bool]:
+    """
+    Stores a 2xx outcome for replay; releases the key otherwise.
+    """
+    if 200 <= status_code < 300:
+        record.status = IdempotencyRecord.STATUS_COMPLETED
+        record.response_status = status_code
+        record.response_body = body
+        record.save(update_fields=['status', 'response_status', 'response_body'])
+    else:
+        record.delete()
+    return status_code, body, False
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = "Delivers queued sync jobs from the outbox. Run several for more throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Messages claimed per batch.")
+        parser.add_argument('--interval', type=float, default=None, help="Seconds to sleep while the outbox is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the outbox once and exit.")
+
+    def handle(self, *args, **options):
+        handled = outbox.run(batch_size=options['batch_size'], interval=options['interval'], drain=options['once'])
+        self.stdout.write(f"{handled} outbox message(s) dispatched")
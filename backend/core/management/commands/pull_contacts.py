@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from core.models import CRMConfiguration
+from core.pull import pull_contacts
+
+
+class Command(BaseCommand):
+    help = "Pulls contacts changed since the last run for each CRM configuration."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--crm', dest='crm_type', help="Only pull this CRM type, e.g. 'salesforce'.")
+        parser.add_argument('--user', dest='email', help="Only pull configurations of this user (email).")
+        parser.add_argument('--page-size', type=int, default=None, help="Records per page.")
+        parser.add_argument('--full', action='store_true', help="Ignore the stored cursor and pull everything.")
+
+    def handle(self, *args, **options):
+        configurations = CRMConfiguration.objects.select_related('user')
+        if options['crm_type']:
+            configurations = configurations.filter(crm_type=options['crm_type'])
+        if options['email']:
+            configurations = configurations.filter(user__email=options['email'])
+
+        failed = 0
+        for configuration in configurations:
+            try:
+                pulled = pull_contacts(configuration, page_size=options['page_size'], full=options['full'])
+                self.stdout.write(f"{configuration}: {pulled} contacts")
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"{configuration}: {e}")
+        if failed:
+            self.stderr.write(self.style.ERROR(f"{failed} configuration(s) failed."))
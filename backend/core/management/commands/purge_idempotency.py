@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core import idempotency
+
+
+class Command(BaseCommand):
+    help = "Deletes expired Idempotency-Key records."
+
+    def handle(self, *args, **options):
+        purged = idempotency.purge_expired()
+        self.stdout.write(f"{purged} idempotency record(s) purged")
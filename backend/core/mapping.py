@@ -0,0 +1,104 @@
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+from .canonical_model import Contact
+
+# Canonical fields adapters never send as CRM properties
+SYSTEM_FIELDS = frozenset({'id', 'created_at', 'updated_at', 'raw_data', 'custom_fields'})
+
+KNOWN_FIELDS = frozenset(Contact.model_fields)
+
+_MISSING = object()
+
+
+class MappingPlan:
+    """
+    Precomputed projection of a CRMConfiguration.field_mapping.
+
+    Holds the (source key, CRM field) pairs left after the skip list, plus
+    which sources are canonical Contact attributes, so applying it to a record
+    is a single pass over the mapped keys instead of a scan of the whole contact.
+    Custom fields take precedence over canonical fields of the same name,
+    matching the `model_dump()` + `update(custom_fields)` flattening.
+    """
+
+    __slots__ = ('pairs', 'source_by_target')
+
+    def __init__(self, pairs: Iterable[Tuple[str, str, bool]], source_by_target: Dict[str, str]):
+        self.pairs = tuple(pairs)
+        self.source_by_target = source_by_target
+
+    def source_for(self, target: str) -> Optional[str]:
+        """
+        First source key mapped to a CRM field (e.g. the key feeding 'LastName').
+        """
+        return self.source_by_target.get(target)
+
+    def project(self, contact: Contact) -> Dict[str, Any]:
+        custom = contact.custom_fields
+        payload = {}
+        for key, target, known in self.pairs:
+            if key in custom:
+                payload[target] = custom[key]
+            elif known:
+                payload[target] = getattr(contact, key)
+        return payload
+
+    def targets(self) -> list:
+        """
+        CRM fields the plan writes to, deduplicated, in mapping order.
+        """
+        return list(dict.fromkeys(target for _, target, _ in self.pairs if isinstance(target, str)))
+
+    def unproject(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Reverse of `project`: turns CRM field values back into source keys.
+        """
+        return {key: values[target] for key, target, _ in self.pairs if isinstance(target, str) and target in values}
+
+    def without(self, *keys: str) -> "MappingPlan":
+        """
+        Same plan minus the given source keys (e.g. a key already used as the item name).
+        """
+        return MappingPlan(
+            (pair for pair in self.pairs if pair[0] not in keys),
+            self.source_by_target,
+        )
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+
+def value_of(contact: Contact, key: Optional[str], default: Any = None) -> Any:
+    """
+    Reads a flattened contact value: custom field first, then canonical attribute.
+    """
+    if key is None:
+        return default
+    value = contact.custom_fields.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    if key in KNOWN_FIELDS:
+        return getattr(contact, key)
+    return default
+
+
+def compile_mapping(field_mapping: Dict[str, Any], skip: FrozenSet[str] = frozenset()) -> MappingPlan:
+    """
+    Compiles a field mapping once; identical mappings share the compiled plan.
+    """
+    items = tuple((field_mapping or {}).items())
+    try:
+        return _compile(items, frozenset(skip))
+    except TypeError:
+        # Unhashable mapping values cannot be memoised
+        return _compile.__wrapped__(items, frozenset(skip))
+
+
+@lru_cache(maxsize=512)
+def _compile(items: Tuple[Tuple[str, Any], ...], skip: FrozenSet[str]) -> MappingPlan:
+    source_by_target = {}
+    for key, target in items:
+        if isinstance(target, str):
+            source_by_target.setdefault(target, key)
+    pairs = [(key, target, key in KNOWN_FIELDS) for key, target in items if key not in skip]
+    return MappingPlan(pairs, source_by_target)
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_syncjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cursor', models.DateTimeField(blank=True, help_text='Latest CRM modification time pulled so far', null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_pulled', models.PositiveIntegerField(default=0, help_text='Records delivered by the last run')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('configuration', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sync_state', to='core.crmconfiguration')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_idempotencyrecord'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RemoteRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('crm_type', models.CharField(max_length=50)),
+                ('target', models.CharField(blank=True, default='', help_text='Object type or board the record was pushed to', max_length=255)),
+                ('external_key', models.CharField(help_text="The contact's key on our side: its id, else its email", max_length=255)),
+                ('remote_id', models.CharField(max_length=255)),
+                ('content_hash', models.CharField(help_text='SHA-256 of the contact as last pushed', max_length=64)),
+                ('last_synced_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='remote_records', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'crm_type', 'remote_id'], name='core_remote_user_id_68ea94_idx')],
+                'unique_together': {('user', 'crm_type', 'target', 'external_key')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_remoterecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upsert', models.BooleanField(default=False)),
+                ('skip_unchanged', models.BooleanField(default=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not dispatched before this time; claiming moves it ahead by the lease')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_message', to='core.syncjob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['available_at'], name='core_outbox_availab_e512ca_idx')],
+            },
+        ),
+    ]
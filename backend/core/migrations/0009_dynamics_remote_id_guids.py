@@ -0,0 +1,30 @@
+import re
+
+from django.db import migrations
+
+ENTITY_ID = re.compile(r"\(([^()=']+)\)$")
+
+
+def entity_ids_to_guids(apps, schema_editor):
+    """
+    Dynamics remote IDs used to be stored as the full OData-EntityId URL;
+    keep only the record GUID.
+    """
+    RemoteRecord = apps.get_model('core', 'RemoteRecord')
+    records = RemoteRecord.objects.filter(crm_type='dynamics', remote_id__startswith='http')
+    for record in records.iterator():
+        match = ENTITY_ID.search(record.remote_id.strip())
+        if match:
+            record.remote_id = match.group(1)
+            record.save(update_fields=['remote_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.RunPython(entity_ids_to_guids, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
+import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class CRMConfiguration(models.Model):
     CRM_CHOICES = [
@@ -27,3 +29,124 @@ class CRMConfiguration(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.crm_type}"
+
+
+class SyncJob(models.Model):
+    """
+    A contact push queued for a Celery worker. Clients poll it for the outcome.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCESS, 'Success'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sync_jobs')
+    crm_type = models.CharField(max_length=50)
+    payload = models.JSONField(help_text="Raw contact data as submitted")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    remote_id = models.CharField(max_length=255, blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.crm_type} job {self.id} ({self.status})"
+
+
+class OutboxMessage(models.Model):
+    """
+    A SyncJob waiting for an outbox dispatcher (core.outbox). Written in the
+    same transaction as the job, so an accepted push survives worker crashes;
+    deleted once the push's outcome is recorded on the job.
+    """
+    job = models.OneToOneField(SyncJob, on_delete=models.CASCADE, related_name='outbox_message')
+    upsert = models.BooleanField(default=False)
+    skip_unchanged = models.BooleanField(default=True)
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Not dispatched before this time; claiming moves it ahead by the lease"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['available_at'])]
+
+    def __str__(self):
+        return f"outbox {self.job_id} @ {self.available_at}"
+
+
+class SyncState(models.Model):
+    """
+    High-water mark of the incremental pull for one CRM configuration.
+    Kept off CRMConfiguration so advancing it does not touch its updated_at,
+    which keys the adapter cache.
+    """
+    configuration = models.OneToOneField(CRMConfiguration, on_delete=models.CASCADE, related_name='sync_state')
+    cursor = models.DateTimeField(blank=True, null=True, help_text="Latest CRM modification time pulled so far")
+    last_run_at = models.DateTimeField(blank=True, null=True)
+    last_pulled = models.PositiveIntegerField(default=0, help_text="Records delivered by the last run")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.configuration} @ {self.cursor}"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Outcome of a sync request submitted with an idempotency key.
+    A row is claimed (in progress) before the CRM is called and completed with
+    the response, which is replayed for repeats until it expires.
+    """
+    STATUS_IN_PROGRESS = 'in_progress'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_IN_PROGRESS, 'In progress'),
+        (STATUS_COMPLETED, 'Completed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_records')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64, help_text="SHA-256 of the request the key was first used for")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_IN_PROGRESS)
+    response_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.key} ({self.status})"
+
+
+class RemoteRecord(models.Model):
+    """
+    Where a contact pushed by this service lives in a CRM.
+    Written after every successful push, keyed by the contact's own key, so later
+    syncs know the remote ID and whether the contact changed since.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='remote_records')
+    crm_type = models.CharField(max_length=50)
+    target = models.CharField(max_length=255, blank=True, default='', help_text="Object type or board the record was pushed to")
+    external_key = models.CharField(max_length=255, help_text="The contact's key on our side: its id, else its email")
+    remote_id = models.CharField(max_length=255)
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 of the contact as last pushed")
+    last_synced_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'crm_type', 'target', 'external_key')
+        indexes = [models.Index(fields=['user', 'crm_type', 'remote_id'])]
+
+    def __str__(self):
+        return f"{self.crm_type}:{self.external_key} -> {self.remote_id}"
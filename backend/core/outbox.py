@@ -0,0 +1,267 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from . import remote_records
+from .adapters.base_adapter import PushResult
+from .canonical_model import Contact
+from .models import OutboxMessage, SyncJob
+from .services import BrokerService
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(user, crm_type: str, payload: Dict[str, Any], upsert: bool = False, skip: bool = True) -> SyncJob:
+    """
+    Stores a contact push as a SyncJob plus its OutboxMessage in one
+    transaction (joining the caller's, if any). Once this returns the push is
+    durable; a dispatcher delivers it.
+    """
+    with transaction.atomic():
+        job = SyncJob.objects.create(user=user, crm_type=crm_type, payload=payload)
+        OutboxMessage.objects.create(job=job, upsert=upsert, skip_unchanged=skip)
+    return job
+
+
+def claim(limit: int) -> List[OutboxMessage]:
+    """
+    Claims up to `limit` due messages. Rows another dispatcher is claiming are
+    skipped (SELECT ... FOR UPDATE SKIP LOCKED), and claimed rows are leased
+    by moving available_at SYNC_OUTBOX_LEASE seconds ahead, so messages of a
+    dispatcher that dies mid-push are picked up again once the lease runs out.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=max(getattr(settings, 'SYNC_OUTBOX_LEASE', 600), call_timeout()))
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(available_at__lte=now)
+            .order_by('available_at')
+            .values_list('pk', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        OutboxMessage.objects.filter(pk__in=ids).update(available_at=lease_until)
+        SyncJob.objects.filter(outbox_message__in=ids).update(
+            status=SyncJob.STATUS_RUNNING, attempts=F('attempts') + 1, updated_at=now
+        )
+    return list(OutboxMessage.objects.filter(pk__in=ids).select_related('job__user').order_by('available_at', 'pk'))
+
+
+def dispatch(limit: int = None) -> int:
+    """
+    Claims a batch of messages and pushes them, grouped per (user, CRM, mode)
+    and sent in chunks the adapter's bulk API can deliver within one lease.
+    Each chunk's lease is renewed right before it is pushed and its outcomes
+    are saved as soon as the CRM answers. Returns the number of messages claimed.
+    """
+    messages = claim(limit or getattr(settings, 'SYNC_OUTBOX_BATCH_SIZE', 200))
+    if not messages:
+        return 0
+    lease_until = messages[0].available_at
+    groups = defaultdict(list)
+    for message in messages:
+        groups[(message.job.user_id, message.job.crm_type, message.upsert, message.skip_unchanged)].append(message)
+    for (_, crm_type, upsert, skip), group in groups.items():
+        _deliver(group, crm_type, upsert, skip, lease_until)
+    return len(messages)
+
+
+def call_timeout() -> float:
+    """
+    Longest one adapter call to a CRM can take: waiting for the rate limiter,
+    retrying until the deadline, then a last attempt that times out.
+    """
+    return (
+        getattr(settings, 'CRM_RATE_LIMIT_MAX_WAIT', 60)
+        + getattr(settings, 'CRM_RETRY_DEADLINE', 60)
+        + getattr(settings, 'CRM_HTTP_CONNECT_TIMEOUT', 5)
+        + getattr(settings, 'CRM_HTTP_READ_TIMEOUT', 30)
+    )
+
+
+def renew(messages: List[OutboxMessage], lease_until: datetime,
+          seconds: float) -> Tuple[List[OutboxMessage], datetime]:
+    """
+    Extends the lease on `messages` to `seconds` from now. Returns the
+    messages still held under `lease_until` (the rest were claimed again by
+    another dispatcher) and the new lease.
+    """
+    renewed_until = timezone.now() + timedelta(seconds=seconds)
+    with transaction.atomic():
+        owned = set(
+            OutboxMessage.objects.select_for_update()
+            .filter(pk__in=[message.pk for message in messages], available_at=lease_until)
+            .values_list('pk', flat=True)
+        )
+        OutboxMessage.objects.filter(pk__in=owned).update(available_at=renewed_until)
+    if len(owned) < len(messages):
+        logger.warning(f"{len(messages) - len(owned)} outbox message(s) outlived their lease")
+    return [message for message in messages if message.pk in owned], renewed_until
+
+
+def run(batch_size: int = None, interval: float = None, max_batches: int = None, drain: bool = False) -> int:
+    """
+    Dispatcher loop: claims batch after batch, sleeping `interval` seconds
+    (SYNC_OUTBOX_POLL_INTERVAL) whenever the outbox is empty. With `drain` it
+    returns once the outbox is empty instead; `max_batches` caps the batches
+    claimed. Any number of dispatchers may run side by side. Returns the
+    number of messages handled.
+    """
+    batch_size = batch_size or getattr(settings, 'SYNC_OUTBOX_BATCH_SIZE', 200)
+    interval = interval if interval is not None else getattr(settings, 'SYNC_OUTBOX_POLL_INTERVAL', 1)
+    handled = batches = 0
+    while max_batches is None or batches < max_batches:
+        close_old_connections()
+        claimed = dispatch(batch_size)
+        handled += claimed
+        batches += 1
+        if claimed < batch_size:
+            if drain:
+                break
+            time.sleep(interval)
+    return handled
+
+
+def _deliver(messages: List[OutboxMessage], crm_type: str, upsert: bool, skip: bool,
+             lease_until: datetime) -> None:
+    """
+    Pushes one group chunk by chunk. A chunk is at most as many adapter calls
+    as fit in SYNC_OUTBOX_LEASE, counted by adapter.push_calls for its creates
+    and updates, and is leased for at least that many worst-case calls
+    (call_timeout), plus one for authenticating, so a lease never runs out
+    while its chunk is still being pushed.
+    """
+    contacts, pending, finished = [], [], []
+    for message in messages:
+        try:
+            contacts.append(Contact(**message.job.payload))
+            pending.append(message)
+        except ValueError as e:
+            _done(message.job, error=str(e))
+            finished.append(message)
+    if finished:
+        _settle(finished, lease_until)
+    if not pending:
+        return
+
+    user = pending[0].job.user
+    try:
+        adapter = BrokerService.get_adapter_for_user(user, crm_type)
+    except Exception as e:
+        _record(pending, [_failed(crm_type, e)] * len(pending))
+        _settle(pending, lease_until)
+        return
+
+    lease, per_call = getattr(settings, 'SYNC_OUTBOX_LEASE', 600), call_timeout()
+    skip = skip and remote_records.skip_unchanged()
+    for start, end, calls in _chunks(adapter, user, crm_type, contacts, upsert, max(1, int(lease // per_call) - 1)):
+        chunk = pending[start:end]
+        owned, chunk_lease = renew(chunk, lease_until, max(lease, (calls + 1) * per_call))
+        if not owned:
+            continue
+        chunk_contacts = [contact for message, contact in zip(chunk, contacts[start:end]) if message in owned]
+        try:
+            results = remote_records.push_contacts(adapter, user, crm_type, chunk_contacts, upsert=upsert, skip=skip)
+        except Exception as e:
+            results = [_failed(crm_type, e)] * len(owned)
+        _record(owned, results)
+        _settle(owned, chunk_lease)
+
+
+def _chunks(adapter, user, crm_type: str, contacts: List[Contact], upsert: bool,
+            max_calls: int) -> List[Tuple[int, int, int]]:
+    """
+    Splits `contacts` into (start, end, calls) chunks of at most `max_calls`
+    adapter calls; a single contact needing more becomes a chunk of its own.
+    Outside upsert mode contacts with a RemoteRecord are updated by remote
+    ID, and counted as a create as well in case the CRM deleted the record.
+    """
+    index = None if upsert else remote_records.RemoteIndex.load(
+        user, crm_type, remote_records.target_of(adapter), contacts
+    )
+    chunks = []
+    start = creates = updates = calls = 0
+    for position, contact in enumerate(contacts):
+        known = int(index is not None and index.get(contact) is not None)
+        needed = adapter.push_calls(creates + 1, updates + known, upsert)
+        if position > start and needed > max_calls:
+            chunks.append((start, position, calls))
+            start, creates, updates = position, 0, 0
+            needed = adapter.push_calls(1, known, upsert)
+        creates, updates, calls = creates + 1, updates + known, needed
+    chunks.append((start, len(contacts), calls))
+    return chunks
+
+
+def _failed(crm_type: str, e: Exception) -> PushResult:
+    result = PushResult.failed(e)
+    if not result.retryable:
+        logger.error(f"Outbox push to {crm_type} failed: {e}")
+    return result
+
+
+def _record(messages: List[OutboxMessage], results: List[PushResult]) -> None:
+    """
+    Records each outcome on its job (not saved yet).
+    """
+    for message, result in zip(messages, results):
+        if result.retryable:
+            _retry(message, result.error, result.retry_in)
+        else:
+            _done(message.job, remote_id=result.remote_id, error=None if result.ok else result.error)
+
+
+def _done(job: SyncJob, remote_id: str = None, error: str = None) -> None:
+    job.status = SyncJob.STATUS_FAILED if error else SyncJob.STATUS_SUCCESS
+    job.remote_id = remote_id
+    job.error = error
+
+
+def _retry(message: OutboxMessage, error: str, not_before: float = 0) -> None:
+    """
+    Schedules another attempt with exponential backoff, no sooner than
+    `not_before` seconds (an open circuit, Retry-After); fails the job after
+    SYNC_OUTBOX_MAX_ATTEMPTS.
+    """
+    job = message.job
+    if job.attempts >= getattr(settings, 'SYNC_OUTBOX_MAX_ATTEMPTS', 5):
+        _done(job, error=error)
+        return
+    delay = getattr(settings, 'SYNC_OUTBOX_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+    job.status = SyncJob.STATUS_PENDING
+    job.error = error
+    message.available_at = timezone.now() + timedelta(seconds=max(delay, not_before or 0))
+
+
+def _settle(messages: List[OutboxMessage], lease_until: datetime) -> None:
+    """
+    Saves the outcomes: finished messages leave the outbox, retried ones are
+    rescheduled. Messages whose lease ran out and were claimed again by
+    another dispatcher are left to it.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        owned = set(
+            OutboxMessage.objects.select_for_update()
+            .filter(pk__in=[message.pk for message in messages], available_at=lease_until)
+            .values_list('pk', flat=True)
+        )
+        if len(owned) < len(messages):
+            logger.warning(f"{len(messages) - len(owned)} outbox message(s) outlived their lease")
+        messages = [message for message in messages if message.pk in owned]
+        retried = [message for message in messages if message.job.status == SyncJob.STATUS_PENDING]
+        OutboxMessage.objects.filter(
+            pk__in=[message.pk for message in messages if message.job.status != SyncJob.STATUS_PENDING]
+        ).delete()
+        OutboxMessage.objects.bulk_update(retried, ['available_at'])
+        for message in messages:
+            message.job.updated_at = now
+        SyncJob.objects.bulk_update(
+            [message.job for message in messages], ['status', 'remote_id', 'error', 'updated_at']
+        )
@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from .adapters.base_adapter import PushResult
+from .canonical_model import Contact
+from .models import RemoteRecord
+
+# auth_config keys naming the object type or board pushes go to by default
+TARGET_KEYS = ('object_name', 'object_type', 'board_id')
+
+# Keys per IN (...) lookup and per bulk upsert statement
+QUERY_CHUNK_SIZE = 500
+
+
+def record_key(contact: Contact) -> Optional[str]:
+    """
+    The contact's key on our side: its id, else its lower-cased email.
+    Contacts with neither are not tracked.
+    """
+    key = contact.id or (contact.email.lower() if contact.email else None)
+    if key is None or len(key) > 255:
+        return None
+    return key
+
+
+def content_hash(adapter: Any, contact: Contact, target: str = None) -> Optional[str]:
+    """
+    Stable hash of the payload the adapter sends for `contact`, after field
+    mapping, so a mapping change counts as a change. None when the contact
+    cannot be mapped; the push itself reports why.
+    """
+    try:
+        payload = adapter.mapped_payload(contact, target)
+    except ValueError:
+        return None
+    body = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def target_of(adapter: Any, target: str = None) -> str:
+    """
+    Object type or board a push goes to: the explicit target, else the configured default.
+    """
+    return configured_target(adapter.config, target)
+
+
+def configured_target(config: Dict[str, Any], target: str = None) -> str:
+    """
+    target_of for an adapter config (CRMConfiguration.auth_config) before the adapter exists.
+    """
+    if target:
+        return str(target)
+    for key in TARGET_KEYS:
+        if config.get(key):
+            return str(config[key])
+    return ''
+
+
+class RemoteIndex:
+    """
+    The RemoteRecords of one batch of contacts, loaded in one pass.
+    """
+
+    def __init__(self, user, crm_type: str, target: str, records: Dict[str, RemoteRecord]):
+        self.user = user
+        self.crm_type = crm_type
+        self.target = target
+        self.records = records
+
+    @classmethod
+    def load(cls, user, crm_type: str, target: str, contacts: Iterable[Contact]) -> "RemoteIndex":
+        keys = list({key for key in map(record_key, contacts) if key is not None})
+        records = {}
+        for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+            rows = RemoteRecord.objects.filter(
+                user=user, crm_type=crm_type, target=target, external_key__in=keys[start:start + QUERY_CHUNK_SIZE]
+            )
+            records.update((row.external_key, row) for row in rows)
+        return cls(user, crm_type, target, records)
+
+    def get(self, contact: Contact) -> Optional[RemoteRecord]:
+        key = record_key(contact)
+        return self.records.get(key) if key is not None else None
+
+    def unchanged(self, contact: Contact, digest: Optional[str]) -> Optional[RemoteRecord]:
+        """
+        The contact's record if it was last pushed with exactly this payload hash.
+        """
+        record = self.get(contact)
+        if record is None or digest is None or record.content_hash != digest:
+            return None
+        return record
+
+    def save(self, contacts: Sequence[Contact], remote_ids: Sequence[Optional[str]], digests: Sequence[Optional[str]]) -> None:
+        """
+        Records the remote ID and payload hash of each contact pushed successfully
+        (a None remote ID marks a failed push and is skipped). Without a hash
+        the record is kept but never counts as unchanged.
+        """
+        self.save_keys([record_key(contact) for contact in contacts], remote_ids, digests)
+
+    def save_keys(self, keys: Sequence[Optional[str]], remote_ids: Sequence[Optional[str]],
+                  digests: Sequence[Optional[str]]) -> None:
+        """
+        save by record_key, for callers that no longer hold the contacts.
+        """
+        now = timezone.now()
+        rows = {}
+        for key, remote_id, digest in zip(keys, remote_ids, digests):
+            if key is None or remote_id is None:
+                continue
+            # A key repeated in one batch keeps its last push
+            rows[key] = RemoteRecord(
+                user=self.user,
+                crm_type=self.crm_type,
+                target=self.target,
+                external_key=key,
+                remote_id=str(remote_id),
+                content_hash=digest or '',
+                last_synced_at=now,
+            )
+            self.records[key] = rows[key]
+        if rows:
+            RemoteRecord.objects.bulk_create(
+                list(rows.values()),
+                batch_size=QUERY_CHUNK_SIZE,
+                update_conflicts=True,
+                unique_fields=['user', 'crm_type', 'target', 'external_key'],
+                update_fields=['remote_id', 'content_hash', 'last_synced_at'],
+            )
+
+    def prime(self, adapter: Any, contacts: Iterable[Contact], target: str = None) -> None:
+        """
+        Hands known remote IDs to the adapter, so upserts go straight to the
+        record instead of searching for it first.
+        """
+        for contact in contacts:
+            record = self.get(contact)
+            if record is not None:
+                adapter.prime_remote_id(contact, record.remote_id, target)
+
+
+def skip_unchanged(force: bool = False) -> bool:
+    """
+    Whether unchanged contacts are skipped: SYNC_SKIP_UNCHANGED, unless the
+    request forces a push.
+    """
+    return getattr(settings, 'SYNC_SKIP_UNCHANGED', True) and not force
+
+
+def push_contact(adapter, user, crm_type: str, contact: Contact, target: str = None,
+                 upsert: bool = False, skip: bool = False) -> PushResult:
+    """
+    adapter.push_contact that reads and writes the contact's RemoteRecord.
+    With `skip`, a contact whose mapped payload matches its last push is not
+    sent and comes back as a skipped result. Errors propagate as they would
+    from the adapter.
+    """
+    index = RemoteIndex.load(user, crm_type, target_of(adapter, target), [contact])
+    result, digest = send_contact(adapter, index, contact, target, upsert=upsert, skip=skip)
+    if not result.skipped:
+        index.save([contact], [result.remote_id], [digest])
+    return result
+
+
+def send_contact(adapter, index: RemoteIndex, contact: Contact, target: str = None,
+                 upsert: bool = False, skip: bool = False) -> Tuple[PushResult, Optional[str]]:
+    """
+    The CRM half of push_contact against an already loaded index: returns the
+    result and the payload hash to save. Runs no queries, so it can run in a
+    worker thread while the caller keeps the database work.
+
+    Outside upsert mode a contact that already has a record is updated by its
+    remote ID rather than created again, unless it was deleted from the CRM.
+    """
+    digest = content_hash(adapter, contact, target)
+    record = index.unchanged(contact, digest) if skip else None
+    if record is not None:
+        return PushResult(remote_id=record.remote_id, skipped=True), digest
+    if upsert:
+        index.prime(adapter, [contact], target)
+    else:
+        record = index.get(contact)
+        if record is not None:
+            remote_id = adapter.update_contact(record.remote_id, contact, target)
+            if remote_id is not None:
+                return PushResult(remote_id=remote_id), digest
+    return PushResult(remote_id=adapter.push_contact(contact, target, upsert=upsert)), digest
+
+
+async def apush_contact(adapter, user, crm_type: str, contact: Contact, target: str = None,
+                        upsert: bool = False, skip: bool = False) -> PushResult:
+    """
+    push_contact for an AsyncBaseAdapter; the queries run in a worker thread.
+    """
+    index = await sync_to_async(RemoteIndex.load)(user, crm_type, target_of(adapter, target), [contact])
+    result, digest = await asend_contact(adapter, index, contact, target, upsert=upsert, skip=skip)
+    if not result.skipped:
+        await sync_to_async(index.save)([contact], [result.remote_id], [digest])
+    return result
+
+
+async def asend_contact(adapter, index: RemoteIndex, contact: Contact, target: str = None,
+                        upsert: bool = False, skip: bool = False) -> Tuple[PushResult, Optional[str]]:
+    """
+    send_contact for an AsyncBaseAdapter.
+    """
+    digest = content_hash(adapter, contact, target)
+    record = index.unchanged(contact, digest) if skip else None
+    if record is not None:
+        return PushResult(remote_id=record.remote_id, skipped=True), digest
+    if upsert:
+        # Seeding the remote ID cache may reach Redis
+        await asyncio.to_thread(index.prime, adapter, [contact], target)
+    else:
+        record = index.get(contact)
+        if record is not None:
+            remote_id = await adapter.update_contact(record.remote_id, contact, target)
+            if remote_id is not None:
+                return PushResult(remote_id=remote_id), digest
+    return PushResult(remote_id=await adapter.push_contact(contact, target, upsert=upsert)), digest
+
+
+def push_contacts(adapter, user, crm_type: str, contacts: Sequence[Contact], target: str = None,
+                  upsert: bool = False, skip: bool = False) -> List[PushResult]:
+    """
+    adapter.push_contacts that reads and writes the contacts' RemoteRecords,
+    sending only the contacts whose mapped payload changed when `skip` is set.
+    Outside upsert mode contacts with a record are updated by remote ID
+    (adapter.update_contacts) and only the others are created. Contacts left
+    pending in an asynchronous CRM job get their records once it finishes
+    (see collect_jobs).
+    """
+    index = RemoteIndex.load(user, crm_type, target_of(adapter, target), contacts)
+    digests = [content_hash(adapter, contact, target) for contact in contacts]
+    results: List[Optional[PushResult]] = [None] * len(contacts)
+    pending = []
+    for position, (contact, digest) in enumerate(zip(contacts, digests)):
+        record = index.unchanged(contact, digest) if skip else None
+        if record is not None:
+            results[position] = PushResult(remote_id=record.remote_id, skipped=True)
+        else:
+            pending.append(position)
+    if not pending:
+        return results
+
+    create = pending
+    if not upsert:
+        known = [(position, index.get(contacts[position])) for position in pending]
+        known = [(position, record.remote_id) for position, record in known if record is not None]
+        if known:
+            updated = adapter.update_contacts([(remote_id, contacts[position]) for position, remote_id in known], target)
+            for (position, _), result in zip(known, updated):
+                results[position] = result
+            # Records deleted from the CRM come back as None and are created again
+            create = [position for position in pending if results[position] is None]
+
+    if create:
+        batch = contacts if len(create) == len(contacts) else [contacts[position] for position in create]
+        if upsert:
+            index.prime(adapter, batch, target)
+        pushed = adapter.push_contacts(batch, target, upsert=upsert)
+        for position, result in zip(create, pushed):
+            results[position] = result
+    index.save(
+        [contacts[position] for position in pending],
+        [results[position].remote_id if results[position].ok else None for position in pending],
+        [digests[position] for position in pending],
+    )
+    collect_jobs(adapter, index, [(contacts[position], results[position], digests[position]) for position in pending],
+                 target)
+    return results
+
+
+def collect_jobs(adapter, index: RemoteIndex, pushed: Iterable[Tuple[Contact, PushResult, Optional[str]]],
+                 target: str = None) -> None:
+    """
+    Schedules core.tasks.collect_push_job_task for each asynchronous job among
+    the `pushed` (contact, result, payload hash) triples, handing it what it
+    needs to match the job's outcome to RemoteRecords later.
+    """
+    jobs: Dict[str, List[Tuple[Contact, Optional[str]]]] = {}
+    for contact, result, digest in pushed:
+        if result.pending:
+            jobs.setdefault(result.job_id, []).append((contact, digest))
+    if not jobs:
+        return
+    from .tasks import collect_push_job_task
+
+    for job_id, entries in jobs.items():
+        collect_push_job_task.apply_async(kwargs={
+            'user_id': index.user.pk,
+            'crm_type': index.crm_type,
+            'target': index.target,
+            'job_id': job_id,
+            'keys': [record_key(contact) for contact, _ in entries],
+            'digests': [digest for _, digest in entries],
+            'records': [adapter.mapped_payload(contact, target) for contact, _ in entries],
+            'submitted_at': time.time(),
+        }, countdown=getattr(settings, 'SYNC_PUSH_JOB_POLL_INTERVAL', 10))
@@ -7,6 +7,15 @@ from .adapters.monday_adapter import MondayAdapter
 from .adapters.hubspot_adapter import HubSpotAdapter
 from .adapters.pipedrive_adapter import PipedriveAdapter
 from .adapters.dynamics_adapter import DynamicsAdapter
+from .adapters.async_base_adapter import AsyncBaseAdapter
+from .adapters.async_adapters import (
+    AsyncHubSpotAdapter,
+    AsyncMondayAdapter,
+    AsyncPipedriveAdapter,
+    AsyncDynamicsAdapter,
+    ThreadedAdapter,
+)
+from .cache import AdapterCache
 from typing import Type
 
 User = get_user_model()
@@ -21,24 +30,94 @@ class BrokerService:
         'dynamics': DynamicsAdapter,
     }
 
+    # CRMs missing here are served by running their sync adapter in a thread
+    ASYNC_ADAPTER_MAP: dict[str, Type[AsyncBaseAdapter]] = {
+        'monday': AsyncMondayAdapter,
+        'hubspot': AsyncHubSpotAdapter,
+        'pipedrive': AsyncPipedriveAdapter,
+        'dynamics': AsyncDynamicsAdapter,
+    }
+
+    adapter_cache = AdapterCache(
+        ttl=getattr(settings, 'ADAPTER_CACHE_TTL', 900),
+        max_size=getattr(settings, 'ADAPTER_CACHE_MAX_SIZE', 512),
+    )
+    async_adapter_cache = AdapterCache(
+        ttl=getattr(settings, 'ADAPTER_CACHE_TTL', 900),
+        max_size=getattr(settings, 'ADAPTER_CACHE_MAX_SIZE', 512),
+    )
+
     @classmethod
     def get_adapter_for_user(cls, user: settings.AUTH_USER_MODEL, crm_type: str) -> BaseAdapter:
         """
         Retrieves the CRM configuration for the user and instantiates the adapter.
+        Authenticated adapters are reused until the configuration row changes.
         """
-        print("here in get adapter")
         try:
             config_model = CRMConfiguration.objects.get(user=user, crm_type=crm_type)
         except CRMConfiguration.DoesNotExist:
             raise ValueError(f"No configuration found for {crm_type} for user {user.username}")
-        
+        return cls.get_adapter_for_config(config_model)
+
+    @classmethod
+    def get_adapter_for_config(cls, config_model: CRMConfiguration) -> BaseAdapter:
+        """
+        Adapter for an already loaded configuration row. Runs no queries, so it
+        is safe to call from worker threads.
+        """
+        crm_type = config_model.crm_type
         adapter_class = cls.ADAPTER_MAP.get(crm_type)
         if not adapter_class:
             raise ValueError(f"No adapter implementation for {crm_type}")
         
+        cache_key = (config_model.user_id, crm_type, config_model.updated_at)
+        adapter = cls.adapter_cache.get(cache_key)
+        if adapter is not None:
+            return adapter
+
         # Instantiate adapter with the stored config
         config = config_model.auth_config.copy()
         config['field_mapping'] = config_model.field_mapping
         adapter = adapter_class(config)
         adapter.authenticate()
+        cls.adapter_cache.invalidate(config_model.user_id, crm_type)
+        cls.adapter_cache.set(cache_key, adapter)
+        return adapter
+
+    @classmethod
+    def invalidate_adapter(cls, user_id, crm_type: str) -> None:
+        """
+        Evicts cached adapters after a configuration is created, edited or deleted.
+        """
+        cls.adapter_cache.invalidate(user_id, crm_type)
+        cls.async_adapter_cache.invalidate(user_id, crm_type)
+
+    @classmethod
+    async def aget_adapter_for_user(cls, user: settings.AUTH_USER_MODEL, crm_type: str) -> AsyncBaseAdapter:
+        """
+        Async counterpart of get_adapter_for_user, for views served over ASGI.
+        """
+        try:
+            config_model = await CRMConfiguration.objects.aget(user=user, crm_type=crm_type)
+        except CRMConfiguration.DoesNotExist:
+            raise ValueError(f"No configuration found for {crm_type} for user {user.username}")
+
+        cache_key = (user.pk, crm_type, config_model.updated_at)
+        adapter = cls.async_adapter_cache.get(cache_key)
+        if adapter is not None:
+            return adapter
+
+        config = config_model.auth_config.copy()
+        config['field_mapping'] = config_model.field_mapping
+        async_class = cls.ASYNC_ADAPTER_MAP.get(crm_type)
+        if async_class:
+            adapter = async_class(config)
+        else:
+            adapter_class = cls.ADAPTER_MAP.get(crm_type)
+            if not adapter_class:
+                raise ValueError(f"No adapter implementation for {crm_type}")
+            adapter = ThreadedAdapter(adapter_class(config))
+        await adapter.authenticate()
+        cls.async_adapter_cache.invalidate(user.pk, crm_type)
+        cls.async_adapter_cache.set(cache_key, adapter)
         return adapter
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from .models import CRMConfiguration
+from .services import BrokerService
+
+# Sent by core.pull.pull_contacts for every page of changed CRM records,
+# with `configuration` (CRMConfiguration) and `contacts` (list of Contact).
+contacts_pulled = Signal()
+
+
+@receiver([post_save, post_delete], sender=CRMConfiguration)
+def invalidate_cached_adapter(sender, instance, **kwargs):
+    """
+    Covers API updates as well as admin edits of a configuration row.
+    """
+    BrokerService.invalidate_adapter(instance.user_id, instance.crm_type)
@@ -0,0 +1,140 @@
+import logging
+import time
+import requests
+from celery import shared_task
+from django.conf import settings
+from . import idempotency, outbox, remote_records
+from .adapters.retry import transient_wait
+from .canonical_model import Contact
+from .models import CRMConfiguration, SyncJob
+from .pull import pull_contacts
+from .remote_records import RemoteIndex
+from .services import BrokerService
+
+logger = logging.getLogger(__name__)
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """
+    Celery router: sync tasks go to one queue per CRM (e.g. 'sync.salesforce'),
+    so a slow CRM cannot starve workers serving the others.
+    """
+    if name.startswith('core.tasks.') and kwargs and kwargs.get('crm_type'):
+        return {'queue': f"sync.{kwargs['crm_type']}"}
+    return None
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def push_contact_task(self, job_id, crm_type=None, upsert=False, skip=True):
+    """
+    Pushes the contact stored on a SyncJob. Transient failures (open circuits,
+    throttling, refused connections; see transient_wait) are retried, no
+    sooner than the CRM asks; rejections, configuration and validation errors
+    fail the job immediately.
+    """
+    job = SyncJob.objects.select_related('user').get(pk=job_id)
+    job.status = SyncJob.STATUS_RUNNING
+    job.attempts += 1
+    job.save(update_fields=['status', 'attempts', 'updated_at'])
+
+    try:
+        contact = Contact(**job.payload)
+        adapter = BrokerService.get_adapter_for_user(job.user, job.crm_type)
+        result = remote_records.push_contact(
+            adapter, job.user, job.crm_type, contact, upsert=upsert, skip=skip and remote_records.skip_unchanged()
+        )
+    except requests.exceptions.RequestException as e:
+        error = e.response.text if e.response is not None else str(e)
+        wait = transient_wait(e)
+        if wait is not None and self.request.retries < self.max_retries:
+            job.status = SyncJob.STATUS_PENDING
+            job.error = error
+            job.save(update_fields=['status', 'error', 'updated_at'])
+            countdown = max(self.default_retry_delay * 2 ** self.request.retries, wait)
+            raise self.retry(exc=e, countdown=countdown)
+        return _fail(job, error)
+    except Exception as e:
+        logger.error(f"Sync job {job_id} failed: {e}")
+        return _fail(job, str(e))
+
+    job.status = SyncJob.STATUS_SUCCESS
+    job.remote_id = result.remote_id
+    job.error = None
+    job.save(update_fields=['status', 'remote_id', 'error', 'updated_at'])
+    return result.remote_id
+
+
+@shared_task(bind=True, max_retries=None)
+def collect_push_job_task(self, user_id, crm_type, target, job_id, keys, digests, records, submitted_at):
+    """
+    Saves the RemoteRecords of an asynchronous push job (PushResult.job_id)
+    once the CRM has finished it. The job is checked every
+    SYNC_PUSH_JOB_POLL_INTERVAL seconds and given up on after
+    SYNC_PUSH_JOB_TIMEOUT; nothing waits on it in between.
+    """
+    configuration = CRMConfiguration.objects.select_related('user').get(user_id=user_id, crm_type=crm_type)
+    adapter = BrokerService.get_adapter_for_config(configuration)
+    try:
+        results = adapter.job_results(job_id, records)
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"Checking {crm_type} job {job_id} failed: {e}")
+        results = None
+    if results is None:
+        if time.time() - submitted_at >= getattr(settings, 'SYNC_PUSH_JOB_TIMEOUT', 86400):
+            logger.error(f"Gave up on {crm_type} job {job_id}: not finished after SYNC_PUSH_JOB_TIMEOUT")
+            return None
+        raise self.retry(countdown=getattr(settings, 'SYNC_PUSH_JOB_POLL_INTERVAL', 10))
+
+    RemoteIndex(configuration.user, crm_type, target, {}).save_keys(
+        keys, [result.remote_id if result.ok else None for result in results], digests
+    )
+    failed = sum(not result.ok for result in results)
+    if failed:
+        logger.warning(f"{failed} of {len(results)} records in {crm_type} job {job_id} failed")
+    return len(results) - failed
+
+
+@shared_task
+def dispatch_outbox_task():
+    """
+    Periodic entry point (CELERY_BEAT_SCHEDULE, with SYNC_QUEUE='outbox'):
+    drains up to SYNC_OUTBOX_MAX_BATCHES batches from the outbox.
+    """
+    return outbox.run(max_batches=getattr(settings, 'SYNC_OUTBOX_MAX_BATCHES', 10), drain=True)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def pull_contacts_task(self, configuration_id, crm_type=None):
+    """
+    Incremental pull for one configuration; see core.pull.pull_contacts.
+    """
+    configuration = CRMConfiguration.objects.select_related('user').get(pk=configuration_id)
+    try:
+        return pull_contacts(configuration)
+    except requests.exceptions.RequestException as e:
+        # e.g. an exhausted Monday complexity budget: not before it resets
+        countdown = max(self.default_retry_delay * 2 ** self.request.retries, transient_wait(e) or 0)
+        raise self.retry(exc=e, countdown=countdown)
+
+
+@shared_task
+def pull_all_contacts_task():
+    """
+    Periodic entry point (CELERY_BEAT_SCHEDULE): one pull task per configuration.
+    """
+    for configuration_id, crm_type in CRMConfiguration.objects.values_list('pk', 'crm_type'):
+        pull_contacts_task.apply_async(kwargs={'configuration_id': configuration_id, 'crm_type': crm_type})
+
+
+@shared_task
+def purge_idempotency_records_task():
+    """
+    Periodic entry point (CELERY_BEAT_SCHEDULE): deletes expired idempotency records.
+    """
+    return idempotency.purge_expired()
+
+
+def _fail(job: SyncJob, error: str) -> None:
+    job.status = SyncJob.STATUS_FAILED
+    job.error = error
+    job.save(update_fields=['status', 'error', 'updated_at'])
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from core.models import CRMConfiguration
+from core.services import BrokerService
+from core.cache import AdapterCache
+
+User = get_user_model()
+
+class AdapterCacheTest(TestCase):
+    def setUp(self):
+        BrokerService.adapter_cache.clear()
+        self.user = User.objects.create_user(email='cache@test.com', username='cacheuser', password='password')
+        self.config = CRMConfiguration.objects.create(
+            user=self.user,
+            crm_type='hubspot',
+            auth_config={'access_token': None, 'object_type': 'contacts'},
+            field_mapping={'email': 'email'}
+        )
+
+    def test_adapter_reused_across_calls(self):
+        first = BrokerService.get_adapter_for_user(self.user, 'hubspot')
+        with patch.object(type(first), 'authenticate') as authenticate:
+            second = BrokerService.get_adapter_for_user(self.user, 'hubspot')
+        self.assertIs(first, second)
+        authenticate.assert_not_called()
+
+    def test_config_change_invalidates(self):
+        first = BrokerService.get_adapter_for_user(self.user, 'hubspot')
+        self.config.field_mapping = {'email': 'email', 'phone': 'phone'}
+        self.config.save()
+        self.assertEqual(len(BrokerService.adapter_cache), 0)
+
+        second = BrokerService.get_adapter_for_user(self.user, 'hubspot')
+        self.assertIsNot(first, second)
+        self.assertIn('phone', second.field_mapping)
+
+    def test_lru_eviction_and_ttl(self):
+        cache = AdapterCache(ttl=60, max_size=2)
+        cache.set((1, 'a', None), 'A')
+        cache.set((1, 'b', None), 'B')
+        cache.get((1, 'a', None))
+        cache.set((1, 'c', None), 'C')
+        self.assertIsNone(cache.get((1, 'b', None)))
+        self.assertEqual(cache.get((1, 'a', None)), 'A')
+
+        expired = AdapterCache(ttl=0)
+        expired.set((1, 'a', None), 'A')
+        self.assertIsNone(expired.get((1, 'a', None)))
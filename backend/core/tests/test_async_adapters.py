@@ -0,0 +1,195 @@
+import json
+import threading
+from unittest.mock import MagicMock, patch
+import httpx
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.models import CRMConfiguration, RemoteRecord
+from core.services import BrokerService
+from core import remote_records
+from core.adapters import retry
+from core.adapters.dynamics_adapter import DynamicsAdapter
+from core.adapters.async_adapters import AsyncDynamicsAdapter, AsyncHubSpotAdapter, AsyncPipedriveAdapter, ThreadedAdapter
+from core.canonical_model import Contact
+
+User = get_user_model()
+
+
+def _mock_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class AsyncAdapterTest(SimpleTestCase):
+    async def test_hubspot_push(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(201, json={"id": "77"})
+
+        adapter = AsyncHubSpotAdapter({'access_token': 'tok', 'object_type': 'contacts', 'field_mapping': {'email': 'email'}})
+        client = _mock_client(handler)
+        with patch('core.adapters.async_base_adapter.client_for', return_value=client):
+            res = await adapter.push_contact(Contact(email="async@test.com"))
+        self.assertEqual(res, "77")
+        self.assertEqual(json.loads(seen[0].content), {"properties": {"email": "async@test.com"}})
+
+    async def test_push_contacts_keeps_order_and_errors(self):
+        def handler(request):
+            email = json.loads(request.content)["properties"]["email"]
+            if email.startswith("bad"):
+                return httpx.Response(400, json={"message": "rejected"})
+            return httpx.Response(201, json={"id": email.split("@")[0]})
+
+        adapter = AsyncHubSpotAdapter({'access_token': 'tok', 'object_type': 'contacts', 'field_mapping': {'email': 'email'}})
+        client = _mock_client(handler)
+        contacts = [Contact(email="a@test.com"), Contact(email="bad@test.com"), Contact(email="c@test.com")]
+        with patch('core.adapters.async_base_adapter.client_for', return_value=client):
+            results = await adapter.push_contacts(contacts)
+        self.assertEqual([r.remote_id for r in results], ["a", None, "c"])
+        self.assertIn("rejected", results[1].error)
+
+    async def test_hubspot_upsert_and_update(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            if request.method == "PATCH":
+                return httpx.Response(404, json={"message": "gone"})
+            return httpx.Response(200, json={"results": [{"id": "88"}]})
+
+        adapter = AsyncHubSpotAdapter({
+            'access_token': 'tok', 'object_type': 'contacts', 'upsert_field': 'email', 'field_mapping': {'email': 'email'},
+        })
+        with patch('core.adapters.async_base_adapter.client_for', return_value=_mock_client(handler)):
+            self.assertEqual(await adapter.push_contact(Contact(email="u@test.com"), upsert=True), "88")
+            self.assertIsNone(await adapter.update_contact("41", Contact(email="u@test.com")))
+        self.assertTrue(seen[0].url.path.endswith('/contacts/batch/upsert'))
+        self.assertEqual(json.loads(seen[0].content)["inputs"][0]["idProperty"], "email")
+        self.assertTrue(seen[1].url.path.endswith('/contacts/41'))
+
+    async def test_pipedrive_upsert_searches_then_caches(self):
+        seen = []
+
+        def handler(request):
+            seen.append((request.method, request.url.path))
+            if request.url.path.endswith('/search'):
+                return httpx.Response(200, json={"data": {"items": [{"item": {"id": 5}}]}})
+            return httpx.Response(200, json={"data": {"id": 5}})
+
+        adapter = AsyncPipedriveAdapter({
+            'api_token': 'tok', 'object_type': 'persons', 'upsert_field': 'email', 'field_mapping': {'email': 'email'},
+        })
+        cache.clear()
+        with patch('core.adapters.async_base_adapter.client_for', return_value=_mock_client(handler)):
+            self.assertEqual(await adapter.push_contact(Contact(email="p@test.com"), upsert=True), "5")
+            self.assertEqual(await adapter.push_contact(Contact(email="p@test.com"), upsert=True), "5")
+        self.assertEqual([method for method, _ in seen], ["GET", "PUT", "PUT"])
+
+
+    async def test_dynamics_push_returns_the_guid(self):
+        def handler(request):
+            if request.url.path.endswith('/contacts'):
+                entity_id = "https://org.crm.dynamics.com/api/data/v9.2/contacts(guid-1)"
+                return httpx.Response(204, headers={"OData-EntityId": entity_id})
+            return httpx.Response(201, json={"opportunityid": "guid-2"})
+
+        adapter = AsyncDynamicsAdapter({
+            'client_id': 'c', 'client_secret': 's', 'tenant_id': 't',
+            'resource_url': 'https://org.crm.dynamics.com', 'object_type': 'contacts',
+            'field_mapping': {'last_name': 'lastname'},
+        })
+        adapter.sync._get_access_token = lambda: 'tok'
+        metadata = MagicMock(status_code=200)
+        metadata.json.return_value = {"value": [{"PrimaryIdAttribute": "opportunityid"}]}
+        cache.clear()
+        with patch('core.adapters.async_base_adapter.client_for', return_value=_mock_client(handler)), \
+                patch.object(DynamicsAdapter, '_request', return_value=metadata) as metadata_request:
+            self.assertEqual(await adapter.push_contact(Contact(last_name="One")), "guid-1")
+            self.assertEqual(await adapter.push_contact(Contact(last_name="Two"), target="opportunities"), "guid-2")
+        self.assertTrue(metadata_request.call_args.args[1].endswith('/EntityDefinitions'))
+
+    async def test_shared_state_calls_run_off_the_event_loop(self):
+        # Circuit breaker, rate limiter and retry budget calls may block on Redis
+        loop_thread, threads = threading.get_ident(), []
+
+        def record(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return 0.0
+
+        responses = iter([httpx.Response(503), httpx.Response(200)])
+        client = _mock_client(lambda request: next(responses))
+        with patch.object(retry.rate_limiter, 'reserve', side_effect=record), \
+                patch.object(retry.rate_limiter, 'observe', side_effect=record), \
+                patch.object(retry.circuit_breaker, 'before', side_effect=record), \
+                patch.object(retry.circuit_breaker, 'record', side_effect=record), \
+                patch.object(retry.retry_budget, 'deposit', side_effect=record), \
+                patch.object(retry.retry_budget, 'withdraw', side_effect=lambda crm: record() is not None), \
+                patch('core.adapters.retry.asyncio.sleep'):
+            await retry.asend_with_retries('hubspot', 'hubspot:key', 'GET', 'https://api.test/x',
+                                           lambda: client.get('https://api.test/x'))
+        # Two attempts of four calls each, one deposit and one withdrawal
+        self.assertEqual(len(threads), 10)
+        self.assertNotIn(loop_thread, threads)
+
+
+class AsyncSyncViewTest(TestCase):
+    def setUp(self):
+        BrokerService.async_adapter_cache.clear()
+        self.user = User.objects.create_user(email='aio@test.com', username='aiouser', password='password')
+        CRMConfiguration.objects.create(
+            user=self.user,
+            crm_type='hubspot',
+            auth_config={'access_token': None, 'object_type': 'contacts'},
+            field_mapping={'email': 'email'}
+        )
+        self.auth = f"Bearer {RefreshToken.for_user(self.user).access_token}"
+
+    def test_async_sync_endpoint(self):
+        response = self.client.post('/api/sync/hubspot/aio/', {"email": "aio@test.com"},
+                                    content_type='application/json', HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["remote_id"], "MOCK_HS_ID_123")
+
+    def test_requires_authentication(self):
+        response = self.client.post('/api/sync/hubspot/aio/', {"email": "aio@test.com"}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_salesforce_falls_back_to_threaded_adapter(self):
+        await CRMConfiguration.objects.acreate(user=self.user, crm_type='salesforce', auth_config={'username': None})
+        adapter = await BrokerService.aget_adapter_for_user(self.user, 'salesforce')
+        self.assertIsInstance(adapter, ThreadedAdapter)
+
+    def test_validates_and_skips_unchanged(self):
+        url = '/api/sync/hubspot/aio/'
+        response = self.client.post(url, {"email": "aio@test.com"}, content_type='application/json',
+                                    HTTP_AUTHORIZATION=self.auth)
+        self.assertFalse(response.json()["skipped"])
+        record = RemoteRecord.objects.get(user=self.user, crm_type='hubspot', external_key='aio@test.com')
+        self.assertTrue(record.content_hash)
+
+        response = self.client.post(url, {"email": "aio@test.com"}, content_type='application/json',
+                                    HTTP_AUTHORIZATION=self.auth)
+        self.assertTrue(response.json()["skipped"])
+        response = self.client.post(f"{url}?force=true", {"email": "aio@test.com"}, content_type='application/json',
+                                    HTTP_AUTHORIZATION=self.auth)
+        self.assertFalse(response.json()["skipped"])
+
+    def test_idempotency_key_replays(self):
+        kwargs = dict(content_type='application/json', HTTP_AUTHORIZATION=self.auth, HTTP_IDEMPOTENCY_KEY='aio-1')
+        with patch('core.remote_records.apush_contact', wraps=remote_records.apush_contact) as push:
+            first = self.client.post('/api/sync/hubspot/aio/', {"email": "aio@test.com"}, **kwargs)
+            second = self.client.post('/api/sync/hubspot/aio/', {"email": "aio@test.com"}, **kwargs)
+            conflict = self.client.post('/api/sync/hubspot/aio/', {"email": "other@test.com"}, **kwargs)
+        self.assertEqual(push.call_count, 1)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(conflict.status_code, 422)
+
+    def test_upsert_requires_upsert_field(self):
+        response = self.client.post('/api/sync/hubspot/aio/?upsert=true', {"email": "aio@test.com"},
+                                    content_type='application/json', HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error_code"], "CONFIGURATION_ERROR")
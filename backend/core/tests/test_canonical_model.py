@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock, patch
+from django.test import SimpleTestCase
+from core.canonical_model import Contact, ContactBatch
+from core.adapters.hubspot_adapter import HubSpotAdapter
+
+class ContactFromDictsTest(SimpleTestCase):
+    def test_matches_single_constructor(self):
+        row = {'email': 'a@test.com', 'first_name': 'Ann', 'job': 'Dev', 'custom_fields': {'tier': 'gold'}}
+        contacts, errors = Contact.from_dicts([row])
+        self.assertEqual(errors, {})
+        self.assertEqual(contacts[0], Contact(**dict(row, custom_fields={'tier': 'gold'})))
+
+    def test_init_and_from_dicts_split_fields_alike(self):
+        row = {'email': 'a@test.com', 'tier': 'gold', 'custom_fields': {'plan': 'pro'}}
+        contacts, _ = Contact.from_dicts([row])
+        self.assertEqual(Contact(**row), contacts[0])
+        self.assertEqual(row['custom_fields'], {'plan': 'pro'})
+
+    def test_timestamps_are_kept(self):
+        contacts, _ = Contact.from_dicts([{'id': '1', 'updated_at': '2024-01-01T00:00:00Z'}])
+        self.assertEqual(contacts[0].updated_at.year, 2024)
+        self.assertEqual(Contact(updated_at='2024-01-01T00:00:00Z'), contacts[0].model_copy(update={'id': None}))
+
+    def test_invalid_rows_are_reported_by_index(self):
+        rows = [{'email': 'a@test.com'}, {'email': 'not-an-email'}, 'oops', {'last_name': 'B'}]
+        contacts, errors = Contact.from_dicts(rows)
+        self.assertEqual(sorted(errors), [1, 2])
+        self.assertIn('email', errors[1])
+        self.assertIsNone(contacts[1])
+        self.assertIsNone(contacts[2])
+        self.assertEqual(contacts[3].last_name, 'B')
+
+    def test_trusted_rows_skip_validation(self):
+        contacts, errors = Contact.from_dicts([{'email': 'not-an-email', 'job': 'Dev'}], trusted=True)
+        self.assertEqual(errors, {})
+        self.assertIsInstance(contacts[0], Contact)
+        self.assertEqual(contacts[0].email, 'not-an-email')
+        self.assertEqual(contacts[0].custom_fields, {'job': 'Dev'})
+        self.assertIsNone(contacts[0].phone)
+
+class ContactBatchTest(SimpleTestCase):
+    def setUp(self):
+        self.rows = [
+            {'email': f'u{i}@test.com', 'first_name': f'U{i}', 'tier': 'gold' if i % 2 else None}
+            for i in range(5)
+        ]
+        self.rows[3]['region'] = 'EU'
+
+    def test_rows_match_contacts(self):
+        batch, errors = ContactBatch.from_dicts(self.rows)
+        self.assertEqual(errors, {})
+        self.assertEqual(len(batch), 5)
+        self.assertEqual(list(batch), [Contact(**row) for row in self.rows])
+        self.assertEqual(batch[-1].first_name, 'U4')
+        self.assertEqual(batch.custom_keys, ['tier', 'region'])
+
+    def test_slices_share_storage(self):
+        batch, _ = ContactBatch.from_dicts(self.rows, trusted=True)
+        chunks = [batch[start:start + 2] for start in range(0, len(batch), 2)]
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertIs(chunks[1]._store, batch._store)
+        self.assertEqual(chunks[1][1].custom_fields, {'tier': 'gold', 'region': 'EU'})
+        self.assertEqual(len(batch[1:4][1:]), 2)
+        with self.assertRaises(ValueError):
+            chunks[0].append(Contact(email='x@test.com'))
+
+    def test_invalid_rows_are_left_out(self):
+        batch, errors = ContactBatch.from_dicts([{'email': 'bad'}, {'email': 'ok@test.com'}])
+        self.assertEqual(list(errors), [0])
+        self.assertEqual([c.email for c in batch], ['ok@test.com'])
+
+    def test_non_object_custom_fields_are_row_errors(self):
+        rows = [{'email': 'a@test.com', 'custom_fields': 'abc'}, {'email': 'ok@test.com'}]
+        for trusted in (False, True):
+            batch, errors = ContactBatch.from_dicts(rows, trusted=trusted)
+            self.assertEqual(list(errors), [0])
+            self.assertIn('custom_fields', errors[0])
+            self.assertEqual([c.email for c in batch], ['ok@test.com'])
+
+    def test_adapters_accept_batches(self):
+        adapter = HubSpotAdapter({'access_token': 'tok', 'object_type': 'contacts', 'field_mapping': {'email': 'email'}})
+        batch, _ = ContactBatch.from_dicts(self.rows)
+        response = MagicMock(status_code=201)
+        response.json.return_value = {'results': [
+            {'id': str(i), 'objectWriteTraceId': str(i)} for i in range(5)
+        ]}
+        with patch.object(HubSpotAdapter, '_request', return_value=response) as request:
+            results = adapter.push_contacts(batch)
+        self.assertEqual([r.remote_id for r in results], ['0', '1', '2', '3', '4'])
+        sent = request.call_args.kwargs['json']['inputs']
+        self.assertEqual(sent[2]['properties'], {'email': 'u2@test.com'})
@@ -0,0 +1,100 @@
+from unittest.mock import patch, MagicMock
+import requests
+from django.test import SimpleTestCase, override_settings
+from core.adapters import circuit_breaker, rate_limit
+from core.adapters.circuit_breaker import CircuitBreaker, CircuitOpen
+from core.adapters.retry import send_with_retries
+
+URL = 'https://api.hubapi.com/crm/v3/objects/contacts'
+
+
+class FakeRedisError(Exception):
+    pass
+
+
+def _response(status_code):
+    return MagicMock(status_code=status_code, headers={})
+
+
+@override_settings(CRM_CIRCUIT_ENABLED=True, CRM_CIRCUIT_WINDOW=60, CRM_CIRCUIT_MIN_CALLS=4,
+                   CRM_CIRCUIT_FAILURE_RATE=0.5, CRM_CIRCUIT_SLOW_CALL=10, CRM_CIRCUIT_COOLDOWN=30)
+class CircuitBreakerTest(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(rate_limit.SharedRedis())
+        self.now = 0.0
+        patchers = [
+            patch.object(rate_limit, 'redis', None),
+            patch('core.adapters.circuit_breaker.time.monotonic', side_effect=lambda: self.now),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _call(self, response=None, exc=None, elapsed=0.1, url=URL):
+        probe = self.breaker.before('hubspot', url)
+        self.breaker.record('hubspot', url, probe, elapsed, response=response, exc=exc)
+        return probe
+
+    def test_opens_on_failure_rate_and_half_opens(self):
+        self._call(_response(200))
+        self._call(_response(503))
+        self._call(exc=requests.exceptions.ConnectTimeout())
+        with self.assertLogs('core.adapters.circuit_breaker', 'WARNING'):
+            self._call(_response(200), elapsed=12)  # Slow calls count as failures
+        with self.assertRaises(CircuitOpen) as raised:
+            self.breaker.before('hubspot', URL)
+        self.assertEqual(raised.exception.retry_in, 30)
+        # Circuits are per host
+        self.assertFalse(self.breaker.before('hubspot', 'https://api.eu1.hubapi.com/x'))
+
+        self.now = 31.0
+        self.assertTrue(self.breaker.before('hubspot', URL))
+        with self.assertRaises(CircuitOpen):
+            self.breaker.before('hubspot', URL)  # One probe at a time
+        self.breaker.record('hubspot', URL, True, 0.1, exc=requests.exceptions.ConnectionError())
+        with self.assertRaises(CircuitOpen):
+            self.breaker.before('hubspot', URL)
+
+        self.now = 62.0
+        self.assertTrue(self._call(_response(200)))
+        self.assertFalse(self._call(_response(200)))
+
+    def test_rejected_data_does_not_open(self):
+        for _ in range(6):
+            self._call(_response(400))
+        self.assertFalse(self.breaker.before('hubspot', URL))
+
+    def test_window_resets_counts(self):
+        for _ in range(3):
+            self._call(_response(503))
+        self.now = 61.0
+        self._call(_response(503))
+        self.assertFalse(self.breaker.before('hubspot', URL))
+
+    def test_redis_state_and_fallback(self):
+        fake_redis = MagicMock(RedisError=FakeRedisError)
+        allow_script, record_script = MagicMock(return_value=[0, b'12.5']), MagicMock(return_value=b'')
+        fake_redis.Redis.from_url.return_value.register_script.side_effect = [allow_script, record_script]
+        with patch.object(rate_limit, 'redis', fake_redis), patch.object(circuit_breaker, 'redis', fake_redis), \
+                override_settings(CRM_RATE_LIMIT_REDIS_URL='redis://localhost:6379/0'):
+            with self.assertRaises(CircuitOpen) as raised:
+                self.breaker.before('hubspot', URL)
+            self.assertEqual(raised.exception.retry_in, 12.5)
+            self.assertEqual(allow_script.call_args.kwargs['keys'], ['crm-circuit:hubspot:api.hubapi.com'])
+
+            self.breaker.record('hubspot', URL, False, 0.1, response=_response(503))
+            self.assertEqual(record_script.call_args.kwargs['args'][:2], [1, 0])
+
+            allow_script.side_effect = FakeRedisError("connection refused")
+            with self.assertLogs('core.adapters.rate_limit', 'WARNING'):
+                self.assertFalse(self.breaker.before('hubspot', URL))
+
+    def test_open_circuit_skips_the_network(self):
+        send = MagicMock()
+        with patch('core.adapters.retry.circuit_breaker', self.breaker), \
+                override_settings(CRM_RATE_LIMIT_ENABLED=False):
+            for _ in range(4):
+                self._call(_response(502))
+            with self.assertRaises(CircuitOpen):
+                send_with_retries('hubspot', 'hubspot:key', 'POST', URL, send)
+        send.assert_not_called()
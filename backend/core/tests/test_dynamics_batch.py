@@ -0,0 +1,109 @@
+from unittest.mock import patch, MagicMock
+from django.test import SimpleTestCase, override_settings
+from core.adapters.dynamics_adapter import DynamicsAdapter
+from core.adapters.token_store import token_store
+from core.canonical_model import Contact
+
+BATCH_RESPONSE = (
+    "--batchresponse_1\r\n"
+    "Content-Type: multipart/mixed; boundary=changesetresponse_a\r\n"
+    "\r\n"
+    "--changesetresponse_a\r\n"
+    "Content-Type: application/http\r\n"
+    "Content-Transfer-Encoding: binary\r\n"
+    "Content-ID: 1\r\n"
+    "\r\n"
+    "HTTP/1.1 204 No Content\r\n"
+    "OData-EntityId: https://org.crm.dynamics.com/api/data/v9.2/contacts(guid-1)\r\n"
+    "\r\n"
+    "\r\n"
+    "--changesetresponse_a--\r\n"
+    "--batchresponse_1\r\n"
+    "Content-Type: application/http\r\n"
+    "Content-Transfer-Encoding: binary\r\n"
+    "Content-ID: 2\r\n"
+    "\r\n"
+    "HTTP/1.1 400 Bad Request\r\n"
+    "Content-Type: application/json; odata.metadata=minimal\r\n"
+    "\r\n"
+    '{"error":{"code":"0x80040203","message":"Invalid lastname"}}\r\n'
+    "--batchresponse_1\r\n"
+    "Content-Type: multipart/mixed; boundary=changesetresponse_c\r\n"
+    "\r\n"
+    "--changesetresponse_c\r\n"
+    "Content-Type: application/http\r\n"
+    "Content-Transfer-Encoding: binary\r\n"
+    "Content-ID: 3\r\n"
+    "\r\n"
+    "HTTP/1.1 204 No Content\r\n"
+    "OData-EntityId: https://org.crm.dynamics.com/api/data/v9.2/contacts(guid-3)\r\n"
+    "\r\n"
+    "\r\n"
+    "--changesetresponse_c--\r\n"
+    "--batchresponse_1--\r\n"
+)
+
+
+class DynamicsBatchTest(SimpleTestCase):
+    def setUp(self):
+        token_store.clear()
+        self.adapter = DynamicsAdapter({
+            'client_id': 'c', 'client_secret': 's', 'tenant_id': 't',
+            'resource_url': 'https://org.crm.dynamics.com', 'object_type': 'contacts',
+            'field_mapping': {'last_name': 'lastname'},
+        })
+        self.adapter._get_access_token = MagicMock(return_value='tok')
+
+    def _batch_response(self, status_code=200, headers=None):
+        response = MagicMock(status_code=status_code, text=BATCH_RESPONSE)
+        response.headers = headers or {"Content-Type": "multipart/mixed; boundary=batchresponse_1"}
+        return response
+
+    def test_batch_maps_changeset_responses(self):
+        contacts = [Contact(last_name=name) for name in ("One", "Two", "Three")]
+        with patch.object(DynamicsAdapter, '_request', return_value=self._batch_response()) as request:
+            results = self.adapter.push_contacts(contacts)
+
+        self.assertEqual(request.call_count, 1)
+        method, url = request.call_args.args
+        body = request.call_args.kwargs['data'].decode()
+        self.assertEqual(url, "https://org.crm.dynamics.com/api/data/v9.2/$batch")
+        self.assertEqual(body.count("POST https://org.crm.dynamics.com/api/data/v9.2/contacts HTTP/1.1"), 3)
+        self.assertEqual(body.count("Content-Type: multipart/mixed; boundary=changeset_"), 3)
+        self.assertEqual(results[0].remote_id, "guid-1")
+        self.assertEqual(results[1].error, "Invalid lastname")
+        self.assertEqual(results[2].remote_id, "guid-3")
+
+    def test_update_addresses_the_record_by_guid(self):
+        with patch.object(DynamicsAdapter, '_request', return_value=MagicMock(status_code=204)) as request:
+            self.assertEqual(self.adapter.update_contact("guid-1", Contact(last_name="One")), "guid-1")
+        self.assertEqual(request.call_args.args, ("PATCH", "https://org.crm.dynamics.com/api/data/v9.2/contacts(guid-1)"))
+
+    def test_batch_update_patches_by_guid(self):
+        response = self._batch_response()
+        response.text = BATCH_RESPONSE.replace(
+            "OData-EntityId: https://org.crm.dynamics.com/api/data/v9.2/contacts(guid-3)\r\n", ""
+        ).replace("HTTP/1.1 400 Bad Request", "HTTP/1.1 404 Not Found")
+        updates = [("guid-1", Contact(last_name="One")), ("guid-2", Contact(last_name="Two")),
+                   ("guid-3", Contact(last_name="Three"))]
+        with patch.object(DynamicsAdapter, '_request', return_value=response) as request:
+            results = self.adapter.update_contacts(updates)
+
+        self.assertEqual(request.call_count, 1)
+        body = request.call_args.kwargs['data'].decode()
+        self.assertIn("PATCH https://org.crm.dynamics.com/api/data/v9.2/contacts(guid-2) HTTP/1.1", body)
+        self.assertEqual(body.count("If-Match: *"), 3)
+        self.assertEqual(results[0].remote_id, "guid-1")
+        # Deleted from Dynamics: created again by the caller
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2].remote_id, "guid-3")
+
+    @override_settings(CRM_RATE_LIMIT_ENABLED=False)
+    def test_honors_retry_after(self):
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "7"})
+        with patch('core.adapters.base_adapter.session_for') as session_for, \
+                patch('core.adapters.retry.time.sleep') as sleep:
+            session_for.return_value.request.side_effect = [throttled, self._batch_response()]
+            results = self.adapter.push_contacts([Contact(last_name="One")])
+        sleep.assert_called_once_with(7.0)
+        self.assertTrue(results[0].ok)
@@ -0,0 +1,34 @@
+from unittest.mock import patch
+from django.test import SimpleTestCase, override_settings
+from core.adapters import http
+from core.adapters.hubspot_adapter import HubSpotAdapter
+from core.canonical_model import Contact
+
+class PooledSessionTest(SimpleTestCase):
+    def tearDown(self):
+        http.close_sessions()
+
+    def test_one_session_per_host(self):
+        a = http.session_for("https://api.hubapi.com/crm/v3/objects/contacts")
+        b = http.session_for("https://api.hubapi.com/crm/v3/objects/deals")
+        c = http.session_for("https://api.monday.com/v2")
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+
+    @override_settings(CRM_HTTP_POOL_SIZE=7, CRM_HTTP_CONNECT_TIMEOUT=1, CRM_HTTP_READ_TIMEOUT=9, CRM_HTTP_MAX_RETRIES=4)
+    def test_session_configuration(self):
+        session = http.session_for("https://api.pipedrive.com/v1/persons")
+        adapter = session.get_adapter("https://api.pipedrive.com")
+        self.assertEqual(session.timeout, (1, 9))
+        self.assertEqual(adapter._pool_maxsize, 7)
+        self.assertEqual(adapter.max_retries.total, 4)
+        self.assertNotIn("POST", adapter.max_retries.allowed_methods)
+
+    def test_adapters_use_pooled_session(self):
+        adapter = HubSpotAdapter({'access_token': 'tok', 'object_type': 'contacts', 'field_mapping': {'email': 'email'}})
+        with patch('requests.Session.request') as request:
+            request.return_value.json.return_value = {'id': '42'}
+            res = adapter.push_contact(Contact(email='pool@test.com'))
+        self.assertEqual(res, '42')
+        self.assertIn('timeout', request.call_args.kwargs)
+        self.assertIn("https://api.hubapi.com", http._sessions)
@@ -1,4 +1,6 @@
-from django.test import TestCase
+import json
+from unittest.mock import patch, MagicMock
+from django.test import TestCase, SimpleTestCase
 from django.contrib.auth import get_user_model
 from core.models import CRMConfiguration
 from core.services import BrokerService
@@ -46,3 +48,111 @@ class HubSpotAdapterTest(TestCase):
         with self.assertRaises(ValueError) as context:
             adapter.push_contact(contact)
         self.assertIn("No fields mapped", str(context.exception))
+
+
+def _response(status_code, data):
+    response = MagicMock(status_code=status_code, text=json.dumps(data))
+    response.json.return_value = data
+    return response
+
+
+class HubSpotBatchTest(SimpleTestCase):
+    def setUp(self):
+        self.config = {'access_token': 'tok', 'object_type': 'contacts', 'field_mapping': {'email': 'email'}}
+
+    def test_batch_create_chunks_and_maps_partial_failures(self):
+        adapter = HubSpotAdapter(self.config)
+        contacts = [Contact(email=f"user{i}@test.com") for i in range(150)]
+
+        def fake_request(method, url, json=None, headers=None):
+            inputs = json['inputs']
+            results = [
+                {"id": f"HS{item['objectWriteTraceId']}", "objectWriteTraceId": item['objectWriteTraceId']}
+                for item in inputs if item['objectWriteTraceId'] != '7'
+            ]
+            errors = [{"message": "Duplicate", "context": {"objectWriteTraceId": ["7"]}}] if len(results) < len(inputs) else []
+            return _response(207 if errors else 201, {"results": list(reversed(results)), "errors": errors})
+
+        with patch.object(HubSpotAdapter, '_request', side_effect=fake_request) as request:
+            results = adapter.push_contacts(contacts)
+
+        self.assertEqual(request.call_count, 2)
+        self.assertTrue(request.call_args_list[0].args[1].endswith('/contacts/batch/create'))
+        self.assertEqual(results[0].remote_id, 'HS0')
+        self.assertEqual(results[149].remote_id, 'HS149')
+        self.assertEqual(results[7].error, 'Duplicate')
+
+    def test_batch_upsert_by_id_property(self):
+        adapter = HubSpotAdapter(dict(self.config, id_property='email'))
+        contacts = [Contact(email="a@test.com"), Contact(email="b@test.com"), Contact(first_name="NoEmail")]
+        data = {"results": [
+            {"id": "2", "properties": {"email": "b@test.com"}},
+            {"id": "1", "properties": {"email": "a@test.com"}},
+        ]}
+        with patch.object(HubSpotAdapter, '_request', return_value=_response(200, data)) as request:
+            results = adapter.push_contacts(contacts)
+
+        payload = request.call_args.kwargs['json']
+        self.assertTrue(request.call_args.args[1].endswith('/contacts/batch/upsert'))
+        self.assertEqual(payload['inputs'][0], {"id": "a@test.com", "idProperty": "email", "properties": {"email": "a@test.com"}})
+        self.assertEqual([r.remote_id for r in results[:2]], ['1', '2'])
+        self.assertIsNotNone(results[2].error)
+
+    def test_rejected_batch_is_bisected(self):
+        adapter = HubSpotAdapter(self.config)
+        contacts = [Contact(email=f"user{i}@test.com") for i in range(4)]
+
+        def fake_request(method, url, json=None, headers=None):
+            inputs = json['inputs']
+            if any(item['objectWriteTraceId'] == '2' for item in inputs):
+                return _response(400, {"message": "Property values were not valid"})
+            return _response(201, {"results": [
+                {"id": f"HS{item['objectWriteTraceId']}", "objectWriteTraceId": item['objectWriteTraceId']} for item in inputs
+            ]})
+
+        with patch.object(HubSpotAdapter, '_request', side_effect=fake_request):
+            results = adapter.push_contacts(contacts)
+
+        self.assertEqual([r.remote_id for r in results], ['HS0', 'HS1', None, 'HS3'])
+        self.assertIn('not valid', results[2].error)
+
+    def test_unmatched_results_are_errors(self):
+        adapter = HubSpotAdapter(self.config)
+        contacts = [Contact(email="a@test.com"), Contact(email="b@test.com")]
+        # A result without a trace id cannot be tied to an input
+        data = {"results": [{"id": "HS0", "objectWriteTraceId": "0"}, {"id": "HS?"}]}
+        with patch.object(HubSpotAdapter, '_request', return_value=_response(201, data)):
+            results = adapter.push_contacts(contacts)
+
+        self.assertEqual(results[0].remote_id, 'HS0')
+        self.assertIsNone(results[1].remote_id)
+        self.assertIsNotNone(results[1].error)
+
+    def test_upsert_results_are_matched_on_upsert_field(self):
+        adapter = HubSpotAdapter(dict(self.config, upsert_field='email'))
+        contacts = [Contact(email="a@test.com"), Contact(email="b@test.com")]
+        data = {"results": [
+            {"id": "2", "properties": {"email": "B@test.com"}},
+            {"id": "1", "properties": {"email": "a@test.com"}},
+        ]}
+        with patch.object(HubSpotAdapter, '_request', return_value=_response(200, data)):
+            results = adapter.push_contacts(contacts, upsert=True)
+
+        self.assertEqual([r.remote_id for r in results], ['1', '2'])
+
+    def test_batch_update_leaves_missing_records_as_none(self):
+        adapter = HubSpotAdapter(self.config)
+        updates = [(str(i), Contact(email=f"user{i}@test.com")) for i in range(3)]
+        data = {
+            "results": [{"id": "0"}, {"id": "2"}],
+            "errors": [{"category": "OBJECT_NOT_FOUND", "message": "Not found", "context": {"ids": ["1"]}}],
+        }
+        with patch.object(HubSpotAdapter, '_request', return_value=_response(207, data)) as request:
+            results = adapter.update_contacts(updates)
+
+        self.assertEqual(request.call_count, 1)
+        self.assertTrue(request.call_args.args[1].endswith('/contacts/batch/update'))
+        self.assertEqual([item['id'] for item in request.call_args.kwargs['json']['inputs']], ['0', '1', '2'])
+        self.assertEqual(results[0].remote_id, '0')
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2].remote_id, '2')
@@ -0,0 +1,183 @@
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from core.adapters.salesforce_adapter import SalesforceAdapter
+from core.adapters.hubspot_adapter import HubSpotAdapter
+from core.adapters.monday_adapter import MondayAdapter
+from core.adapters.pipedrive_adapter import PipedriveAdapter
+from core.adapters.dynamics_adapter import DynamicsAdapter
+
+SINCE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def _response(body, status_code=200):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = body
+    return response
+
+class SalesforceIterTest(SimpleTestCase):
+    def test_follows_next_records_url(self):
+        adapter = SalesforceAdapter({'field_mapping': {'job': 'Title', 'last_name': 'LastName'}})
+        adapter.client = MagicMock()
+        adapter._refresh_client = MagicMock()
+        adapter.client.query.return_value = {
+            'done': False, 'nextRecordsUrl': '/services/data/v59.0/query/01g-2000',
+            'records': [{'Id': '003A', 'LastName': 'A', 'Email': 'a@test.com', 'Title': 'Dev',
+                         'SystemModstamp': '2024-02-01T10:00:00.000+0000'}],
+        }
+        adapter.client.query_more.return_value = {
+            'done': True, 'records': [{'Id': '003B', 'LastName': 'B', 'Email': 'not-an-email'},
+                                      {'Id': '003C', 'LastName': 'C'}],
+        }
+
+        contacts = list(adapter.iter_contacts(page_size=500, since=SINCE))
+
+        query = adapter.client.query.call_args.args[0]
+        self.assertIn("SELECT Id, FirstName, LastName, Email, Phone, SystemModstamp, Title FROM Contact", query)
+        self.assertIn("WHERE SystemModstamp > 2024-01-01T00:00:00Z ORDER BY SystemModstamp", query)
+        self.assertEqual(adapter.client.query.call_args.kwargs['headers'], {'Sforce-Query-Options': 'batchSize=500'})
+        adapter.client.query_more.assert_called_once_with(
+            '/services/data/v59.0/query/01g-2000', identifier_is_url=True, headers={'Sforce-Query-Options': 'batchSize=500'})
+        # The record with an invalid email is skipped, not fatal
+        self.assertEqual([c.id for c in contacts], ['003A', '003C'])
+        self.assertEqual(contacts[0].custom_fields, {'job': 'Dev'})
+        self.assertEqual(contacts[0].updated_at, datetime(2024, 2, 1, 10, tzinfo=timezone.utc))
+
+    def test_mock_mode(self):
+        adapter = SalesforceAdapter({})
+        self.assertEqual([c.id for c in adapter.fetch_contacts()], ['MOCK_SF_1'])
+
+class HubSpotIterTest(SimpleTestCase):
+    def setUp(self):
+        self.adapter = HubSpotAdapter({
+            'access_token': 'tok', 'object_type': 'contacts', 'field_mapping': {'email': 'email', 'job': 'jobtitle'},
+        })
+
+    def test_follows_after_cursor(self):
+        pages = [
+            _response({'results': [{'id': '1', 'properties': {'email': 'a@test.com', 'jobtitle': 'Dev'}}],
+                       'paging': {'next': {'after': '1'}}}),
+            _response({'results': [{'id': '2', 'properties': {'email': 'b@test.com'}, 'updatedAt': '2024-03-01T00:00:00Z'}]}),
+        ]
+        with patch.object(HubSpotAdapter, '_request', side_effect=pages) as request:
+            contacts = list(self.adapter.iter_contacts(page_size=500))
+
+        first, second = request.call_args_list
+        self.assertEqual(first.kwargs['params'], {'limit': 100, 'archived': 'false', 'properties': 'email,jobtitle'})
+        self.assertEqual(second.kwargs['params']['after'], '1')
+        self.assertEqual([(c.id, c.email) for c in contacts], [('1', 'a@test.com'), ('2', 'b@test.com')])
+        self.assertEqual(contacts[0].custom_fields, {'job': 'Dev'})
+
+    def test_since_uses_search(self):
+        with patch.object(HubSpotAdapter, '_request', return_value=_response({'results': []})) as request:
+            list(self.adapter.iter_contacts(since=SINCE))
+        method, url = request.call_args.args
+        body = request.call_args.kwargs['json']
+        self.assertEqual((method, url), ('POST', 'https://api.hubapi.com/crm/v3/objects/contacts/search'))
+        self.assertEqual(body['filterGroups'][0]['filters'][0],
+                         {'propertyName': 'lastmodifieddate', 'operator': 'GT', 'value': '1704067200000'})
+
+    def test_search_restarts_before_the_result_limit(self):
+        # Seven changes, two sharing a timestamp across the restart
+        stamps = [1, 2, 3, 4, 4, 5, 6]
+        records = [
+            {'id': str(n), 'properties': {}, 'updatedAt': datetime.fromtimestamp(1704067200 + stamp, timezone.utc).isoformat()}
+            for n, stamp in enumerate(stamps)
+        ]
+
+        def search(method, url, json=None, headers=None):
+            floor = int(json['filterGroups'][0]['filters'][0]['value'])
+            operator = json['filterGroups'][0]['filters'][0]['operator']
+            matching = [r for r, stamp in zip(records, stamps)
+                        if (1704067200 + stamp) * 1000 > floor or (operator == 'GTE' and (1704067200 + stamp) * 1000 == floor)]
+            offset = int(json.get('after', 0))
+            self.assertLess(offset, HubSpotAdapter.SEARCH_LIMIT)
+            page = matching[offset:offset + json['limit']]
+            paging = {'next': {'after': str(offset + len(page))}} if offset + len(page) < len(matching) else {}
+            return _response({'results': page, 'paging': paging})
+
+        with patch.object(HubSpotAdapter, 'SEARCH_LIMIT', 4), \
+                patch.object(HubSpotAdapter, '_request', side_effect=search):
+            contacts = list(self.adapter.iter_contacts(page_size=2, since=SINCE))
+
+        self.assertEqual([c.id for c in contacts], [str(n) for n in range(7)])
+
+class MondayIterTest(SimpleTestCase):
+    def test_follows_items_page_cursor(self):
+        adapter = MondayAdapter({'api_token': 'tok', 'board_id': '42', 'field_mapping': {'full_name': 'Name', 'email': 'email_col'}})
+        item = lambda i, updated: {'id': str(i), 'name': f'User {i}', 'updated_at': updated,
+                                   'column_values': [{'id': 'email_col', 'text': f'u{i}@test.com'}]}
+        pages = [
+            _response({'data': {'boards': [{'items_page': {'cursor': 'c1', 'items': [item(1, '2023-06-01T00:00:00Z')]}}]}}),
+            _response({'data': {'next_items_page': {'cursor': None, 'items': [item(2, '2024-06-01T00:00:00Z')]}}}),
+        ]
+        with patch.object(MondayAdapter, '_request', side_effect=pages) as request:
+            contacts = list(adapter.iter_contacts(since=SINCE))
+
+        first = request.call_args_list[0].kwargs['json']
+        self.assertIn('query_params: $query_params', first['query'])
+        self.assertEqual(first['variables']['query_params']['rules'][0]['compare_value'], ['EXACT', '2023-12-31'])
+        self.assertEqual(request.call_args.kwargs['json']['variables'], {'cursor': 'c1', 'limit': 100})
+        self.assertEqual(len(contacts), 1)
+        self.assertEqual(contacts[0].email, 'u2@test.com')
+        self.assertEqual(contacts[0].custom_fields, {'full_name': 'User 2'})
+
+class PipedriveIterTest(SimpleTestCase):
+    def test_follows_start_offset(self):
+        adapter = PipedriveAdapter({'api_token': 'tok', 'object_type': 'persons', 'field_mapping': {'email': 'email'}})
+        pages = [
+            _response({'data': [{'id': 1, 'email': [{'value': 'x@test.com', 'primary': False},
+                                                    {'value': 'a@test.com', 'primary': True}]}],
+                       'additional_data': {'pagination': {'more_items_in_collection': True, 'next_start': 1}}}),
+            _response({'data': [{'id': 2, 'email': [], 'update_time': '2024-05-01 10:00:00'}],
+                       'additional_data': {'pagination': {'more_items_in_collection': False}}}),
+        ]
+        with patch.object(PipedriveAdapter, '_request', side_effect=pages) as request:
+            contacts = list(adapter.iter_contacts(page_size=1))
+
+        self.assertEqual([call.kwargs['params']['start'] for call in request.call_args_list], [0, 1])
+        self.assertEqual([(c.id, c.email) for c in contacts], [('1', 'a@test.com'), ('2', None)])
+
+    def test_since_uses_recents(self):
+        adapter = PipedriveAdapter({'api_token': 'tok', 'object_type': 'persons', 'field_mapping': {'email': 'email'}})
+        page = _response({'data': [
+            {'item': 'person', 'id': 1, 'data': {'id': 1, 'email': 'a@test.com', 'update_time': '2024-05-01 10:00:00'}},
+            {'item': 'person', 'id': 2, 'data': None},
+        ], 'additional_data': {'pagination': {'more_items_in_collection': False}}})
+        with patch.object(PipedriveAdapter, '_request', return_value=page) as request:
+            contacts = list(adapter.iter_contacts(since=SINCE))
+
+        self.assertEqual(request.call_args.args, ("GET", "https://api.pipedrive.com/v1/recents"))
+        params = request.call_args.kwargs['params']
+        self.assertEqual((params['since_timestamp'], params['items']), ('2024-01-01 00:00:00', 'person'))
+        self.assertEqual([c.email for c in contacts], ['a@test.com'])
+
+class DynamicsIterTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_follows_next_link(self):
+        adapter = DynamicsAdapter({
+            'client_id': 'c', 'client_secret': 's', 'tenant_id': 't',
+            'resource_url': 'https://org.crm.dynamics.com', 'object_type': 'contacts',
+            'field_mapping': {'email': 'emailaddress1'},
+        })
+        adapter._get_access_token = MagicMock(return_value='tok')
+        next_link = 'https://org.crm.dynamics.com/api/data/v9.2/contacts?$skiptoken=abc'
+        pages = [
+            _response({'value': [{'PrimaryIdAttribute': 'contactid'}]}),
+            _response({'value': [{'contactid': 'g1', 'emailaddress1': 'a@test.com'}], '@odata.nextLink': next_link}),
+            _response({'value': [{'contactid': 'g2', 'modifiedon': '2024-02-01T00:00:00Z'}]}),
+        ]
+        with patch.object(DynamicsAdapter, '_request', side_effect=pages) as request:
+            contacts = list(adapter.iter_contacts(page_size=50, since=SINCE))
+
+        metadata, first, second = request.call_args_list
+        self.assertTrue(metadata.args[1].endswith('/EntityDefinitions'))
+        self.assertEqual(metadata.kwargs['params']['$filter'], "EntitySetName eq 'contacts'")
+        self.assertTrue(first.kwargs['params']['$select'].startswith('contactid,'))
+        self.assertEqual(first.kwargs['params']['$filter'], 'modifiedon gt 2024-01-01T00:00:00Z')
+        self.assertEqual(first.kwargs['headers']['Prefer'], 'odata.maxpagesize=50')
+        self.assertEqual(second.args, ('GET', next_link))
+        self.assertIsNone(second.kwargs['params'])
+        self.assertEqual([c.id for c in contacts], ['g1', 'g2'])
@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+from core.canonical_model import Contact
+from core.mapping import compile_mapping, value_of, SYSTEM_FIELDS
+from core.adapters.salesforce_adapter import SalesforceAdapter
+from core.adapters.monday_adapter import MondayAdapter
+
+class MappingPlanTest(SimpleTestCase):
+    def test_projection_matches_flattened_contact(self):
+        mapping = {'email': 'Email', 'job': 'Title', 'raw_data': 'Raw', 'missing': 'Nope'}
+        plan = compile_mapping(mapping, skip=SYSTEM_FIELDS)
+        contact = Contact(email="a@test.com", custom_fields={'job': 'Dev'})
+        self.assertEqual(plan.project(contact), {'Email': 'a@test.com', 'Title': 'Dev'})
+
+    def test_custom_field_overrides_canonical(self):
+        plan = compile_mapping({'phone': 'Phone'})
+        contact = Contact(phone="1", custom_fields={'phone': '2'})
+        self.assertEqual(plan.project(contact), {'Phone': '2'})
+
+    def test_plans_are_shared(self):
+        self.assertIs(compile_mapping({'email': 'email'}), compile_mapping({'email': 'email'}))
+
+    def test_name_key_resolution(self):
+        plan = compile_mapping({'full_name': 'Name', 'email': 'email_col'}, skip=SYSTEM_FIELDS)
+        self.assertEqual(plan.source_for('Name'), 'full_name')
+        self.assertEqual(len(plan.without('full_name')), 1)
+        self.assertEqual(value_of(Contact(full_name="Ann"), 'full_name'), "Ann")
+
+    def test_adapters_apply_plan(self):
+        sf = SalesforceAdapter({'field_mapping': {'surname': 'LastName', 'job': 'Title', 'first_name': 'FirstName'}})
+        record = sf._build_record(Contact(first_name="Ann", surname="Lee", job="CTO"), 'Contact')
+        self.assertEqual(record, {'LastName': 'Lee', 'FirstName': 'Ann', 'Title': 'CTO'})
+
+        monday = MondayAdapter({'field_mapping': {'first_name': 'Name', 'email': 'email_col'}})
+        self.assertEqual(monday._build_item(Contact(first_name="Ann", email="a@test.com")),
+                         ("Ann", {'email_col': 'a@test.com'}))
@@ -1,8 +1,9 @@
-from django.test import TestCase
+from unittest.mock import patch, MagicMock
+from django.test import TestCase, SimpleTestCase
 from django.contrib.auth import get_user_model
 from core.models import CRMConfiguration
 from core.services import BrokerService
-from core.adapters.monday_adapter import MondayAdapter
+from core.adapters.monday_adapter import MondayAdapter, MondayAPIError
 from core.canonical_model import Contact
 
 User = get_user_model()
@@ -33,3 +34,75 @@ class MondayAdapterTest(TestCase):
         # Test that it captures mapping correctly even in mock
         res_id = adapter.push_contact(contact)
         self.assertTrue(res_id.startswith("MOCK_MON"))
+
+
+def _response(data):
+    response = MagicMock(status_code=200)
+    response.json.return_value = data
+    return response
+
+
+class MondayBatchTest(SimpleTestCase):
+    def setUp(self):
+        self.adapter = MondayAdapter({
+            'api_token': 'tok', 'board_id': '12345', 'batch_size': 2,
+            'field_mapping': {'first_name': 'Name', 'email': 'email_col'},
+        })
+
+    def test_aliased_mutations_with_partial_errors(self):
+        contacts = [Contact(first_name="A"), Contact(first_name="B"), Contact(first_name="C")]
+        replies = [
+            _response({
+                "data": {"item0": {"id": "1"}, "item1": None,
+                         "complexity": {"before": 1000000, "after": 940000, "reset_in_x_seconds": 30}},
+                "errors": [{"message": "Invalid column value", "path": ["item1"]}],
+            }),
+            _response({"data": {"item0": {"id": "3"},
+                                "complexity": {"before": 940000, "after": 910000, "reset_in_x_seconds": 29}}}),
+        ]
+        with patch.object(MondayAdapter, '_request', side_effect=replies) as request:
+            results = self.adapter.push_contacts(contacts)
+
+        first = request.call_args_list[0].kwargs['json']
+        self.assertIn("item1: create_item", first['query'])
+        self.assertIn("complexity { before after reset_in_x_seconds }", first['query'])
+        self.assertEqual(first['variables']['name1'], "B")
+        self.assertEqual([r.remote_id for r in results], ["1", None, "3"])
+        self.assertEqual(results[1].error, "Invalid column value")
+
+    def test_stops_when_budget_exhausted(self):
+        contacts = [Contact(first_name=str(i)) for i in range(4)]
+        replies = [
+            _response({"data": {"item0": {"id": "1"}, "item1": {"id": "2"},
+                                "complexity": {"before": 100000, "after": 20000, "reset_in_x_seconds": 12}}}),
+        ]
+        with patch.object(MondayAdapter, '_request', side_effect=replies) as request:
+            results = self.adapter.push_contacts(contacts)
+
+        # Budget after the first call (20k) cannot cover another item at 40k each
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual([r.remote_id for r in results], ["1", "2", None, None])
+        self.assertTrue(results[2].retryable)
+        self.assertEqual(results[3].retry_in, 13)
+
+    def test_complexity_rejection_is_retryable(self):
+        contacts = [Contact(first_name=str(i)) for i in range(4)]
+        rejected = _response({"errors": [{"message": "Complexity budget exhausted",
+                                          "extensions": {"code": "ComplexityException", "retry_in_seconds": 5}}]})
+        with patch.object(MondayAdapter, '_request', return_value=rejected) as request:
+            results = self.adapter.push_contacts(contacts)
+
+        self.assertEqual(request.call_count, 1)
+        self.assertTrue(all(result.retryable and result.retry_in == 6 for result in results))
+
+    def test_update_of_missing_item_returns_none(self):
+        missing = _response({"errors": [{"message": "Item not found in board",
+                                         "extensions": {"code": "InvalidItemIdException"}}]})
+        with patch.object(MondayAdapter, '_request', return_value=missing):
+            self.assertIsNone(self.adapter.update_contact("42", Contact(first_name="A")))
+
+    def test_update_keeps_other_errors(self):
+        denied = _response({"errors": [{"message": "Not Authenticated", "extensions": {"code": "Unauthorized"}}]})
+        with patch.object(MondayAdapter, '_request', return_value=denied):
+            with self.assertRaises(MondayAPIError):
+                self.adapter.update_contact("42", Contact(first_name="A"))
@@ -0,0 +1,163 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core import outbox
+from core.adapters.base_adapter import PushResult
+from core.adapters.hubspot_adapter import HubSpotAdapter
+from core.adapters.monday_adapter import MondayAdapter
+from core.canonical_model import Contact
+from core.models import CRMConfiguration, OutboxMessage, RemoteRecord, SyncJob
+from core.tasks import push_contact_task
+
+User = get_user_model()
+
+@override_settings(SYNC_OUTBOX_LEASE=300, SYNC_OUTBOX_MAX_ATTEMPTS=2, SYNC_OUTBOX_RETRY_DELAY=30)
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='outbox@test.com', username='outboxuser', password='password')
+        CRMConfiguration.objects.create(
+            user=self.user,
+            crm_type='hubspot',
+            auth_config={'access_token': None, 'object_type': 'contacts'},
+            field_mapping={'email': 'email'}
+        )
+
+    def test_dispatch_groups_messages_into_bulk_pushes(self):
+        first = outbox.enqueue(self.user, 'hubspot', {"email": "a@test.com"})
+        second = outbox.enqueue(self.user, 'hubspot', {"email": "b@test.com"})
+        invalid = outbox.enqueue(self.user, 'hubspot', {"email": "not-an-email"})
+        with patch.object(HubSpotAdapter, 'push_contacts', return_value=[
+            PushResult(remote_id='hs-a'), PushResult(error='Property values were not valid'),
+        ]) as push_contacts:
+            self.assertEqual(outbox.dispatch(), 3)
+
+        push_contacts.assert_called_once()
+        self.assertEqual([c.email for c in push_contacts.call_args.args[0]], ['a@test.com', 'b@test.com'])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        invalid.refresh_from_db()
+        self.assertEqual((first.status, first.remote_id, first.attempts), (SyncJob.STATUS_SUCCESS, 'hs-a', 1))
+        self.assertEqual((second.status, second.error), (SyncJob.STATUS_FAILED, 'Property values were not valid'))
+        self.assertEqual(invalid.status, SyncJob.STATUS_FAILED)
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(list(RemoteRecord.objects.values_list('remote_id', flat=True)), ['hs-a'])
+
+    def test_claimed_messages_are_leased(self):
+        outbox.enqueue(self.user, 'hubspot', {"email": "a@test.com"})
+        self.assertEqual(len(outbox.claim(10)), 1)
+        self.assertEqual(outbox.claim(10), [])
+        # A dispatcher that died mid-push leaves the message to the next one after the lease
+        OutboxMessage.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(outbox.claim(10)), 1)
+
+    def test_transient_failures_are_retried_then_failed(self):
+        job = outbox.enqueue(self.user, 'hubspot', {"email": "a@test.com"})
+        with patch.object(HubSpotAdapter, 'push_contacts', side_effect=requests.exceptions.ConnectTimeout("down")):
+            outbox.dispatch()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.error), (SyncJob.STATUS_PENDING, 'down'))
+            message = OutboxMessage.objects.get(job=job)
+            self.assertGreater(message.available_at, timezone.now() + timedelta(seconds=25))
+            self.assertEqual(outbox.dispatch(), 0)
+
+            OutboxMessage.objects.update(available_at=timezone.now())
+            outbox.dispatch()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (SyncJob.STATUS_FAILED, 2))
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    @override_settings(CRM_RATE_LIMIT_ENABLED=False, CRM_CIRCUIT_ENABLED=False, CRM_RETRY_MAX_ATTEMPTS=1)
+    def test_adapter_transport_failures_are_retried(self):
+        # The adapter turns the error into per-record PushResults instead of raising
+        CRMConfiguration.objects.filter(user=self.user).update(
+            auth_config={'access_token': 'token', 'object_type': 'contacts'}
+        )
+        job = outbox.enqueue(self.user, 'hubspot', {"email": "a@test.com"})
+        with patch.object(requests.Session, 'request', side_effect=requests.exceptions.ConnectTimeout("down")):
+            outbox.dispatch()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (SyncJob.STATUS_PENDING, 'down'))
+        self.assertTrue(OutboxMessage.objects.filter(job=job).exists())
+
+    def test_rejected_records_are_not_retried(self):
+        job = outbox.enqueue(self.user, 'hubspot', {"email": "a@test.com"})
+        with patch.object(HubSpotAdapter, 'push_contacts', return_value=[PushResult(error='Bad request')]):
+            outbox.dispatch()
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.STATUS_FAILED)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    @override_settings(CRM_RETRY_DEADLINE=1000)
+    def test_lease_is_renewed_for_each_chunk(self):
+        outbox.enqueue(self.user, 'hubspot', {"email": "a@test.com"})
+        outbox.enqueue(self.user, 'hubspot', {"email": "b@test.com"})
+        leases = []
+
+        def push(contacts, *args, **kwargs):
+            message = OutboxMessage.objects.get(job__payload__email=contacts[0].email)
+            leases.append(message.available_at - timezone.now())
+            return [PushResult(remote_id='hs')]
+
+        # One worst-case call exceeds SYNC_OUTBOX_LEASE: every chunk is one call,
+        # leased for that call plus one to authenticate
+        with patch.object(HubSpotAdapter, 'BATCH_SIZE', 1), \
+                patch.object(HubSpotAdapter, 'push_contacts', side_effect=push) as push_contacts:
+            outbox.dispatch()
+
+        self.assertEqual(push_contacts.call_count, 2)
+        for lease in leases:
+            self.assertGreater(lease, timedelta(seconds=2000))
+        self.assertEqual(SyncJob.objects.filter(status=SyncJob.STATUS_SUCCESS).count(), 2)
+
+    def test_chunks_count_one_by_one_upserts(self):
+        adapter = MondayAdapter({'api_token': 'tok', 'board_id': '12345', 'batch_size': 25})
+        contacts = [Contact(email=f"user{i}@test.com") for i in range(7)]
+        # Up to three calls per upsert: stale cached item, search, write
+        self.assertEqual(outbox._chunks(adapter, self.user, 'monday', contacts, True, 10),
+                         [(0, 3, 9), (3, 6, 9), (6, 7, 3)])
+
+    def test_chunks_count_updates_of_known_records(self):
+        adapter = MondayAdapter({'api_token': 'tok', 'board_id': '12345', 'batch_size': 25})
+        contacts = [Contact(email=f"user{i}@test.com") for i in range(10)]
+        for contact in contacts[:2]:
+            RemoteRecord.objects.create(user=self.user, crm_type='monday', target='12345', external_key=contact.email,
+                                        remote_id='1', content_hash='', last_synced_at=timezone.now())
+        self.assertEqual(outbox._chunks(adapter, self.user, 'monday', contacts, False, 3), [(0, 10, 3)])
+        # Each known record is one update call, on top of the batched creates
+        self.assertEqual(outbox._chunks(adapter, self.user, 'monday', contacts, False, 2), [(0, 1, 2), (1, 10, 2)])
+
+    def test_expired_lease_is_left_to_the_new_owner(self):
+        job = outbox.enqueue(self.user, 'hubspot', {"email": "a@test.com"})
+
+        def reclaimed(*args, **kwargs):
+            OutboxMessage.objects.update(available_at=timezone.now() + timedelta(hours=1))
+            return [PushResult(remote_id='hs-a')]
+
+        with patch.object(HubSpotAdapter, 'push_contacts', side_effect=reclaimed):
+            outbox.dispatch()
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.STATUS_RUNNING)
+        self.assertTrue(OutboxMessage.objects.filter(job=job).exists())
+
+    def test_command_drains_outbox(self):
+        outbox.enqueue(self.user, 'hubspot', {"email": "a@test.com"})
+        call_command('dispatch_outbox', '--once', stdout=StringIO())
+        self.assertEqual(SyncJob.objects.get().remote_id, 'MOCK_HS_ID_123')
+
+    @override_settings(SYNC_QUEUE='outbox')
+    def test_async_requests_go_to_the_outbox(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with patch.object(push_contact_task, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/sync/hubspot/?async=true', {"email": "job@test.com"}, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        apply_async.assert_not_called()
+        self.assertEqual(str(OutboxMessage.objects.get().job_id), response.data['job_id'])
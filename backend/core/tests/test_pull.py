@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest.mock import patch, MagicMock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from core.canonical_model import Contact
+from core.models import CRMConfiguration, SyncState
+from core.pull import pull_contacts
+from core.services import BrokerService
+from core.signals import contacts_pulled
+from core.tasks import pull_all_contacts_task, pull_contacts_task
+
+User = get_user_model()
+
+def _at(day):
+    return datetime(2024, 1, day, tzinfo=timezone.utc)
+
+@override_settings(SYNC_PULL_LOOKBACK=60)
+class PullContactsTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='pull@test.com', username='pulluser', password='password')
+        self.configuration = CRMConfiguration.objects.create(
+            user=user, crm_type='hubspot', auth_config={'access_token': 'tok', 'object_type': 'contacts'},
+        )
+        self.adapter = MagicMock()
+        patcher = patch.object(BrokerService, 'get_adapter_for_user', return_value=self.adapter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pages = []
+        receiver = lambda sender, configuration, contacts, **kw: self.pages.append([c.id for c in contacts])
+        contacts_pulled.connect(receiver, weak=False, dispatch_uid='test_pull')
+        self.addCleanup(contacts_pulled.disconnect, dispatch_uid='test_pull')
+
+    def test_delivers_pages_and_advances_cursor(self):
+        self.adapter.iter_contacts.return_value = iter([
+            Contact(id='1', updated_at=_at(3)), Contact(id='2', updated_at=_at(5)), Contact(id='3', updated_at=_at(4)),
+        ])
+        self.assertEqual(pull_contacts(self.configuration, page_size=2), 3)
+
+        self.adapter.iter_contacts.assert_called_once_with(page_size=2, since=None)
+        self.assertEqual(self.pages, [['1', '2'], ['3']])
+        state = SyncState.objects.get(configuration=self.configuration)
+        self.assertEqual((state.cursor, state.last_pulled), (_at(5), 3))
+
+        self.adapter.iter_contacts.return_value = iter([])
+        pull_contacts(self.configuration, page_size=2)
+        self.adapter.iter_contacts.assert_called_with(page_size=2, since=_at(5) - timedelta(seconds=60))
+        self.assertEqual(SyncState.objects.get(pk=state.pk).cursor, _at(5))
+
+    def test_failed_pull_keeps_cursor(self):
+        SyncState.objects.create(configuration=self.configuration, cursor=_at(2))
+
+        def changes(page_size, since):
+            yield Contact(id='1', updated_at=_at(9))
+            raise ConnectionError("CRM went away")
+
+        self.adapter.iter_contacts.side_effect = changes
+        with self.assertRaises(ConnectionError):
+            pull_contacts(self.configuration, page_size=1)
+        self.assertEqual(SyncState.objects.get(configuration=self.configuration).cursor, _at(2))
+
+    def test_full_pull_never_moves_cursor_back(self):
+        SyncState.objects.create(configuration=self.configuration, cursor=_at(5))
+        self.adapter.iter_contacts.return_value = iter([Contact(id='1', updated_at=_at(3))])
+        self.assertEqual(pull_contacts(self.configuration, page_size=2, full=True), 1)
+
+        self.adapter.iter_contacts.assert_called_once_with(page_size=2, since=None)
+        self.assertEqual(SyncState.objects.get(configuration=self.configuration).cursor, _at(5))
+
+    def test_concurrent_advance_wins(self):
+        state = SyncState.objects.create(configuration=self.configuration, cursor=_at(2))
+
+        def changes(page_size, since):
+            SyncState.objects.filter(pk=state.pk).update(cursor=_at(20))
+            yield Contact(id='1', updated_at=_at(9))
+
+        self.adapter.iter_contacts.side_effect = changes
+        pull_contacts(self.configuration)
+        self.assertEqual(SyncState.objects.get(pk=state.pk).cursor, _at(20))
+
+    def test_no_receiver_leaves_cursor(self):
+        contacts_pulled.disconnect(dispatch_uid='test_pull')
+        self.assertEqual(pull_contacts(self.configuration), 0)
+        self.adapter.iter_contacts.assert_not_called()
+        self.assertFalse(SyncState.objects.filter(configuration=self.configuration, cursor__isnull=False).exists())
+
+    def test_command_and_beat_task(self):
+        self.adapter.iter_contacts.return_value = iter([Contact(id='1')])
+        out = StringIO()
+        call_command('pull_contacts', '--crm', 'hubspot', stdout=out)
+        self.assertIn('1 contacts', out.getvalue())
+
+        with patch.object(pull_contacts_task, 'apply_async') as apply_async:
+            pull_all_contacts_task()
+        apply_async.assert_called_once_with(kwargs={'configuration_id': self.configuration.pk, 'crm_type': 'hubspot'})
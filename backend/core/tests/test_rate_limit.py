@@ -0,0 +1,95 @@
+from unittest.mock import patch, MagicMock
+from django.test import SimpleTestCase, override_settings
+from core.adapters import rate_limit
+from core.adapters.rate_limit import LocalBuckets, RateLimiter, RateLimitExceeded, read_limits
+from core.adapters.hubspot_adapter import HubSpotAdapter
+
+def _response(status_code=200, **headers):
+    return MagicMock(status_code=status_code, headers=headers)
+
+class FakeRedisError(Exception):
+    pass
+
+class TokenBucketTest(SimpleTestCase):
+    def test_burst_then_paced(self):
+        buckets = LocalBuckets()
+        with patch('core.adapters.rate_limit.time.monotonic', return_value=100.0):
+            waits = [buckets.reserve('k', 10, 2, 60)[1] for _ in range(4)]
+        self.assertEqual(waits, [0.0, 0.0, 0.1, 0.2])
+        with patch('core.adapters.rate_limit.time.monotonic', return_value=101.0):
+            # One second refills to the burst size, not beyond
+            self.assertEqual(buckets.reserve('k', 10, 2, 60), (True, 0.0))
+
+    def test_refuses_waits_beyond_max(self):
+        buckets = LocalBuckets()
+        with patch('core.adapters.rate_limit.time.monotonic', return_value=0.0):
+            buckets.adjust('k', 10, 10, None, None, 30)
+            self.assertEqual(buckets.reserve('k', 10, 10, 5), (False, 30.1))
+            # A refused reservation does not consume a token
+            self.assertEqual(buckets.reserve('k', 10, 10, 60), (True, 30.1))
+
+class ReadLimitsTest(SimpleTestCase):
+    def test_retry_after_on_429(self):
+        self.assertEqual(read_limits(_response(429, **{'Retry-After': '7'})), (None, None, 7.0))
+
+    def test_hubspot_headers(self):
+        response = _response(**{'X-HubSpot-RateLimit-Secondly': '19', 'X-HubSpot-RateLimit-Secondly-Remaining': '0'})
+        self.assertEqual(read_limits(response), (19.0, 19.0, 1.0))
+
+    def test_exhausted_window_waits_for_reset(self):
+        response = _response(**{'X-RateLimit-Limit': '80', 'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '2'})
+        self.assertEqual(read_limits(response), (None, None, 2.0))
+
+    def test_plain_response(self):
+        self.assertEqual(read_limits(_response()), (None, None, None))
+
+@override_settings(CRM_RATE_LIMITS={'hubspot': (10, 1)}, CRM_RATE_LIMIT_MAX_WAIT=60)
+class RateLimiterTest(SimpleTestCase):
+    def test_local_fallback_without_redis(self):
+        limiter = RateLimiter(rate_limit.SharedRedis())
+        with patch.object(rate_limit, 'redis', None), \
+                patch('core.adapters.rate_limit.time.monotonic', return_value=0.0):
+            self.assertEqual(limiter.reserve('hubspot', 'hubspot:a'), 0.0)
+            limiter.observe('hubspot', 'hubspot:a', _response(429, **{'Retry-After': '3'}))
+            self.assertAlmostEqual(limiter.reserve('hubspot', 'hubspot:a'), 3.1)
+            # Other credentials are unaffected
+            self.assertEqual(limiter.reserve('hubspot', 'hubspot:b'), 0.0)
+            with self.assertRaises(RateLimitExceeded):
+                limiter.observe('hubspot', 'hubspot:a', _response(429, **{'Retry-After': '120'}))
+                limiter.reserve('hubspot', 'hubspot:a')
+
+    def test_redis_is_shared_and_failures_fall_back(self):
+        fake_redis = MagicMock(RedisError=FakeRedisError)
+        reserve_script, adjust_script = MagicMock(return_value=[1, b'0.25']), MagicMock()
+        fake_redis.Redis.from_url.return_value.register_script.side_effect = [reserve_script, adjust_script]
+        limiter = RateLimiter(rate_limit.SharedRedis())
+        with patch.object(rate_limit, 'redis', fake_redis):
+            self.assertEqual(limiter.reserve('hubspot', 'hubspot:a'), 0.25)
+            self.assertEqual(reserve_script.call_args.kwargs['keys'], ['crm-rate:hubspot:a'])
+            limiter.observe('hubspot', 'hubspot:a', _response(429, **{'Retry-After': '3'}))
+            self.assertEqual(adjust_script.call_args.kwargs['args'][3:], ['', '', 3.0])
+
+            reserve_script.side_effect = FakeRedisError("connection refused")
+            with self.assertLogs('core.adapters.rate_limit', 'WARNING'):
+                self.assertEqual(limiter.reserve('hubspot', 'hubspot:a'), 0.0)
+            reserve_script.reset_mock()
+            limiter.reserve('hubspot', 'hubspot:a')
+            reserve_script.assert_not_called()
+
+class AdapterRateLimitTest(SimpleTestCase):
+    def test_requests_are_limited_per_credential(self):
+        first = HubSpotAdapter({'access_token': 'tok-1', 'object_type': 'contacts'})
+        same = HubSpotAdapter({'access_token': 'tok-1', 'object_type': 'companies'})
+        other = HubSpotAdapter({'access_token': 'tok-2', 'object_type': 'contacts'})
+        self.assertEqual(first.rate_limit_key, same.rate_limit_key)
+        self.assertNotEqual(first.rate_limit_key, other.rate_limit_key)
+        self.assertNotIn('tok-1', first.rate_limit_key)
+
+        response = _response()
+        with patch('core.adapters.base_adapter.session_for') as session_for, \
+                patch.object(rate_limit.rate_limiter, 'acquire') as acquire, \
+                patch.object(rate_limit.rate_limiter, 'observe') as observe:
+            session_for.return_value.request.return_value = response
+            first._request('GET', 'https://api.hubapi.com/crm/v3/objects/contacts')
+        acquire.assert_called_once_with('hubspot', first.rate_limit_key)
+        observe.assert_called_once_with('hubspot', first.rate_limit_key, response)
@@ -0,0 +1,123 @@
+from unittest.mock import patch, MagicMock
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from core import remote_records
+from core.adapters.base_adapter import PushResult
+from core.adapters.pipedrive_adapter import PipedriveAdapter
+from core.canonical_model import Contact
+from core.models import RemoteRecord
+
+User = get_user_model()
+
+def _mapped(contact, target=None):
+    return dict(contact.custom_fields, LastName=contact.last_name, Email=contact.email)
+
+class RemoteRecordTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='remote@test.com', username='remoteuser', password='password')
+        self.adapter = MagicMock(config={'object_type': 'persons'})
+        self.adapter.mapped_payload.side_effect = _mapped
+
+    def test_successful_pushes_are_recorded(self):
+        contacts = [Contact(id='c-1', last_name='Doe'), Contact(email='Jane@Test.com'), Contact(last_name='NoKey')]
+        self.adapter.push_contacts.return_value = [
+            PushResult(remote_id='10'), PushResult(error='rejected'), PushResult(remote_id='12'),
+        ]
+        remote_records.push_contacts(self.adapter, self.user, 'pipedrive', contacts)
+
+        record = RemoteRecord.objects.get()
+        self.assertEqual((record.target, record.external_key, record.remote_id), ('persons', 'c-1', '10'))
+        self.assertEqual(record.content_hash, remote_records.content_hash(self.adapter, contacts[0]))
+
+    def test_repeat_push_updates_record(self):
+        self.adapter.push_contact.return_value = '10'
+        self.adapter.update_contact.return_value = '10'
+        remote_records.push_contact(self.adapter, self.user, 'pipedrive', Contact(id='c-1', last_name='Doe'))
+        remote_records.push_contact(self.adapter, self.user, 'pipedrive', Contact(id='c-1', last_name='Roe'))
+
+        # The known record is updated in place instead of created a second time
+        self.adapter.push_contact.assert_called_once()
+        self.assertEqual(self.adapter.update_contact.call_args.args[0], '10')
+        record = RemoteRecord.objects.get()
+        self.assertEqual(record.remote_id, '10')
+        self.assertEqual(record.content_hash, remote_records.content_hash(self.adapter, Contact(id='c-1', last_name='Roe')))
+
+    def test_content_hash_covers_the_mapped_payload(self):
+        adapter = PipedriveAdapter({'object_type': 'persons', 'field_mapping': {'last_name': 'name', 'tier': 'tier_key'}})
+        digest = remote_records.content_hash(adapter, Contact(id='a', last_name='Doe', tier='gold'))
+        # Unmapped fields, the key and timestamps do not count
+        self.assertEqual(digest, remote_records.content_hash(
+            adapter, Contact(id='b', last_name='Doe', tier='gold', phone='555', updated_at='2024-01-01T00:00:00Z')))
+        self.assertNotEqual(digest, remote_records.content_hash(adapter, Contact(last_name='Doe', tier='silver')))
+        remapped = PipedriveAdapter({'object_type': 'persons', 'field_mapping': {'last_name': 'name', 'tier': 'other_key'}})
+        self.assertNotEqual(digest, remote_records.content_hash(remapped, Contact(last_name='Doe', tier='gold')))
+
+    def test_unchanged_contacts_are_skipped(self):
+        contacts = [Contact(id='c-1', last_name='Doe'), Contact(id='c-2', last_name='Roe')]
+        self.adapter.push_contacts.return_value = [PushResult(remote_id='10'), PushResult(remote_id='11')]
+        remote_records.push_contacts(self.adapter, self.user, 'pipedrive', contacts, skip=True)
+
+        self.adapter.push_contacts.return_value = [PushResult(remote_id='11')]
+        changed = [Contact(id='c-1', last_name='Doe'), Contact(id='c-2', last_name='Poe')]
+        results = remote_records.push_contacts(self.adapter, self.user, 'pipedrive', changed, skip=True)
+
+        self.assertEqual([c.id for c in self.adapter.push_contacts.call_args.args[0]], ['c-2'])
+        self.assertEqual([(r.remote_id, r.skipped) for r in results], [('10', True), ('11', False)])
+
+    def test_skip_disabled_pushes_everything(self):
+        self.adapter.push_contact.return_value = '10'
+        self.adapter.update_contact.return_value = '10'
+        remote_records.push_contact(self.adapter, self.user, 'pipedrive', Contact(id='c-1', last_name='Doe'))
+        result = remote_records.push_contact(self.adapter, self.user, 'pipedrive', Contact(id='c-1', last_name='Doe'))
+        self.assertFalse(result.skipped)
+        self.assertEqual(self.adapter.update_contact.call_count, 1)
+
+    def test_known_remote_id_skips_search(self):
+        cache.clear()
+        adapter = PipedriveAdapter({
+            'api_token': 'tok', 'object_type': 'persons', 'upsert_field': 'email', 'field_mapping': {'email': 'email'},
+        })
+        contact = Contact(email='jane@test.com')
+        RemoteRecord.objects.create(
+            user=self.user, crm_type='pipedrive', target='persons', external_key='jane@test.com',
+            remote_id='7', content_hash='old', last_synced_at='2024-01-01T00:00:00Z',
+        )
+        updated = MagicMock(status_code=200)
+        with patch.object(PipedriveAdapter, '_request', return_value=updated) as request:
+            result = remote_records.push_contact(adapter, self.user, 'pipedrive', contact, upsert=True, skip=True)
+
+        self.assertEqual(result.remote_id, '7')
+        request.assert_called_once()
+        self.assertEqual(request.call_args.args, ('PUT', 'https://api.pipedrive.com/v1/persons/7'))
+        self.assertEqual(RemoteRecord.objects.get().content_hash, remote_records.content_hash(adapter, contact))
+
+    def test_bulk_push_updates_known_records(self):
+        RemoteRecord.objects.create(
+            user=self.user, crm_type='pipedrive', target='persons', external_key='c-1',
+            remote_id='10', content_hash='old', last_synced_at='2024-01-01T00:00:00Z',
+        )
+        RemoteRecord.objects.create(
+            user=self.user, crm_type='pipedrive', target='persons', external_key='c-2',
+            remote_id='11', content_hash='old', last_synced_at='2024-01-01T00:00:00Z',
+        )
+        contacts = [Contact(id='c-1', last_name='Doe'), Contact(id='c-2', last_name='Roe'), Contact(id='c-3', last_name='Poe')]
+        # c-2 was deleted from the CRM and is created again
+        self.adapter.update_contacts.return_value = [PushResult(remote_id='10'), None]
+        self.adapter.push_contacts.return_value = [PushResult(remote_id='21'), PushResult(remote_id='22')]
+        results = remote_records.push_contacts(self.adapter, self.user, 'pipedrive', contacts)
+
+        self.assertEqual([r.remote_id for r in results], ['10', '21', '22'])
+        self.assertEqual([remote_id for remote_id, _ in self.adapter.update_contacts.call_args.args[0]], ['10', '11'])
+        self.assertEqual([c.id for c in self.adapter.push_contacts.call_args.args[0]], ['c-2', 'c-3'])
+        self.assertEqual(
+            dict(RemoteRecord.objects.values_list('external_key', 'remote_id')), {'c-1': '10', 'c-2': '21', 'c-3': '22'}
+        )
+
+    def test_update_by_remote_id(self):
+        adapter = PipedriveAdapter({'api_token': 'tok', 'object_type': 'persons', 'field_mapping': {'last_name': 'name'}})
+        with patch.object(PipedriveAdapter, '_request', return_value=MagicMock(status_code=200)) as request:
+            self.assertEqual(adapter.update_contact('7', Contact(last_name='Doe')), '7')
+        self.assertEqual(request.call_args.args, ('PUT', 'https://api.pipedrive.com/v1/persons/7'))
+        with patch.object(PipedriveAdapter, '_request', return_value=MagicMock(status_code=404)):
+            self.assertIsNone(adapter.update_contact('7', Contact(last_name='Doe')))
@@ -0,0 +1,114 @@
+import json
+from http.client import RemoteDisconnected
+from unittest.mock import patch, MagicMock
+import requests
+from django.test import SimpleTestCase, override_settings
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+from core.adapters import rate_limit, retry
+from core.adapters.retry import LimitedSession, RetryBudget, retry_budget, send_with_retries, transient_wait
+
+
+class FakeRedisError(Exception):
+    pass
+
+def _response(status_code, body=None, **headers):
+    return MagicMock(status_code=status_code, text=json.dumps(body) if body is not None else '', headers=headers)
+
+@override_settings(CRM_RATE_LIMIT_ENABLED=False, CRM_CIRCUIT_ENABLED=False, CRM_RETRY_MAX_ATTEMPTS=4, CRM_RETRY_DEADLINE=60,
+                   CRM_RETRY_BUDGET_RESERVE=10, CRM_RETRY_BUDGET_RATIO=0.2)
+class RetryPolicyTest(SimpleTestCase):
+    def setUp(self):
+        retry_budget.clear()
+        patcher = patch('core.adapters.retry.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _send(self, crm, method, *outcomes):
+        send = MagicMock(side_effect=list(outcomes))
+        try:
+            return send_with_retries(crm, f'{crm}:key', method, f'https://{crm}.test/x', send), send.call_count
+        except requests.exceptions.RequestException as e:
+            return e, send.call_count
+
+    def test_post_retried_only_when_not_applied(self):
+        ok = _response(201)
+        self.assertEqual(self._send('hubspot', 'POST', _response(429), ok), (ok, 2))
+        # A 502 on a POST may have created the record
+        self.assertEqual(self._send('hubspot', 'POST', _response(502), ok)[1], 1)
+        self.assertEqual(self._send('hubspot', 'GET', _response(502), ok), (ok, 2))
+
+    def test_monday_gateway_errors_are_retried(self):
+        ok = _response(200)
+        self.assertEqual(self._send('monday', 'POST', _response(502), ok), (ok, 2))
+
+    def test_salesforce_lock_contention_is_retried(self):
+        locked = _response(400, [{"errorCode": "UNABLE_TO_LOCK_ROW", "message": "unable to obtain exclusive access"}])
+        invalid = _response(400, [{"errorCode": "REQUIRED_FIELD_MISSING", "message": "LastName"}])
+        ok = _response(201)
+        session = MagicMock()
+        session.request.side_effect = [locked, ok]
+        self.assertIs(LimitedSession(session, 'salesforce', 'salesforce:key').request('POST', 'https://sf/x'), ok)
+        self.assertEqual(self._send('salesforce', 'POST', invalid, ok), (invalid, 1))
+
+    def test_hubspot_daily_limit_is_permanent(self):
+        daily = _response(429, {"policyName": "DAILY"})
+        self.assertEqual(self._send('hubspot', 'POST', daily, _response(201)), (daily, 1))
+
+    def test_connection_errors(self):
+        ok = _response(201)
+        refused = requests.exceptions.ConnectionError(
+            MaxRetryError(None, '/x', NewConnectionError(None, 'Connection refused'))
+        )
+        self.assertEqual(self._send('pipedrive', 'POST', refused, ok), (ok, 2))
+        self.assertEqual(self._send('pipedrive', 'POST', requests.exceptions.ConnectTimeout(), ok), (ok, 2))
+        error, calls = self._send('pipedrive', 'POST', requests.exceptions.ReadTimeout(), ok)
+        self.assertIsInstance(error, requests.exceptions.ReadTimeout)
+        self.assertEqual(calls, 1)
+
+    def test_post_not_resent_after_remote_disconnect(self):
+        # A pooled keep-alive connection dropped after the body went out: the record may exist
+        aborted = requests.exceptions.ConnectionError(
+            ProtocolError('Connection aborted.', RemoteDisconnected('Remote end closed connection without response'))
+        )
+        ok = _response(201)
+        error, calls = self._send('hubspot', 'POST', aborted, ok)
+        self.assertIs(error, aborted)
+        self.assertEqual(calls, 1)
+        self.assertIsNone(transient_wait(aborted))
+        self.assertEqual(self._send('hubspot', 'GET', aborted, _response(200))[1], 2)
+
+    def test_backoff_with_jitter_and_retry_after(self):
+        with patch('core.adapters.retry.random.uniform', side_effect=lambda low, high: high):
+            self._send('pipedrive', 'GET', _response(503), _response(503), _response(429, **{'Retry-After': '9'}), _response(200))
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [0.5, 1.0, 9.0])
+
+    def test_attempts_and_deadline_are_bounded(self):
+        unavailable = [_response(503) for _ in range(6)]
+        self.assertEqual(self._send('pipedrive', 'GET', *unavailable)[1], 4)
+        with override_settings(CRM_RETRY_DEADLINE=5):
+            self.assertEqual(self._send('pipedrive', 'GET', _response(503, **{'Retry-After': '30'}), _response(200))[1], 1)
+
+    @override_settings(CRM_RETRY_BUDGET_RESERVE=2)
+    def test_retry_budget_caps_amplification(self):
+        calls = [self._send('dynamics', 'GET', _response(503), _response(503), _response(503), _response(503))[1]
+                 for _ in range(3)]
+        # Two retries in reserve, then one per five requests
+        self.assertEqual(calls, [3, 1, 1])
+        self.assertEqual(self._send('hubspot', 'GET', _response(503), _response(200))[1], 2)
+
+    def test_retry_budget_shared_through_redis(self):
+        budget = RetryBudget(rate_limit.SharedRedis())
+        fake_redis = MagicMock(RedisError=FakeRedisError)
+        deposit, withdraw = MagicMock(), MagicMock(return_value=0)
+        fake_redis.Redis.from_url.return_value.register_script.side_effect = [deposit, withdraw]
+        with patch.object(rate_limit, 'redis', fake_redis), patch.object(retry, 'redis', fake_redis), \
+                override_settings(CRM_RATE_LIMIT_REDIS_URL='redis://localhost:6379/0'):
+            budget.deposit('hubspot')
+            self.assertEqual(deposit.call_args.kwargs['keys'], ['crm-retry-budget:hubspot'])
+            self.assertEqual(deposit.call_args.kwargs['args'][:2], [0.2, 10.0])
+            # Another process spent the shared budget
+            self.assertFalse(budget.withdraw('hubspot'))
+
+            withdraw.side_effect = FakeRedisError("connection refused")
+            with self.assertLogs('core.adapters.rate_limit', 'WARNING'):
+                self.assertTrue(budget.withdraw('hubspot'))
@@ -0,0 +1,153 @@
+import json
+import time
+from unittest.mock import patch, MagicMock
+from celery.exceptions import Retry
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from core import remote_records
+from core.adapters.base_adapter import PushResult
+from core.adapters.salesforce_adapter import SalesforceAdapter
+from core.canonical_model import Contact
+from core.models import CRMConfiguration, RemoteRecord
+from core.services import BrokerService
+from core.tasks import collect_push_job_task
+
+User = get_user_model()
+
+BASE_URL = "https://org.my.salesforce.com/services/data/v57.0/"
+
+
+def _response(data=None, text=""):
+    response = MagicMock(status_code=200, text=text)
+    response.json.return_value = data
+    return response
+
+
+class SalesforceBulkTest(SimpleTestCase):
+    def setUp(self):
+        self.adapter = SalesforceAdapter({
+            'object_name': 'Contact',
+            'field_mapping': {'email': 'Email'},
+            'bulk_threshold': 3,
+        })
+        self.adapter.client = MagicMock(headers={'Authorization': 'Bearer tok'}, base_url=BASE_URL)
+
+    def test_collections_for_small_batches(self):
+        contacts = [Contact(last_name="A", email="a@test.com"), Contact(last_name="B", email="b@test.com")]
+        reply = [{"id": "003A", "success": True, "errors": []},
+                 {"success": False, "errors": [{"statusCode": "DUPLICATES_DETECTED", "message": "dup"}]}]
+        with patch.object(SalesforceAdapter, '_request', return_value=_response(reply)) as request:
+            results = self.adapter.push_contacts(contacts)
+
+        method, url = request.call_args.args
+        body = json.loads(request.call_args.kwargs['data'])
+        self.assertEqual((method, url), ("POST", BASE_URL + "composite/sobjects"))
+        self.assertFalse(body['allOrNone'])
+        self.assertEqual(body['records'][0]['attributes'], {"type": "Contact"})
+        self.assertEqual(results[0].remote_id, "003A")
+        self.assertIn("DUPLICATES_DETECTED", results[1].error)
+
+    def test_updates_go_through_collections_by_id(self):
+        updates = [("003A", Contact(last_name="A")), ("003B", Contact(last_name="B")), ("003C", Contact(last_name="C"))]
+        reply = [{"id": "003A", "success": True, "errors": []},
+                 {"success": False, "errors": [{"statusCode": "ENTITY_IS_DELETED", "message": "deleted"}]},
+                 {"success": False, "errors": [{"statusCode": "FIELD_CUSTOM_VALIDATION_EXCEPTION", "message": "no"}]}]
+        with patch.object(SalesforceAdapter, '_request', return_value=_response(reply)) as request:
+            results = self.adapter.update_contacts(updates)
+
+        # Collections even at the bulk threshold: one call, no ingest job
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(request.call_args.args, ("PATCH", BASE_URL + "composite/sobjects"))
+        body = json.loads(request.call_args.kwargs['data'])
+        self.assertEqual([record['Id'] for record in body['records']], ["003A", "003B", "003C"])
+        self.assertEqual(results[0].remote_id, "003A")
+        self.assertIsNone(results[1])
+        self.assertIn("FIELD_CUSTOM_VALIDATION_EXCEPTION", results[2].error)
+
+    def test_bulk_job_above_threshold(self):
+        contacts = [Contact(last_name=name, email=f"{name.lower()}@test.com") for name in ("A", "B", "C")]
+        calls = []
+
+        def fake_request(method, url, **kwargs):
+            calls.append((method, url.replace(BASE_URL, "")))
+            if url == BASE_URL + "jobs/ingest":
+                return _response({"id": "750X"})
+            return _response({})
+
+        with patch.object(SalesforceAdapter, '_request', side_effect=fake_request):
+            results = self.adapter.push_contacts(contacts)
+
+        # Submitted, not waited on
+        self.assertEqual(calls, [
+            ("POST", "jobs/ingest"), ("PUT", "jobs/ingest/750X/batches"), ("PATCH", "jobs/ingest/750X"),
+        ])
+        self.assertTrue(all(r.pending and r.job_id == "750X" for r in results))
+
+    def test_job_results(self):
+        records = [self.adapter.mapped_payload(Contact(last_name=name, email=f"{name.lower()}@test.com"))
+                   for name in ("A", "B", "C")]
+        successful = 'sf__Id,sf__Created,LastName,Email\n003C,true,C,c@test.com\n003A,true,A,a@test.com\n'
+        failed = 'sf__Id,sf__Error,LastName,Email\n,INVALID_EMAIL:bad,B,b@test.com\n'
+        state = "InProgress"
+
+        def fake_request(method, url, **kwargs):
+            path = url.replace(BASE_URL, "")
+            if path == "jobs/ingest/750X":
+                return _response({"id": "750X", "state": state})
+            if path.endswith("successfulResults/"):
+                return _response(text=successful)
+            return _response(text=failed)
+
+        with patch.object(SalesforceAdapter, '_request', side_effect=fake_request) as request:
+            self.assertIsNone(self.adapter.job_results("750X", records))
+            self.assertEqual(request.call_count, 1)
+            state = "JobComplete"
+            results = self.adapter.job_results("750X", records)
+
+        self.assertEqual([r.remote_id for r in results], ["003A", None, "003C"])
+        self.assertEqual(results[1].error, "INVALID_EMAIL:bad")
+
+
+class CollectPushJobTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='bulk@test.com', username='bulkuser', password='password')
+        CRMConfiguration.objects.create(
+            user=self.user,
+            crm_type='salesforce',
+            auth_config={'object_name': 'Contact', 'bulk_threshold': 2},
+            field_mapping={'email': 'Email'},
+        )
+        self.adapter = BrokerService.get_adapter_for_user(self.user, 'salesforce')
+        self.adapter.client = MagicMock(headers={}, base_url=BASE_URL)
+        self.contacts = [Contact(last_name=name, email=f"{name.lower()}@test.com") for name in ("A", "B")]
+
+    def test_records_are_saved_once_the_job_finishes(self):
+        with patch.object(SalesforceAdapter, '_request', return_value=_response({"id": "750X"})), \
+                patch.object(collect_push_job_task, 'apply_async') as apply_async:
+            results = remote_records.push_contacts(self.adapter, self.user, 'salesforce', self.contacts)
+
+        self.assertTrue(all(r.pending for r in results))
+        self.assertFalse(RemoteRecord.objects.exists())
+        kwargs = apply_async.call_args.kwargs['kwargs']
+        self.assertEqual((kwargs['job_id'], kwargs['crm_type'], kwargs['keys']), ("750X", 'salesforce', ['a@test.com', 'b@test.com']))
+
+        with patch.object(SalesforceAdapter, 'job_results', return_value=None), \
+                patch.object(collect_push_job_task, 'retry', side_effect=Retry) as retry:
+            with self.assertRaises(Retry):
+                collect_push_job_task.run(**kwargs)
+        retry.assert_called_once()
+
+        finished = [PushResult(remote_id='003A'), PushResult(error='INVALID_EMAIL')]
+        with patch.object(SalesforceAdapter, 'job_results', return_value=finished):
+            self.assertEqual(collect_push_job_task.run(**kwargs), 1)
+        self.assertEqual(list(RemoteRecord.objects.values_list('external_key', 'remote_id')), [('a@test.com', '003A')])
+
+    @override_settings(SYNC_PUSH_JOB_TIMEOUT=60)
+    def test_gives_up_after_the_timeout(self):
+        with patch.object(SalesforceAdapter, 'job_results', return_value=None), \
+                patch.object(collect_push_job_task, 'retry') as retry:
+            self.assertIsNone(collect_push_job_task.run(
+                user_id=self.user.pk, crm_type='salesforce', target='Contact', job_id='750X',
+                keys=['a@test.com'], digests=[None], records=[{}], submitted_at=time.time() - 120,
+            ))
+        retry.assert_not_called()
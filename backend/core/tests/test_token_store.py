@@ -0,0 +1,79 @@
+import threading
+import time
+from unittest.mock import patch, MagicMock
+from django.test import SimpleTestCase
+from core.adapters.token_store import TokenStore, token_store
+from core.adapters.dynamics_adapter import DynamicsAdapter
+
+class TokenStoreTest(SimpleTestCase):
+    def test_token_reused_until_refresh_window(self):
+        store = TokenStore(refresh_margin=60)
+        fetch = MagicMock(return_value={'access_token': 'a', 'expires_in': 3600})
+        self.assertEqual(store.get('k', fetch)['access_token'], 'a')
+        self.assertEqual(store.get('k', fetch)['access_token'], 'a')
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_expired_token_is_refetched(self):
+        store = TokenStore(refresh_margin=0)
+        fetch = MagicMock(side_effect=[
+            {'access_token': 'old', 'expires_in': 0},
+            {'access_token': 'new', 'expires_in': 3600},
+        ])
+        store.get('k', fetch)
+        self.assertEqual(store.get('k', fetch)['access_token'], 'new')
+
+    def test_background_refresh_serves_current_token(self):
+        store = TokenStore(refresh_margin=100)
+        store._store('k', {'access_token': 'old', 'expires_in': 50})
+        refreshed = threading.Event()
+
+        def fetch():
+            refreshed.set()
+            return {'access_token': 'new', 'expires_in': 3600}
+
+        self.assertEqual(store.get('k', fetch)['access_token'], 'old')
+        self.assertTrue(refreshed.wait(2))
+        for _ in range(50):
+            if store.get('k', fetch)['access_token'] == 'new':
+                break
+            time.sleep(0.01)
+        self.assertEqual(store.get('k', fetch)['access_token'], 'new')
+
+    def test_concurrent_refresh_is_single_flight(self):
+        store = TokenStore()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'access_token': 'a', 'expires_in': 3600}
+
+        threads = [threading.Thread(target=store.get, args=('k', fetch)) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+
+    def test_dynamics_adapters_share_tokens(self):
+        token_store.clear()
+        config = {'client_id': 'c', 'client_secret': 's', 'tenant_id': 't', 'resource_url': 'https://org.crm.dynamics.com'}
+        response = MagicMock(status_code=200)
+        response.json.return_value = {'access_token': 'tok', 'expires_in': 3599}
+        with patch.object(DynamicsAdapter, '_request', return_value=response) as post:
+            self.assertTrue(DynamicsAdapter(config).authenticate())
+            self.assertTrue(DynamicsAdapter(config).authenticate())
+        self.assertEqual(post.call_count, 1)
+        token_store.clear()
+
+    def test_tokens_are_not_shared_across_secrets(self):
+        token_store.clear()
+        config = {'client_id': 'c', 'client_secret': 's', 'tenant_id': 't', 'resource_url': 'https://org.crm.dynamics.com'}
+        response = MagicMock(status_code=200)
+        response.json.return_value = {'access_token': 'tok', 'expires_in': 3599}
+        with patch.object(DynamicsAdapter, '_request', return_value=response) as post:
+            self.assertTrue(DynamicsAdapter(config).authenticate())
+            self.assertTrue(DynamicsAdapter(dict(config, client_secret='guess')).authenticate())
+        self.assertEqual(post.call_count, 2)
+        self.assertNotIn('guess', str(DynamicsAdapter(dict(config, client_secret='guess'))._token_key))
+        token_store.clear()
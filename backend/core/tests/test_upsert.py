@@ -0,0 +1,122 @@
+import json
+from unittest.mock import patch, MagicMock
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from core.canonical_model import Contact
+from core.adapters.salesforce_adapter import SalesforceAdapter
+from core.adapters.hubspot_adapter import HubSpotAdapter
+from core.adapters.dynamics_adapter import DynamicsAdapter
+from core.adapters.pipedrive_adapter import PipedriveAdapter
+from core.adapters.monday_adapter import MondayAdapter
+
+def _response(body, status_code=200):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = body
+    return response
+
+CONTACT = Contact(last_name="Doe", email="jane@test.com")
+
+class NativeUpsertTest(SimpleTestCase):
+    def test_salesforce_external_id(self):
+        adapter = SalesforceAdapter({
+            'object_name': 'Contact', 'upsert_field': 'Email', 'field_mapping': {'email': 'Email'},
+        })
+        adapter.client = MagicMock()
+        adapter._refresh_client = MagicMock()
+        adapter.client.Contact.upsert.return_value = _response({'id': '003A', 'created': False})
+
+        self.assertEqual(adapter.push_contact(CONTACT, upsert=True), '003A')
+        adapter.client.Contact.upsert.assert_called_once_with(
+            'Email/jane%40test.com', {'LastName': 'Doe'}, raw_response=True)
+
+    def test_salesforce_collections_upsert(self):
+        adapter = SalesforceAdapter({
+            'object_name': 'Contact', 'upsert_field': 'Email', 'field_mapping': {'email': 'Email'},
+        })
+        adapter.client = MagicMock(headers={}, base_url='https://sf/services/data/v59.0/')
+        adapter._refresh_client = MagicMock()
+        with patch.object(SalesforceAdapter, '_request', return_value=_response([{'id': '003A', 'success': True}])) as request:
+            results = adapter.push_contacts([CONTACT, Contact(last_name="NoEmail")], upsert=True)
+
+        self.assertEqual(request.call_args.args, ('PATCH', 'https://sf/services/data/v59.0/composite/sobjects/Contact/Email'))
+        self.assertEqual(len(json.loads(request.call_args.kwargs['data'])['records']), 1)
+        self.assertEqual(results[0].remote_id, '003A')
+        self.assertIn("has no value", results[1].error)
+
+    def test_hubspot_single_upsert(self):
+        adapter = HubSpotAdapter({
+            'access_token': 'tok', 'object_type': 'contacts', 'upsert_field': 'email',
+            'field_mapping': {'email': 'email'},
+        })
+        with patch.object(HubSpotAdapter, '_request', return_value=_response({'results': [{'id': '51'}]})) as request:
+            self.assertEqual(adapter.push_contact(CONTACT, upsert=True), '51')
+        self.assertTrue(request.call_args.args[1].endswith('/contacts/batch/upsert'))
+        self.assertEqual(request.call_args.kwargs['json']['inputs'][0]['idProperty'], 'email')
+
+    def test_dynamics_alternate_key(self):
+        adapter = DynamicsAdapter({
+            'client_id': 'c', 'client_secret': 's', 'tenant_id': 't',
+            'resource_url': 'https://org.crm.dynamics.com', 'object_type': 'contacts',
+            'upsert_field': 'emailaddress1', 'field_mapping': {'email': 'emailaddress1'},
+        })
+        adapter._get_access_token = MagicMock(return_value='tok')
+        response = _response({})
+        response.headers = {'OData-EntityId': 'contacts(guid-1)'}
+        with patch.object(DynamicsAdapter, '_request', return_value=response) as request:
+            self.assertEqual(adapter.push_contact(Contact(email="o'neil@test.com"), upsert=True), 'guid-1')
+        self.assertEqual(request.call_args.args, (
+            'PATCH', "https://org.crm.dynamics.com/api/data/v9.2/contacts(emailaddress1='o%27%27neil@test.com')"))
+
+    def test_missing_upsert_field(self):
+        adapter = HubSpotAdapter({'access_token': None, 'object_type': 'contacts', 'field_mapping': {'email': 'email'}})
+        with self.assertRaisesMessage(ValueError, "upsert_field"):
+            adapter.push_contact(CONTACT, upsert=True)
+
+class SearchThenUpdateTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_pipedrive_caches_remote_id(self):
+        adapter = PipedriveAdapter({
+            'api_token': 'tok', 'object_type': 'persons', 'upsert_field': 'email', 'field_mapping': {'email': 'email'},
+        })
+        search = _response({'data': {'items': [{'item': {'id': 7}}]}})
+        updated = _response({'data': {'id': 7}})
+        with patch.object(PipedriveAdapter, '_request', side_effect=[search, updated, updated]) as request:
+            self.assertEqual(adapter.push_contact(CONTACT, upsert=True), '7')
+            self.assertEqual(adapter.push_contact(CONTACT, upsert=True), '7')
+
+        methods = [(call.args[0], call.args[1]) for call in request.call_args_list]
+        self.assertEqual(methods, [
+            ('GET', 'https://api.pipedrive.com/v1/persons/search'),
+            ('PUT', 'https://api.pipedrive.com/v1/persons/7'),
+            ('PUT', 'https://api.pipedrive.com/v1/persons/7'),
+        ])
+        self.assertEqual(request.call_args_list[0].kwargs['params']['fields'], 'email')
+
+    def test_pipedrive_stale_cache_falls_back_to_search(self):
+        adapter = PipedriveAdapter({
+            'api_token': 'tok', 'object_type': 'persons', 'upsert_field': 'email', 'field_mapping': {'email': 'email'},
+        })
+        adapter._remember_remote_id('7', 'tok', 'https://api.pipedrive.com/v1/persons', 'email', 'jane@test.com')
+        replies = [_response({}, status_code=404), _response({'data': {'items': []}}), _response({'data': {'id': 8}})]
+        with patch.object(PipedriveAdapter, '_request', side_effect=replies) as request:
+            self.assertEqual(adapter.push_contact(CONTACT, upsert=True), '8')
+        self.assertEqual(request.call_args.args[0], 'POST')
+
+    def test_monday_search_then_update(self):
+        adapter = MondayAdapter({
+            'api_token': 'tok', 'board_id': '42', 'upsert_field': 'email_col',
+            'field_mapping': {'last_name': 'Name', 'email': 'email_col'},
+        })
+        found = _response({'data': {'items_page_by_column_values': {'items': [{'id': '900'}]}}})
+        updated = _response({'data': {'change_multiple_column_values': {'id': '900'}}})
+        with patch.object(MondayAdapter, '_request', side_effect=[found, updated, updated]) as request:
+            self.assertEqual(adapter.push_contact(CONTACT, upsert=True), '900')
+            self.assertEqual(adapter.push_contact(CONTACT, upsert=True), '900')
+
+        queries = [call.kwargs['json']['query'] for call in request.call_args_list]
+        self.assertIn('items_page_by_column_values', queries[0])
+        self.assertTrue(all('change_multiple_column_values' in query for query in queries[1:]))
+        variables = request.call_args.kwargs['json']['variables']
+        self.assertEqual(json.loads(variables['column_values']), {'email_col': 'jane@test.com', 'name': 'Doe'})
@@ -2,6 +2,8 @@
 ASGI config for universal_connector project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``daphne universal_connector.asgi:application``)
+so async views such as ``/api/sync/<crm_type>/aio/`` run on the event loop.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
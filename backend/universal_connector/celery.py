@@ -0,0 +1,12 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'universal_connector.settings')
+
+app = Celery('universal_connector')
+
+# Read CELERY_* settings from Django settings
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+app.autodiscover_tasks(['user.worker'])
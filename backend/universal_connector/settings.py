@@ -175,6 +175,75 @@ REDIS_URL = env("REDIS_URL", default="redis://redis:6379/0")
 # Celery 
 CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default="redis://localhost:6379/0")
+CELERY_TASK_ROUTES = ("core.tasks.route_task",)
+CELERY_BEAT_SCHEDULE = {}
+
+# CRM adapters
+ADAPTER_CACHE_TTL = env.int("ADAPTER_CACHE_TTL", default=900)
+ADAPTER_CACHE_MAX_SIZE = env.int("ADAPTER_CACHE_MAX_SIZE", default=512)
+CRM_TOKEN_REFRESH_MARGIN = env.int("CRM_TOKEN_REFRESH_MARGIN", default=300)
+CRM_TOKEN_DEFAULT_TTL = env.int("CRM_TOKEN_DEFAULT_TTL", default=3600)
+CRM_HTTP_POOL_SIZE = env.int("CRM_HTTP_POOL_SIZE", default=20)
+CRM_HTTP_CONNECT_TIMEOUT = env.float("CRM_HTTP_CONNECT_TIMEOUT", default=5)
+CRM_HTTP_READ_TIMEOUT = env.float("CRM_HTTP_READ_TIMEOUT", default=30)
+CRM_HTTP_MAX_RETRIES = env.int("CRM_HTTP_MAX_RETRIES", default=2)
+CRM_RATE_LIMIT_ENABLED = env.bool("CRM_RATE_LIMIT_ENABLED", default=True)
+CRM_RATE_LIMIT_REDIS_URL = env("CRM_RATE_LIMIT_REDIS_URL", default=REDIS_URL)
+CRM_RATE_LIMIT_MAX_WAIT = env.float("CRM_RATE_LIMIT_MAX_WAIT", default=60)
+CRM_RATE_LIMIT_REDIS_RETRY = env.int("CRM_RATE_LIMIT_REDIS_RETRY", default=30)
+CRM_RETRY_MAX_ATTEMPTS = env.int("CRM_RETRY_MAX_ATTEMPTS", default=4)
+CRM_RETRY_BASE_DELAY = env.float("CRM_RETRY_BASE_DELAY", default=0.5)
+CRM_RETRY_MAX_DELAY = env.float("CRM_RETRY_MAX_DELAY", default=20)
+CRM_RETRY_DEADLINE = env.float("CRM_RETRY_DEADLINE", default=60)
+CRM_RETRY_BUDGET_RATIO = env.float("CRM_RETRY_BUDGET_RATIO", default=0.2)
+CRM_RETRY_BUDGET_RESERVE = env.int("CRM_RETRY_BUDGET_RESERVE", default=10)
+CRM_CIRCUIT_ENABLED = env.bool("CRM_CIRCUIT_ENABLED", default=True)
+CRM_CIRCUIT_WINDOW = env.float("CRM_CIRCUIT_WINDOW", default=60)
+CRM_CIRCUIT_MIN_CALLS = env.int("CRM_CIRCUIT_MIN_CALLS", default=20)
+CRM_CIRCUIT_FAILURE_RATE = env.float("CRM_CIRCUIT_FAILURE_RATE", default=0.5)
+CRM_CIRCUIT_SLOW_CALL = env.float("CRM_CIRCUIT_SLOW_CALL", default=10)
+CRM_CIRCUIT_COOLDOWN = env.float("CRM_CIRCUIT_COOLDOWN", default=30)
+SYNC_SPILL_WHEN_UNAVAILABLE = env.bool("SYNC_SPILL_WHEN_UNAVAILABLE", default=False)
+SYNC_FANOUT_TIMEOUT = env.float("SYNC_FANOUT_TIMEOUT", default=30)
+SYNC_QUEUE = env("SYNC_QUEUE", default="celery")
+SYNC_OUTBOX_BATCH_SIZE = env.int("SYNC_OUTBOX_BATCH_SIZE", default=200)
+SYNC_OUTBOX_LEASE = env.int("SYNC_OUTBOX_LEASE", default=600)
+SYNC_OUTBOX_MAX_ATTEMPTS = env.int("SYNC_OUTBOX_MAX_ATTEMPTS", default=5)
+SYNC_OUTBOX_RETRY_DELAY = env.float("SYNC_OUTBOX_RETRY_DELAY", default=30)
+SYNC_OUTBOX_POLL_INTERVAL = env.float("SYNC_OUTBOX_POLL_INTERVAL", default=1)
+SYNC_OUTBOX_MAX_BATCHES = env.int("SYNC_OUTBOX_MAX_BATCHES", default=10)
+
+if SYNC_QUEUE == "outbox":
+    CELERY_BEAT_SCHEDULE["dispatch-outbox"] = {
+        "task": "core.tasks.dispatch_outbox_task",
+        "schedule": env.float("SYNC_OUTBOX_BEAT_INTERVAL", default=5),
+    }
+SYNC_BATCH_MAX_SIZE = env.int("SYNC_BATCH_MAX_SIZE", default=10000)
+SYNC_STREAM_CHUNK_SIZE = env.int("SYNC_STREAM_CHUNK_SIZE", default=1000)
+SALESFORCE_BULK_THRESHOLD = env.int("SALESFORCE_BULK_THRESHOLD", default=2000)
+# Asynchronous push jobs (Salesforce Bulk API) are checked by a task, not waited on
+SYNC_PUSH_JOB_POLL_INTERVAL = env.int("SYNC_PUSH_JOB_POLL_INTERVAL", default=10)
+SYNC_PUSH_JOB_TIMEOUT = env.int("SYNC_PUSH_JOB_TIMEOUT", default=86400)
+CRM_REMOTE_ID_CACHE_TTL = env.int("CRM_REMOTE_ID_CACHE_TTL", default=86400)
+SYNC_PULL_PAGE_SIZE = env.int("SYNC_PULL_PAGE_SIZE", default=200)
+SYNC_PULL_LOOKBACK = env.int("SYNC_PULL_LOOKBACK", default=60)
+# Only schedule pulls once something receives core.signals.contacts_pulled
+SYNC_PULL_ENABLED = env.bool("SYNC_PULL_ENABLED", default=False)
+
+if SYNC_PULL_ENABLED:
+    CELERY_BEAT_SCHEDULE["pull-contacts"] = {
+        "task": "core.tasks.pull_all_contacts_task",
+        "schedule": env.int("SYNC_PULL_INTERVAL", default=3600),
+    }
+SYNC_IDEMPOTENCY_TTL = env.int("SYNC_IDEMPOTENCY_TTL", default=86400)
+SYNC_IDEMPOTENCY_WAIT = env.float("SYNC_IDEMPOTENCY_WAIT", default=30)
+SYNC_IDEMPOTENCY_LOCK_TIMEOUT = env.int("SYNC_IDEMPOTENCY_LOCK_TIMEOUT", default=300)
+SYNC_IDEMPOTENCY_BY_CONTENT = env.bool("SYNC_IDEMPOTENCY_BY_CONTENT", default=False)
+CELERY_BEAT_SCHEDULE["purge-idempotency-records"] = {
+    "task": "core.tasks.purge_idempotency_records_task",
+    "schedule": env.int("SYNC_IDEMPOTENCY_PURGE_INTERVAL", default=3600),
+}
+SYNC_SKIP_UNCHANGED = env.bool("SYNC_SKIP_UNCHANGED", default=True)
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (